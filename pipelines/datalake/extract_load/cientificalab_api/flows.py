@@ -23,7 +23,7 @@ from pipelines.utils.credential_injector import (
     authenticated_create_flow_run as create_flow_run,
 )
 from pipelines.utils.credential_injector import (
-    authenticated_wait_for_flow_run as wait_for_flow_run,
+    authenticated_wait_for_flow_runs as wait_for_flow_runs,
 )
 from pipelines.utils.flow import Flow
 from pipelines.utils.prefect import get_current_flow_labels
@@ -152,11 +152,11 @@ with Flow(
         run_name=unmapped(None),
     )
 
-    wait_for_operator_runs = wait_for_flow_run.map(
-        flow_run_id=created_operator_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(False),
+    wait_for_operator_runs = wait_for_flow_runs(
+        flow_run_ids=created_operator_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=False,
     )
 
 flow_cientificalab_operator.storage = GCS(constants.GCS_FLOWS_BUCKET.value)
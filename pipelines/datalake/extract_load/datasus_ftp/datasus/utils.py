@@ -12,6 +12,32 @@ from ftplib import FTP
 
 from prefeitura_rio.pipelines_utils.logging import log
 
+# Replacements applied to the CNES header to conform it to BigQuery requirements
+CNES_HEADER_REPLACEMENTS = [
+    ("TO_CHAR(", ""),
+    (",'DD/MM/YYYY')", ""),
+    ("A.DT", "DT"),
+    ("'CO_CPF'", "CO_CPF"),
+]
+
+
+def fix_cnes_columns(columns: list) -> list:
+    """
+    Applies the CNES header replacements to a list of column names.
+
+    Args:
+        columns (list): The raw column names.
+
+    Returns:
+        list: The fixed column names.
+    """
+    fixed_columns = []
+    for column in columns:
+        for old, new in CNES_HEADER_REPLACEMENTS:
+            column = column.replace(old, new)
+        fixed_columns.append(column)
+    return fixed_columns
+
 
 def check_newest_file_version(host: str, directory: str, base_file_name: str):
     """
@@ -76,10 +102,9 @@ def fix_cnes_header(file_path: str):
             first_line = f.readline()
 
             # modify the first line
-            modified_first_line = first_line.replace("TO_CHAR(", "")
-            modified_first_line = modified_first_line.replace(",'DD/MM/YYYY')", "")
-            modified_first_line = modified_first_line.replace("A.DT", "DT")
-            modified_first_line = modified_first_line.replace("'CO_CPF'", "CO_CPF")
+            modified_first_line = first_line
+            for old, new in CNES_HEADER_REPLACEMENTS:
+                modified_first_line = modified_first_line.replace(old, new)
 
             # write the modified first line to the temporary file
             tf.write(modified_first_line)
@@ -17,13 +17,13 @@ from pipelines.datalake.extract_load.datasus_ftp.constants import (
 )
 from pipelines.datalake.extract_load.datasus_ftp.datasus.utils import (
     check_newest_file_version,
-    fix_cnes_header,
+    fix_cnes_columns,
 )
 from pipelines.datalake.utils.data_transformations import (
-    add_flow_metadata,
-    conform_header_to_datalake,
-    convert_to_parquet,
+    get_flow_metadata,
+    stream_to_parquet,
 )
+from pipelines.utils.concurrency import thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.tasks import (
     create_partitions,
@@ -111,56 +111,50 @@ def extract_data_from_datasus(
 
 
 @task
-def transform_data(files_path: list[str], endpoint: str):
+def transform_data(files_path: list[str], endpoint: str, chunksize: int = 100_000):
     """
     Transforms data from the DATASUS FTP server.
+
+    Each file is converted to Parquet in a single streaming pass: header fixes, header
+    conformance and flow metadata are applied to every record batch as it is read.
     """
 
     raw_files = files_path
 
     if endpoint == "cbo":
 
-        transformed_files = [
-            convert_to_parquet(file_path=file, file_type="dbf", encoding="latin-1")
-            for file in raw_files
-        ]
-        log("Files converted to parquet successfully")
-
-        # Add metadata
         snapshot_date = datetime.fromtimestamp(os.path.getmtime(raw_files[0])).strftime("%Y-%m-%d")
         transformed_files = [
-            add_flow_metadata(file_path=file, file_type="parquet", snapshot_date=snapshot_date)
-            for file in transformed_files
-        ]
-        log("Metadata added successfully")
-
-        transformed_files = [
-            conform_header_to_datalake(file_path=file, file_type="parquet")
-            for file in transformed_files
+            stream_to_parquet(
+                file_path=file,
+                file_type="dbf",
+                encoding="latin-1",
+                metadata=get_flow_metadata(file_path=file, snapshot_date=snapshot_date),
+                chunksize=chunksize,
+            )
+            for file in raw_files
         ]
-        log("Header conformed successfully")
 
     elif endpoint == "cnes":
 
-        transformed_files = [fix_cnes_header(file) for file in raw_files]
-        log("Header fixed successfully")
-
-        transformed_files = [
-            add_flow_metadata(file_path=file, file_type="csv", sep=";", parse_date_from="filename")
-            for file in transformed_files
-        ]
-        log("Metadata added successfully")
-
         transformed_files = [
-            convert_to_parquet(file_path=file, csv_sep=";", encoding="utf-8")
-            for file in transformed_files
+            stream_to_parquet(
+                file_path=file,
+                csv_sep=";",
+                encoding="iso8859-1",
+                metadata=get_flow_metadata(file_path=file, parse_date_from="filename"),
+                conform_header=False,
+                fix_columns=fix_cnes_columns,
+                chunksize=chunksize,
+            )
+            for file in raw_files
         ]
-        log("Files converted to parquet successfully")
 
     else:
         log(f"Endpoint {endpoint} not found", level="error")
         raise FAIL(f"Endpoint {endpoint} not found")
 
+    log("Files converted to parquet successfully")
     return transformed_files
 
 
@@ -208,49 +202,41 @@ def upload_many_to_datalake(
     if_storage_data_exists="replace",
     biglake_table=True,
     dataset_is_public=False,
+    max_workers: int = 4,
 ):
     """
     Uploads different tables to data lake.
+
+    Each table is uploaded independently, so up to `max_workers` tables are sent concurrently.
     """
 
     data_path = Path(input_path)
 
     if endpoint == "cbo":
-
-        files = data_path.glob(f"*.{source_format}")
-
-        for file in files:
-            upload_to_datalake.run(
-                input_path=file,
-                dataset_id=dataset_id,
-                table_id=file.name.split(".")[0].lower(),
-                dump_mode="overwrite",
-                source_format=source_format,
-                if_exists=if_exists,
-                if_storage_data_exists=if_storage_data_exists,
-                biglake_table=biglake_table,
-                dataset_is_public=dataset_is_public,
-            )
-        log("Files uploaded successfully", level="info")
-
+        inputs = list(data_path.glob(f"*.{source_format}"))
+        table_ids = [file.name.split(".")[0].lower() for file in inputs]
+        dump_mode = "overwrite"
     elif endpoint == "cnes":
-
-        folders = data_path.glob("*")
-
-        for folder in folders:
-            upload_to_datalake.run(
-                input_path=folder,
-                dataset_id=dataset_id,
-                table_id=folder.name,
-                dump_mode="append",
-                source_format=source_format,
-                if_exists=if_exists,
-                if_storage_data_exists=if_storage_data_exists,
-                biglake_table=biglake_table,
-                dataset_is_public=dataset_is_public,
-            )
-        log("Folders uploaded successfully", level="info")
-
+        inputs = list(data_path.glob("*"))
+        table_ids = [folder.name for folder in inputs]
+        dump_mode = "append"
     else:
         log(f"Endpoint {endpoint} not found", level="error")
         raise FAIL(f"Endpoint {endpoint} not found")
+
+    def upload(input_and_table_id):
+        input_file, table_id = input_and_table_id
+        upload_to_datalake.run(
+            input_path=input_file,
+            dataset_id=dataset_id,
+            table_id=table_id,
+            dump_mode=dump_mode,
+            source_format=source_format,
+            if_exists=if_exists,
+            if_storage_data_exists=if_storage_data_exists,
+            biglake_table=biglake_table,
+            dataset_is_public=dataset_is_public,
+        )
+
+    thread_map(upload, zip(inputs, table_ids), max_workers=max_workers)
+    log(f"{len(inputs)} tables uploaded successfully", level="info")
@@ -58,7 +58,7 @@ with Flow(
         session=session, sections=DOU_SECTION, date=parsed_date, upstream_tasks=[session]
     )
 
-    # Descompacta os arquivos .zip (Se não houver atos oficiais para descompactar, retorna False)
+    # Verifica os arquivos .zip (Se não houver atos oficiais, retorna False)
     extraction_status = unpack_zip(
         zip_files=zip_files,
         output_path=flow_constants.OUTPUT_DIR.value,
@@ -67,7 +67,7 @@ with Flow(
 
     # Pega as informações dos xml de cada ato oficial
     parquet_file = get_xml_files(
-        xml_dir=flow_constants.OUTPUT_DIR.value, upstream_tasks=[extraction_status, create_dirs]
+        zip_files=zip_files, upstream_tasks=[extraction_status, create_dirs]
     )
 
     # Faz o upload para o bigquery
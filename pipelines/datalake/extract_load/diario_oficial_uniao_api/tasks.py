@@ -1,14 +1,17 @@
 # -*- coding: utf-8 -*-
 import datetime
+import itertools
 import os
 import shutil
 import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import timedelta
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytz
 import requests
-from bs4 import BeautifulSoup
 from google.cloud import bigquery
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -17,6 +20,11 @@ from pipelines.constants import constants
 from pipelines.datalake.extract_load.diario_oficial_uniao_api.constants import (
     constants as flow_constants,
 )
+from pipelines.datalake.extract_load.diario_oficial_uniao_api.utils import (
+    ACT_COLUMNS,
+    iter_zip_xmls,
+    parse_acts,
+)
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 from pipelines.utils.tasks import get_secret_key, upload_df_to_datalake
@@ -143,95 +151,103 @@ def download_files(
 
 @task
 def unpack_zip(zip_files: list, output_path: str) -> None:
-    """Descompacta os arquivos .zip baixados.
+    """Verifica se os arquivos .zip baixados possuem atos oficiais.
+
+    Os arquivos .xml não são mais extraídos para o disco: `get_xml_files`
+    lê cada ato direto do .zip.
 
     Args:
         zip_path (str): Caminho para o diretório onde os arquivos .zip estão armazenados.
-        output_path (str): Caminho para o diretório onde os arquivos .xml serão armazenados.
+        output_path (str): Mantido por compatibilidade; nada é gravado nele.
+
+    Returns:
+        bool: True se houver algum ato oficial nos arquivos .zip.
     """
     try:
-        log("⬇️ Iniciando descompactação dos arquivos .zip")
-        if zip_files:
-            for file in zip_files:
-                log(f"Extraindo arquivos de: {file}")
-                with zipfile.ZipFile(file, "r") as zip_ref:
-                    zip_ref.extractall(output_path)
-        return True
+        log("⬇️ Verificando os arquivos .zip")
+        total = 0
+        for file in zip_files or []:
+            with zipfile.ZipFile(file, "r") as zip_ref:
+                count = sum(1 for name in zip_ref.namelist() if name.endswith(".xml"))
+            log(f"{count} atos oficiais em: {file}")
+            total += count
+        return total > 0
     except Exception:
         log("⚠️ Não há atos oficias para descompactar")
         return False
 
 
 @task
-def get_xml_files(xml_dir: str) -> str:
+def get_xml_files(
+    zip_files: list, max_workers: int | None = None, batch_size: int = 500, chunk_size: int = 32
+) -> str:
     """Pega as informações dos xml de cada ato oficial.
 
+    Os atos são lidos direto dos arquivos .zip, processados em paralelo por um pool de
+    processos em blocos de `chunk_size` atos e gravados no parquet em lotes de pelo menos
+    `batch_size` atos.
+
     Args:
-        xml_dir (str): Diretório onde os arquivos .xml estão armazenados.
+        zip_files (list): Caminhos dos arquivos .zip baixados.
+        max_workers (int | None, optional): Número de processos. Padrão: número de CPUs.
+        batch_size (int, optional): Número de atos gravados por vez no parquet. Padrão: 500.
+        chunk_size (int, optional): Número de atos enviados por vez a cada processo. Padrão: 32.
 
     Returns:
         str: Caminho do arquivo parquet gerado após o processamento das informações.
     """
     log("📋️ Iniciando processamento dos arquivos .xml...")
-    try:
-        acts = []
-        for file in os.listdir(xml_dir):
-            if file.endswith(".xml"):
-                with open(os.path.join(xml_dir, file), "r", encoding="utf-8") as f:
-                    xml_data = f.read()
-                    soup_xml = BeautifulSoup(xml_data, "xml")
-                    soup_html = BeautifulSoup(soup_xml.find("Texto").text, "html.parser")
-
-                    id = soup_xml.find("article")["id"]
-                    act_id = soup_xml.find("article")["idOficio"]
-                    pdf_page = soup_xml.find("article")["pdfPage"]
-                    edition = soup_xml.find("article")["editionNumber"]
-                    pubname = soup_xml.find("article")["pubName"]
-                    number_page = soup_xml.find("article")["numberPage"]
-                    pub_date = soup_xml.find("article")["pubDate"]
-                    art_category = soup_xml.find("article")["artCategory"]
-                    html = soup_html.prettify()
-                    text = "\n".join(p.get_text() for p in soup_html.find_all("p"))
-                    assina = soup_html.find_all(class_="assina")
-                    cargos = soup_html.find_all(class_="cargo")
-                    identifica = soup_xml.find_all("Identifica")
-                    text_title = soup_html.find_all(class_="identifica")
-
-                    extracted_data = {
-                        "title": " ".join([title.text for title in identifica]),
-                        "id": id,
-                        "act_id": act_id,
-                        "text_title": " ".join(title.get_text() for title in text_title),
-                        "published_at": pub_date,
-                        "agency": art_category,
-                        "text": text,
-                        "url": pdf_page,
-                        "number_page": number_page,
-                        "edition": edition,
-                        "section": pubname,
-                        "html": html,
-                        "signatures": "/".join([signature.text for signature in assina]),
-                        "role": " / ".join([cargo.text for cargo in cargos]),
-                    }
-                    acts.append(extracted_data)
-
-        df = pd.DataFrame(acts)
-        df["extracted_at"] = datetime.datetime.now(pytz.timezone("America/Sao_Paulo")).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
 
-        file_name = f"dou-extraction-{datetime.datetime.now().isoformat(sep='-')}.parquet"
-        file_path = os.path.join(flow_constants.OUTPUT_DIR.value, file_name)
+    extracted_at = datetime.datetime.now(pytz.timezone("America/Sao_Paulo")).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    schema = pa.schema([(column, pa.string()) for column in ACT_COLUMNS + ["extracted_at"]])
 
-        if df.empty:
-            return ""
-        df.to_parquet(file_path, index=False)
-        log(f"📁 Arquivo {file_name} salvo.")
-        return file_path
+    file_name = f"dou-extraction-{datetime.datetime.now().isoformat(sep='-')}.parquet"
+    file_path = os.path.join(flow_constants.OUTPUT_DIR.value, file_name)
 
-    except Exception:
+    max_workers = max_workers or os.cpu_count() or 1
+    xmls = iter_zip_xmls(zip_files or [])
+    chunks = iter(lambda: list(itertools.islice(xmls, chunk_size)), [])
+
+    total = 0
+    try:
+        with (
+            ProcessPoolExecutor(max_workers=max_workers) as executor,
+            pq.ParquetWriter(file_path, schema) as writer,
+        ):
+            # No máximo 2 blocos por processo em andamento, para que os .xml sejam lidos
+            # dos .zip só à medida que os atos são gravados
+            running = set()
+            batch = []
+            while True:
+                for chunk in itertools.islice(chunks, 2 * max_workers - len(running)):
+                    running.add(executor.submit(parse_acts, chunk))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for act in future.result():
+                        act["extracted_at"] = extracted_at
+                        batch.append(act)
+                if len(batch) >= batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    total += len(batch)
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                total += len(batch)
+    except Exception as exc:
+        log(f"⚠️ Erro ao processar os atos oficiais: {exc}", level="warning")
         return ""
 
+    if total == 0:
+        os.remove(file_path)
+        return ""
+
+    log(f"📁 Arquivo {file_name} salvo com {total} atos.")
+    return file_path
+
 
 @task
 def upload_to_datalake(parquet_path: str, dataset: str):
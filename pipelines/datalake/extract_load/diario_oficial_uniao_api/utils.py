@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura dos atos oficiais do INLABS.
+
+Este módulo só depende do lxml para que os processos que fazem o parsing
+dos atos sejam leves de iniciar.
+"""
+import zipfile
+from typing import Iterator
+
+import lxml.html
+from lxml import etree
+
+# Colunas do parquet gerado, na ordem em que são gravadas
+ACT_COLUMNS = [
+    "title",
+    "id",
+    "act_id",
+    "text_title",
+    "published_at",
+    "agency",
+    "text",
+    "url",
+    "number_page",
+    "edition",
+    "section",
+    "html",
+    "signatures",
+    "role",
+]
+
+
+def _with_class(root, class_name: str) -> list:
+    """Elementos HTML que têm `class_name` entre as suas classes."""
+    return root.xpath(f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]")
+
+
+def _text(element) -> str:
+    return "".join(element.itertext())
+
+
+def parse_act(xml_data: bytes) -> dict:
+    """Extrai as informações de um ato oficial em uma única passada pelo XML.
+
+    Args:
+        xml_data (bytes): Conteúdo do arquivo .xml do ato.
+
+    Returns:
+        dict: Informações do ato, com as chaves de `ACT_COLUMNS`.
+    """
+    root = etree.fromstring(xml_data)
+
+    article = next(root.iter("article"))
+    texto = next(root.iter("Texto"), None)
+    html = _text(texto) if texto is not None else ""
+
+    # O texto do ato é um HTML embutido no XML
+    soup_html = lxml.html.fragment_fromstring(html, create_parent="div")
+
+    return {
+        "title": " ".join(_text(title) for title in root.iter("Identifica")),
+        "id": article.get("id"),
+        "act_id": article.get("idOficio"),
+        "text_title": " ".join(
+            title.text_content() for title in _with_class(soup_html, "identifica")
+        ),
+        "published_at": article.get("pubDate"),
+        "agency": article.get("artCategory"),
+        "text": "\n".join(p.text_content() for p in soup_html.iter("p")),
+        "url": article.get("pdfPage"),
+        "number_page": article.get("numberPage"),
+        "edition": article.get("editionNumber"),
+        "section": article.get("pubName"),
+        "html": html,
+        "signatures": "/".join(sign.text_content() for sign in _with_class(soup_html, "assina")),
+        "role": " / ".join(cargo.text_content() for cargo in _with_class(soup_html, "cargo")),
+    }
+
+
+def parse_acts(xmls: list) -> list:
+    """Extrai as informações de um bloco de atos, para enviar vários por vez ao pool."""
+    return [parse_act(xml_data) for xml_data in xmls]
+
+
+def iter_zip_xmls(zip_files: list) -> Iterator[bytes]:
+    """Lê os arquivos .xml de cada .zip sem extraí-los para o disco.
+
+    Args:
+        zip_files (list): Caminhos dos arquivos .zip baixados.
+
+    Yields:
+        bytes: Conteúdo de cada arquivo .xml.
+    """
+    for zip_path in zip_files:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            for member in zip_ref.namelist():
+                if member.endswith(".xml"):
+                    yield zip_ref.read(member)
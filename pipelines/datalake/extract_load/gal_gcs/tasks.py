@@ -1,18 +1,27 @@
 # -*- coding: utf-8 -*-
 import fnmatch
-import json
 import os
+import shutil
+import uuid
 import zipfile
 from datetime import datetime, timedelta
 from typing import List
 
-import chardet
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytz
 from google.cloud import storage
 
+from pipelines.datalake.extract_load.gal_gcs.utils import (
+    detect_encoding,
+    iter_csv_batches,
+    pack_json,
+    read_header,
+)
 from pipelines.utils.credential_injector import authenticated_task as task
-from pipelines.utils.tasks import upload_df_to_datalake
+from pipelines.utils.logger import log
+from pipelines.utils.tasks import upload_to_datalake
 from pipelines.utils.time import from_relative_date
 
 
@@ -52,42 +61,87 @@ def process_file(gcs_bucket: str, gcs_file_path: str, dataset: str, table: str):
     # Download the file
     blob.download_to_filename(gcs_file_path)
 
-    # Unzip the file
+    loaded_at = datetime.now(pytz.UTC)
+    partition_date = loaded_at.strftime("%Y-%m-%d")
+    root_folder = f"./data/{uuid.uuid4()}"
+    partition_folder = os.path.join(
+        root_folder,
+        f"ano_particao={partition_date[:4]}/mes_particao={partition_date[5:7]}/"
+        f"data_particao={partition_date}",
+    )
+    os.makedirs(partition_folder, exist_ok=True)
+    parquet_path = os.path.join(partition_folder, f"{uuid.uuid4()}.parquet")
+
+    schema = pa.schema(
+        [(column, pa.string()) for column in ["data", "file_path", "row_number", "loaded_at"]]
+    )
+
+    # Read the CSV straight from the zip, without extracting it
     with zipfile.ZipFile(gcs_file_path, "r") as zip_ref:
-        zip_ref.extractall(os.path.dirname(gcs_file_path))
-
-    # List files in the directory ending with .csv
-    csv_files = [
-        os.path.join(os.path.dirname(gcs_file_path), f)
-        for f in os.listdir(os.path.dirname(gcs_file_path))
-        if f.endswith(".csv") and not f.startswith(".")
-    ]
-
-    # Discover the encoding of the file
-    with open(csv_files[0], "rb") as f:
-        raw_data = f.read()
-        encoding = chardet.detect(raw_data)["encoding"].lower()
-
-    # Read the file
-    df = pd.read_csv(csv_files[0], encoding=encoding, sep=";", dtype=str)
-
-    rows = []
-    for i, r in enumerate(df.to_dict(orient="records")):
-        rows.append(
-            {
-                "data": json.dumps(r, ensure_ascii=False),
-                "file_path": gcs_file_path,
-                "row_number": i + 1,
-                "loaded_at": datetime.now(pytz.UTC).isoformat(),
-            }
-        )
-
-    upload_df_to_datalake.run(
-        df=pd.DataFrame(rows),
-        table_id=table,
+        csv_member = sorted(
+            name
+            for name in zip_ref.namelist()
+            if name.endswith(".csv") and not os.path.basename(name).startswith(".")
+        )[0]
+
+        # Discover the encoding of the file from a sample of its first bytes
+        with zip_ref.open(csv_member) as f:
+            encoding = detect_encoding(f)
+        log(f"Encoding detected for {csv_member}: {encoding}")
+
+        for candidate in [encoding, "latin-1"]:
+            with zip_ref.open(csv_member) as f:
+                columns = read_header(f, encoding=candidate)
+
+            rows = 0
+            try:
+                with (
+                    zip_ref.open(csv_member) as f,
+                    pq.ParquetWriter(parquet_path, schema) as writer,
+                ):
+                    for batch in iter_csv_batches(f, columns, encoding=candidate):
+                        row_numbers = pa.array(
+                            range(rows + 1, rows + batch.num_rows + 1), pa.int64()
+                        ).cast(pa.string())
+                        writer.write_table(
+                            pa.Table.from_arrays(
+                                [
+                                    pack_json(batch),
+                                    pa.array([gcs_file_path] * batch.num_rows, pa.string()),
+                                    row_numbers,
+                                    pa.array([loaded_at.isoformat()] * batch.num_rows, pa.string()),
+                                ],
+                                schema=schema,
+                            )
+                        )
+                        rows += batch.num_rows
+                break
+            except (UnicodeDecodeError, pa.ArrowInvalid) as e:
+                # The sample may not show every non-ASCII byte of the file
+                if candidate == "latin-1" or (
+                    isinstance(e, pa.ArrowInvalid) and "UTF8" not in str(e)
+                ):
+                    raise
+                log(f"Could not decode {csv_member} as {candidate}; retrying as latin-1")
+
+    if rows == 0:
+        log(f"Dataframe vazio para {table}. Upload Ignorado", level="warning")
+        shutil.rmtree(root_folder)
+        return True
+
+    log(f"Uploading {rows} rows from {gcs_file_path}")
+    upload_to_datalake.run(
+        input_path=root_folder,
         dataset_id=dataset,
-        partition_column="loaded_at",
+        table_id=table,
+        dump_mode="append",
         source_format="parquet",
+        if_exists="replace",
+        if_storage_data_exists="replace",
+        biglake_table=True,
+        dataset_is_public=False,
+        exception_on_missing_input_file=True,
     )
+    shutil.rmtree(root_folder)
 
     return True
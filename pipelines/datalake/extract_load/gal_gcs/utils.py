@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import json
+from typing import IO, Iterator, List
+
+import chardet
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+# Valores lidos como nulos, os mesmos do `pd.read_csv`
+NULL_VALUES = pa_csv.ConvertOptions().null_values + ["<NA>", "None"]
+
+# Escapes do `json.dumps`, aplicados em ordem (a barra invertida precisa ser a primeira)
+JSON_ESCAPES = [
+    ("\\", "\\\\"),
+    ('"', '\\"'),
+    ("\n", "\\n"),
+    ("\r", "\\r"),
+    ("\t", "\\t"),
+    ("\b", "\\b"),
+    ("\f", "\\f"),
+]
+OTHER_CONTROL_CHARS = [chr(code) for code in range(0x20) if chr(code) not in "\n\r\t\b\f"]
+
+
+def detect_encoding(file: IO[bytes], sample_size: int = 1024 * 1024) -> str:
+    """
+    Detecta o encoding a partir dos primeiros `sample_size` bytes do arquivo.
+
+    Uma amostra só com ASCII é tratada como UTF-8, que é compatível.
+    """
+    detector = chardet.UniversalDetector()
+    read = 0
+    while read < sample_size and not detector.done:
+        chunk = file.read(min(64 * 1024, sample_size - read))
+        if not chunk:
+            break
+        detector.feed(chunk)
+        read += len(chunk)
+    detector.close()
+
+    encoding = (detector.result["encoding"] or "utf-8").lower()
+    return "utf-8" if encoding == "ascii" else encoding
+
+
+def read_header(file: IO[bytes], encoding: str, delimiter: str = ";") -> List[str]:
+    """Lê os nomes das colunas na primeira linha do CSV."""
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    return next(csv.reader(text, delimiter=delimiter))
+
+
+def iter_csv_batches(
+    file: IO[bytes], columns: List[str], encoding: str, delimiter: str = ";"
+) -> Iterator[pa.RecordBatch]:
+    """Lê o CSV em blocos, com todas as colunas como texto e sem carregar o arquivo inteiro."""
+    reader = pa_csv.open_csv(
+        file,
+        read_options=pa_csv.ReadOptions(
+            column_names=columns, skip_rows=1, encoding=encoding, block_size=16 * 1024 * 1024
+        ),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in columns},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    yield from reader
+
+
+def _json_string(values: pa.Array) -> pa.Array:
+    """Escapa e coloca entre aspas os textos, como o `json.dumps`; nulos viram `NaN`."""
+    for char, escaped in JSON_ESCAPES:
+        values = pc.replace_substring(values, char, escaped)
+
+    if pc.any(pc.match_substring_regex(values, "[\\x00-\\x1f]")).as_py():
+        for char in OTHER_CONTROL_CHARS:
+            values = pc.replace_substring(values, char, f"\\u{ord(char):04x}")
+
+    quoted = pc.binary_join_element_wise('"', values, '"', "")
+    return pc.if_else(pc.is_null(values), "NaN", quoted)
+
+
+def pack_json(batch: pa.RecordBatch) -> pa.Array:
+    """
+    Monta, para cada linha, o mesmo texto de `json.dumps(registro, ensure_ascii=False)`,
+    usando as funções vetorizadas do Arrow coluna a coluna.
+    """
+    if batch.num_columns == 0:
+        return pa.array(["{}"] * batch.num_rows, pa.string())
+
+    parts = []
+    for i, (name, column) in enumerate(zip(batch.schema.names, batch.columns)):
+        separator = "{" if i == 0 else ", "
+        parts.append(f"{separator}{json.dumps(name, ensure_ascii=False)}: ")
+        parts.append(_json_string(column))
+    parts.append("}")
+
+    return pc.binary_join_element_wise(*parts, "")
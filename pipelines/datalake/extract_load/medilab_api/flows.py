@@ -4,7 +4,7 @@
 medilab api flows
 """
 
-from prefect import Parameter, unmapped
+from prefect import Parameter, case, unmapped
 from prefect.executors import LocalDaskExecutor
 from prefect.run_configs import KubernetesRun
 from prefect.storage import GCS
@@ -13,6 +13,7 @@ from pipelines.constants import constants
 from pipelines.datalake.extract_load.medilab_api.constants import medilab_api_constants
 from pipelines.datalake.extract_load.medilab_api.tasks import (
     get_exams_list_and_results,
+    get_exams_list_and_results_batch,
     get_patient_code_from_bigquery,
 )
 from pipelines.utils.flow import Flow
@@ -33,6 +34,8 @@ with Flow(
     DT_START = Parameter("dt_start", default="2001-01-01")
     DT_END = Parameter("dt_end", default="2100-01-01")
     DATE_FILTER = Parameter("date_filter", default="2025-07-01")
+    BATCH_MODE = Parameter("batch_mode", default=True)
+    MAX_WORKERS = Parameter("max_workers", default=8)
 
     INFISICAL_PATH = medilab_api_constants.INFISICAL_PATH.value
 
@@ -57,17 +60,31 @@ with Flow(
 
     PATIENTS = get_patient_code_from_bigquery(date_filter=DATE_FILTER)
 
-    exam_results = get_exams_list_and_results.map(
-        api_url=unmapped(API_URL),
-        api_usuario=unmapped(API_USUARIO),
-        api_senha=unmapped(API_SENHA),
-        api_codacesso=unmapped(API_CODACESSO),
-        dt_start=unmapped(DT_START),
-        dt_end=unmapped(DT_END),
-        patientcode=PATIENTS,
-        output_dir=unmapped(OUTPUT_DIRECTORY),
-        bucket_name=unmapped(BUCKET_NAME),
-    )
+    with case(BATCH_MODE, True):
+        get_exams_list_and_results_batch(
+            api_url=API_URL,
+            api_usuario=API_USUARIO,
+            api_senha=API_SENHA,
+            api_codacesso=API_CODACESSO,
+            dt_start=DT_START,
+            dt_end=DT_END,
+            patientcodes=PATIENTS,
+            bucket_name=BUCKET_NAME,
+            max_workers=MAX_WORKERS,
+        )
+
+    with case(BATCH_MODE, False):
+        exam_results = get_exams_list_and_results.map(
+            api_url=unmapped(API_URL),
+            api_usuario=unmapped(API_USUARIO),
+            api_senha=unmapped(API_SENHA),
+            api_codacesso=unmapped(API_CODACESSO),
+            dt_start=unmapped(DT_START),
+            dt_end=unmapped(DT_END),
+            patientcode=PATIENTS,
+            output_dir=unmapped(OUTPUT_DIRECTORY),
+            bucket_name=unmapped(BUCKET_NAME),
+        )
 
 
 flow_medilab_api.storage = GCS(constants.GCS_FLOWS_BUCKET.value)
@@ -9,7 +9,9 @@ from pipelines.datalake.extract_load.medilab_api.utils import (
     get_study_list,
     get_study_report,
     get_token,
+    upload_base64_pdf,
 )
+from pipelines.utils.concurrency import build_session, thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 
@@ -72,6 +74,98 @@ def get_exams_list_and_results(
             log(f"Laudo uploaded successfully: gs://{gcs_bucket_name}/{blob_path}")
 
 
+@task(max_retries=2, retry_delay=timedelta(minutes=1))
+def get_exams_list_and_results_batch(
+    api_url,
+    api_usuario,
+    api_senha,
+    api_codacesso,
+    dt_start,
+    dt_end,
+    patientcodes,
+    bucket_name,
+    max_workers=8,
+):
+    """
+    Versão em lote de `get_exams_list_and_results`: autentica uma única vez, busca as
+    listas de exames e os laudos de todos os pacientes com até `max_workers` requisições
+    simultâneas e pula os laudos já presentes na pasta do dia com uma única listagem.
+
+    Falhas de pacientes ou laudos individuais não interrompem o lote; ao final, a task
+    falha se houver erros, e a nova tentativa só busca os laudos que ainda faltam.
+    """
+    storage_client = storage.Client()
+    bucket = storage_client.bucket(bucket_name)
+
+    study_date_str = datetime.now(pytz.timezone("America/Sao_Paulo")).strftime("%Y-%m-%d")
+    existing_blobs = {
+        blob.name for blob in storage_client.list_blobs(bucket_name, prefix=f"{study_date_str}/")
+    }
+    log(f"{len(existing_blobs)} laudos já existem em gs://{bucket_name}/{study_date_str}/")
+
+    session = build_session(pool_size=max_workers)
+    token = get_token(api_url, api_usuario, api_senha, api_codacesso, session=session)
+
+    def fetch_study_list(patientcode):
+        try:
+            return get_study_list(api_url, token, dt_start, dt_end, patientcode, session=session)
+        except Exception as e:
+            log(f"Erro ao listar exames do paciente {patientcode}: {e}", level="warning")
+            return e
+
+    errors = 0
+    pending_reports = []
+    for patientcode, study_list_data in zip(
+        patientcodes, thread_map(fetch_study_list, patientcodes, max_workers=max_workers)
+    ):
+        if isinstance(study_list_data, Exception):
+            errors += 1
+            continue
+
+        if "studies" not in study_list_data or not study_list_data["studies"]:
+            log(f"No 'studies' found or list is empty for patient {patientcode}", level="warning")
+            continue
+
+        for study in study_list_data["studies"]:
+            if "accessionNumber" not in study or not study["accessionNumber"]:
+                log(f"Study for patient {patientcode} missing 'accessionNumber'", level="warning")
+                continue
+
+            accession_number = study["accessionNumber"]
+            blob_path = f"{study_date_str}/laudo_{patientcode}_{accession_number}.pdf"
+
+            if blob_path in existing_blobs:
+                continue
+
+            existing_blobs.add(blob_path)
+            pending_reports.append((patientcode, accession_number, blob_path))
+
+    log(f"{len(pending_reports)} laudos a baixar")
+
+    def fetch_and_upload_report(pending_report):
+        patientcode, accession_number, blob_path = pending_report
+        try:
+            report_data = get_study_report(api_url, token, accession_number, session=session)
+
+            if "arquivo" not in report_data or not report_data["arquivo"]:
+                log(f"No 'arquivo' (base64 data) found for patient {patientcode}", level="warning")
+                return True
+
+            upload_base64_pdf(bucket, blob_path, report_data["arquivo"])
+            return True
+        except Exception as e:
+            log(f"Erro ao baixar o laudo {accession_number}: {e}", level="warning")
+            return False
+
+    results = thread_map(fetch_and_upload_report, pending_reports, max_workers=max_workers)
+    errors += results.count(False)
+
+    log(f"{results.count(True)} laudos processados em gs://{bucket_name}/{study_date_str}/")
+
+    if errors:
+        raise RuntimeError(f"{errors} pacientes ou laudos falharam na extração da Medilab")
+
+
 @task(max_retries=2, retry_delay=timedelta(minutes=1))
 def get_patient_code_from_bigquery(date_filter: str) -> list:
     query = f"""
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import base64
+
 import requests
 from tenacity import (
     retry,
@@ -7,14 +9,16 @@ from tenacity import (
     wait_exponential,
 )
 
+from pipelines.utils.googleutils import abort_blob_writer
+
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=30, max=120),
     retry=retry_if_exception_type(Exception),
 )
-def get_token(api_url, usuario, senha, codacesso):
-    response = requests.post(
+def get_token(api_url, usuario, senha, codacesso, session=None):
+    response = (session or requests).post(
         url=f"{api_url}/medisaudeapi/v1/getToken",
         json={"usuario": usuario, "senha": senha, "codacesso": codacesso},
     )
@@ -27,8 +31,8 @@ def get_token(api_url, usuario, senha, codacesso):
     wait=wait_exponential(multiplier=1, min=30, max=120),
     retry=retry_if_exception_type(Exception),
 )
-def get_study_list(api_url, token, dt_start, dt_end, patientcode):
-    response = requests.post(
+def get_study_list(api_url, token, dt_start, dt_end, patientcode, session=None):
+    response = (session or requests).post(
         url=f"{api_url}/medisaudeapi/v1/getStudyList",
         json={
             "requestToken": token,
@@ -46,8 +50,8 @@ def get_study_list(api_url, token, dt_start, dt_end, patientcode):
     wait=wait_exponential(multiplier=1, min=30, max=120),
     retry=retry_if_exception_type(Exception),
 )
-def get_study_report(api_url, token, accession_number):
-    response = requests.post(
+def get_study_report(api_url, token, accession_number, session=None):
+    response = (session or requests).post(
         url=f"{api_url}/medisaudeapi/v1/getStudyReport",
         json={
             "requestToken": token,
@@ -56,3 +60,26 @@ def get_study_report(api_url, token, accession_number):
     )
     response.raise_for_status()
     return response.json()
+
+
+def upload_base64_pdf(bucket, blob_path, arquivo_b64, chunk_size=4 * 1024 * 1024):
+    """
+    Decodifica o PDF em base64 em blocos e grava cada bloco direto no blob,
+    sem montar o arquivo decodificado inteiro em memória.
+    """
+    # blocos múltiplos de 4 caracteres decodificam de forma independente, desde que
+    # nenhum espaço ou quebra de linha desalinhe os blocos
+    chunk_size -= chunk_size % 4
+    arquivo_b64 = "".join(arquivo_b64.split())
+
+    blob = bucket.blob(blob_path)
+    # Sem `with`: o `close` finalizaria o objeto mesmo após um erro, e o laudo truncado
+    # seria ignorado pela próxima tentativa por já existir no bucket
+    writer = blob.open("wb", content_type="application/pdf")
+    try:
+        for start in range(0, len(arquivo_b64), chunk_size):
+            writer.write(base64.b64decode(arquivo_b64[start : start + chunk_size]))
+        writer.close()
+    except BaseException:
+        abort_blob_writer(writer)
+        raise
@@ -28,7 +28,7 @@ from pipelines.utils.credential_injector import (
     authenticated_create_flow_run as create_flow_run,
 )
 from pipelines.utils.credential_injector import (
-    authenticated_wait_for_flow_run as wait_for_flow_run,
+    authenticated_wait_for_flow_runs as wait_for_flow_runs,
 )
 from pipelines.utils.flow import Flow
 from pipelines.utils.prefect import get_current_flow_labels
@@ -242,19 +242,19 @@ with Flow(
     )
 
     # 2.4 Acompanhar cada operator Openbase pelo wait_for_flow
-    wait_for_openbase_runs = wait_for_flow_run.map(
-        flow_run_id=created_openbase_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(True),
+    wait_for_openbase_runs = wait_for_flow_runs(
+        flow_run_ids=created_openbase_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=True,
     )
 
     # 2.5 Acompanhar cada operator Postgres pelo wait_for_flow
-    wait_for_postgres_runs = wait_for_flow_run.map(
-        flow_run_id=created_postgres_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(True),
+    wait_for_postgres_runs = wait_for_flow_runs(
+        flow_run_ids=created_postgres_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=True,
     )
 
 
@@ -7,7 +7,6 @@ from prefect import Parameter
 from prefect.executors import LocalDaskExecutor
 from prefect.run_configs import KubernetesRun
 from prefect.storage import GCS
-from prefect.utilities.edges import unmapped
 
 # Internos
 from prefeitura_rio.pipelines_utils.custom import Flow
@@ -16,13 +15,10 @@ from pipelines.constants import constants
 from pipelines.datalake.extract_load.ser_metabase.schedules import schedule
 from pipelines.datalake.extract_load.ser_metabase.tasks import (
     authenticate_in_metabase,
-    calculate_slices,
+    extract_slices_to_datalake,
     get_extraction_datetime,
-    query_database_slice,
     query_slice_limit,
-    upload_df_to_datalake_wrapper,
 )
-from pipelines.datalake.utils.tasks import handle_columns_to_bq
 from pipelines.utils.state_handlers import handle_flow_state_change
 from pipelines.utils.tasks import get_secret_key
 
@@ -53,6 +49,7 @@ with Flow(
 
     # SLICING -------------------------------
     SLICE_SIZE = Parameter("slice_size", default=900_000, required=False)
+    MAX_WORKERS = Parameter("max_workers", default=4, required=False)
 
     # CREDENTIALS ------------------------------
     user = get_secret_key(environment=ENVIRONMENT, secret_name="USER", secret_path="/metabase")
@@ -85,52 +82,23 @@ with Flow(
         date_end=DATE_END,
     )
 
-    # Task 4 - Calculate list of inital values for each slice
-    slices_min = calculate_slices(
-        token=token,
-        database_id=DATABASE_ID,
-        table_id=TABLE_ID,
-        min_value=min_value,
-        max_value=max_value,
-        which="min",
-        slice_size=SLICE_SIZE,
-        date_start=DATE_START,
-        date_end=DATE_END,
-    )
-    # Task 5 - Calculate list of final values for each slice
-    slices_max = calculate_slices(
+    # Task 4 - Extraction timestamp
+    extraction_date = get_extraction_datetime()
+
+    # Task 5 - Queries the data in adaptive slices and uploads it to Big Query
+    extract_slices_to_datalake(
         token=token,
         database_id=DATABASE_ID,
         table_id=TABLE_ID,
         min_value=min_value,
         max_value=max_value,
-        which="max",
         slice_size=SLICE_SIZE,
+        extraction_date=extraction_date,
+        bq_dataset_id=BQ_DATASET_ID,
+        bq_table_id=BQ_TABLE_ID,
         date_start=DATE_START,
         date_end=DATE_END,
-    )
-
-    # Task 6 - Queries the data for each slice determined
-    extraction_date = get_extraction_datetime()
-
-    # Task 7 - Queries the data for each slice determined
-    dfs = query_database_slice.map(
-        token=unmapped(token),
-        database_id=unmapped(DATABASE_ID),
-        table_id=unmapped(TABLE_ID),
-        extraction_date=unmapped(extraction_date),
-        slice_min=slices_min,
-        slice_max=slices_max,
-    )
-
-    # Task 8 - Transform Data Frame columns
-    dfs_columns_ok = handle_columns_to_bq.map(df=dfs)
-
-    # Task 9 - Upload to Big Query
-    upload_df_to_datalake_wrapper.map(
-        df=dfs_columns_ok,
-        table_id=unmapped(BQ_TABLE_ID),
-        dataset_id=unmapped(BQ_DATASET_ID),
+        max_workers=MAX_WORKERS,
     )
 
 # ------------------------------------
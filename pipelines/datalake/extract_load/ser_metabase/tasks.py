@@ -2,23 +2,38 @@
 """
 Tasks
 """
+import csv
 import io
 import json
+import os
 
 # Geral
 import re
+import shutil
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from typing import Literal
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import requests
 
 # Internos
 from prefeitura_rio.pipelines_utils.logging import log
+from requests.adapters import HTTPAdapter
 
 from pipelines.datalake.extract_load.ser_metabase.constants import QUERY_COLUMNS
+from pipelines.utils.concurrency import with_prefect_context
 from pipelines.utils.credential_injector import authenticated_task as task
-from pipelines.utils.tasks import upload_df_to_datalake
+from pipelines.utils.data_cleaning import remove_columns_accents
+from pipelines.utils.tasks import upload_to_datalake
+
+METABASE_CSV_URL = "https://metabase.saude.rj.gov.br/api/dataset/csv"
+# Número máximo de linhas devolvidas pelo Metabase em uma exportação
+METABASE_ROW_LIMIT = 1_000_000
 
 
 @task(max_retries=3, retry_delay=timedelta(minutes=5))
@@ -36,22 +51,15 @@ def authenticate_in_metabase(user: str, password: str) -> str:
     return token
 
 
-@task(max_retries=3, retry_delay=timedelta(minutes=5))
-def query_slice_limit(
-    token: str,
-    database_id: int,
-    table_id: int,
-    which: Literal["min", "max"],
-    date_start: str | None,
-    date_end: str | None,
-) -> int | datetime:
-    column_id = QUERY_COLUMNS[database_id][table_id]["slice_column"]
+def build_date_filter(
+    database_id: int, table_id: int, date_start: str | None, date_end: str | None
+) -> list:
+    """
+    Monta o filtro do Metabase para `date_start` <= data < `date_end` na coluna
+    de data da tabela; limites `None` são ignorados
+    """
     date_column = QUERY_COLUMNS[database_id][table_id]["date_column"]
 
-    log(f"Consultando {which!r} na tabela '{table_id}'" f"e banco '{database_id}'")
-    url = "https://metabase.saude.rj.gov.br/api/dataset/csv"
-    headers = {"X-Metabase-Session": token, "Content-Type": "application/x-www-form-urlencoded"}
-
     if date_start is not None and date_end is not None:
         filter = [
             "and",
@@ -65,6 +73,23 @@ def query_slice_limit(
     else:
         filter = []
 
+    return filter
+
+
+@task(max_retries=3, retry_delay=timedelta(minutes=5))
+def query_slice_limit(
+    token: str,
+    database_id: int,
+    table_id: int,
+    which: Literal["min", "max"],
+    date_start: str | None,
+    date_end: str | None,
+) -> int | datetime:
+    column_id = QUERY_COLUMNS[database_id][table_id]["slice_column"]
+
+    log(f"Consultando {which!r} na tabela '{table_id}'" f"e banco '{database_id}'")
+    headers = {"X-Metabase-Session": token, "Content-Type": "application/x-www-form-urlencoded"}
+
     dataset_query = {
         "type": "query",
         "database": database_id,
@@ -73,14 +98,14 @@ def query_slice_limit(
             "aggregation": [
                 [which, ["+", ["-", ["field", column_id, {"base-type": "type/Text"}], 1], 1]]
             ],
-            "filter": filter,
+            "filter": build_date_filter(database_id, table_id, date_start, date_end),
         },
         "parameters": [],
     }
 
     form_data = {"query": json.dumps(dataset_query, ensure_ascii=False)}
 
-    response = requests.post(url, headers=headers, data=form_data, verify=False)
+    response = requests.post(METABASE_CSV_URL, headers=headers, data=form_data, verify=False)
 
     res = int(re.search(r"\n(\d+)", response.text).group(1))
     log(f"O valor {which!r} para a coluna usada é '{res}'")
@@ -88,96 +113,42 @@ def query_slice_limit(
     return res
 
 
-@task(max_retries=3, retry_delay=timedelta(minutes=5))
-def calculate_slices(
-    token: str,
-    table_id: int,
-    database_id: int,
-    min_value,
-    max_value,
-    which: Literal["min", "max"],
-    slice_size: int,
-    date_start: str | None,
-    date_end: str | None,
-) -> list[int]:
+class IterStream(io.RawIOBase):
     """
-    Calcula os intervalos de busca para que não passe de
-    `slice_size` registros e retorna uma lista de inteiros
-    baseados no valor de `which`
+    Arquivo somente leitura sobre um iterador de bytes, usado para ler a resposta
+    HTTP aos poucos. Ao contrário de `response.raw`, continua aberto até ser lido
+    por completo e já entrega o conteúdo descomprimido.
     """
-    if not QUERY_COLUMNS[database_id][table_id]["slice_column_unique"]:
-        log(f"Realizando contagem da tabela '{table_id}' " f"e banco '{database_id}'")
-        url = "https://metabase.saude.rj.gov.br/api/dataset/csv"
-        headers = {"X-Metabase-Session": token, "Content-Type": "application/x-www-form-urlencoded"}
-        date_column = QUERY_COLUMNS[database_id][table_id]["date_column"]
 
-        if date_start is not None and date_end is not None:
-            filter = [
-                "and",
-                [">=", ["field", date_column, {"base-type": "type/DateTime"}], f"{date_start}"],
-                ["<", ["field", date_column, {"base-type": "type/DateTime"}], f"{date_end}"],
-            ]
-        elif date_start is not None:
-            filter = [">=", ["field", date_column, {"base-type": "type/DateTime"}], f"{date_start}"]
-        elif date_end is not None:
-            filter = ["<", ["field", date_column, {"base-type": "type/DateTime"}], f"{date_end}"]
-        else:
-            filter = []
-
-        dataset_query = {
-            "type": "query",
-            "database": database_id,
-            "query": {
-                "source-table": table_id,
-                "aggregation": [["count"]],
-                "filter": filter,
-            },
-            "parameters": [],
-        }
-
-        form_data = {"query": json.dumps(dataset_query, ensure_ascii=False)}
-
-        response = requests.post(url, headers=headers, data=form_data, verify=False)
-
-        count = int(re.search(r"\n(\d+)", response.text).group(1))
-        lines_per_id = count // slice_size
-
-        slice_size /= lines_per_id
-        slice_size = int(slice_size)
-
-        log(f"Este dataset possui {count} linhas e uma relação de " f"{lines_per_id} linhas por id")
-
-    slices = [
-        i + (0 if which == "min" else slice_size) for i in range(min_value, max_value, slice_size)
-    ]
-    log(f"Contagem de slices gerados: {len(slices)}")
-    return slices
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = b""
 
+    def readable(self) -> bool:
+        return True
 
-@task(max_retries=3, retry_delay=timedelta(minutes=5))
-def query_database_slice(
-    token: str,
-    database_id: int,
-    table_id: int,
-    slice_min: int | str,
-    slice_max: int | str,
-    extraction_date: datetime,
-) -> pd.DataFrame:
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, b"")
+            if not self._buffer:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def build_slice_query(
+    database_id: int, table_id: int, slice_min: int | str, slice_max: int | str
+) -> dict:
     """
-    Faz a consulta ao metabase no intervalo ditado por `slice_min` e
-    `slice_max`
+    Monta a consulta do Metabase para as linhas em que
+    `slice_min` <= valor < `slice_max` na coluna de slice da tabela
     """
     column_id = QUERY_COLUMNS[database_id][table_id]["slice_column"]
     column_type = QUERY_COLUMNS[database_id][table_id]["slice_column_type"]
 
-    log(
-        f"Iniciando consulta ao banco de dados. Database ID: {database_id}, "
-        f"Table ID: {table_id}, onde: {slice_min} <= valor < {slice_max}"
-    )
-    url = "https://metabase.saude.rj.gov.br/api/dataset/csv"
-    headers = {"X-Metabase-Session": token, "Content-Type": "application/x-www-form-urlencoded"}
-
-    dataset_query = {
+    return {
         "type": "query",
         "database": database_id,
         "query": {
@@ -199,40 +170,228 @@ def query_database_slice(
         "parameters": [],
     }
 
+
+def count_rows(
+    session: requests.Session,
+    database_id: int,
+    table_id: int,
+    date_start: str | None,
+    date_end: str | None,
+) -> int:
+    """
+    Conta as linhas da tabela no intervalo de datas
+    """
+    dataset_query = {
+        "type": "query",
+        "database": database_id,
+        "query": {
+            "source-table": table_id,
+            "aggregation": [["count"]],
+            "filter": build_date_filter(database_id, table_id, date_start, date_end),
+        },
+        "parameters": [],
+    }
     form_data = {"query": json.dumps(dataset_query, ensure_ascii=False)}
 
-    response = requests.post(url, headers=headers, data=form_data, verify=False)
-    csv_file = io.StringIO(response.content.decode("utf-8"))
+    response = session.post(METABASE_CSV_URL, data=form_data)
+    response.raise_for_status()
+
+    return int(re.search(r"\n(\d+)", response.text).group(1))
+
 
-    df = pd.read_csv(csv_file)
+def stream_slice_to_parquet(
+    session: requests.Session,
+    database_id: int,
+    table_id: int,
+    slice_min: int,
+    slice_max: int,
+    extraction_date: datetime,
+    output_path: str,
+    row_cap: int,
+) -> int | None:
+    """
+    Exporta um slice como CSV e grava a resposta em Parquet à medida que ela chega,
+    sem carregar o slice inteiro em memória. Todas as colunas são gravadas como texto,
+    como em `upload_df_to_datalake`.
 
-    df["data_extracao"] = extraction_date
+    Retorna o número de linhas gravadas, ou `None` se o slice atingiu `row_cap`
+    (limite de linhas do Metabase) e precisa ser dividido.
+    """
+    dataset_query = build_slice_query(database_id, table_id, slice_min, slice_max)
+    form_data = {"query": json.dumps(dataset_query, ensure_ascii=False)}
 
-    if len(df) == 1_000_000:
-        log("Consulta possivelmente truncada")
-        raise Exception("Consulta possivelmente truncada")
+    with session.post(METABASE_CSV_URL, data=form_data, stream=True) as response:
+        response.raise_for_status()
+        stream = io.BufferedReader(
+            IterStream(response.iter_content(chunk_size=1024 * 1024)), buffer_size=1024 * 1024
+        )
 
-    log("Consulta ao banco de dados concluída.")
+        header = stream.readline().decode("utf-8")
+        # Sem cabeçalho ou sem linhas após o cabeçalho: slice vazio
+        if not header.strip() or not stream.peek(1):
+            return 0
+
+        columns = next(csv.reader([header]))
+        names = remove_columns_accents(pd.DataFrame(columns=columns))
+        schema = pa.schema([(name, pa.string()) for name in names + ["data_extracao"]])
+        extraction_column = str(extraction_date)
+
+        reader = pa_csv.open_csv(
+            stream,
+            read_options=pa_csv.ReadOptions(column_names=names, block_size=8 * 1024 * 1024),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in names}
+            ),
+        )
 
-    return df
+        rows = 0
+        with pq.ParquetWriter(output_path, schema) as writer:
+            for batch in reader:
+                rows += batch.num_rows
+                if rows >= row_cap:
+                    break
+                extraction = pa.array([extraction_column] * batch.num_rows, pa.string())
+                writer.write_batch(
+                    pa.RecordBatch.from_arrays(batch.columns + [extraction], schema=schema)
+                )
 
+    if rows >= row_cap or rows == 0:
+        os.remove(output_path)
 
-@task
-def get_extraction_datetime() -> datetime:
-    return datetime.now()
+    return None if rows >= row_cap else rows
 
 
-@task
-def upload_df_to_datalake_wrapper(
-    df: pd.DataFrame,
-    table_id: str,
-    dataset_id: str,
+@task(max_retries=3, retry_delay=timedelta(minutes=5))
+def extract_slices_to_datalake(
+    token: str,
+    database_id: int,
+    table_id: int,
+    min_value: int,
+    max_value: int,
+    slice_size: int,
+    extraction_date: datetime,
+    bq_dataset_id: str,
+    bq_table_id: str,
+    date_start: str | None = None,
+    date_end: str | None = None,
+    max_workers: int = 4,
+    row_cap: int = METABASE_ROW_LIMIT,
 ):
-    if not df.empty:
-        upload_df_to_datalake.run(
-            df=df,
+    """
+    Extrai a tabela em slices da coluna de slice, de `min_value` a `max_value`,
+    e carrega o resultado no datalake.
+
+    O tamanho dos slices se adapta durante a extração: cada slice novo é dimensionado
+    para ter cerca de `slice_size` linhas segundo a densidade (linhas por valor) do
+    último slice concluído, então regiões esparsas geram slices maiores e regiões densas
+    geram slices menores. Um slice que atinge `row_cap` linhas é dividido ao meio e
+    consultado novamente. Até `max_workers` slices são consultados ao mesmo tempo,
+    todos com a mesma sessão autenticada.
+    """
+    session = requests.Session()
+    session.verify = False
+    session.headers.update(
+        {"X-Metabase-Session": token, "Content-Type": "application/x-www-form-urlencoded"}
+    )
+    session.mount("https://", HTTPAdapter(pool_maxsize=max_workers))
+
+    extraction_day = extraction_date.strftime("%Y-%m-%d")
+    root_folder = f"./data/{uuid.uuid4()}"
+    partition_folder = os.path.join(
+        root_folder,
+        f"ano_particao={extraction_day[:4]}/mes_particao={extraction_day[5:7]}/"
+        f"data_particao={extraction_day}",
+    )
+    os.makedirs(partition_folder, exist_ok=True)
+
+    def run_slice(bounds: tuple) -> int | None:
+        slice_min, slice_max = bounds
+        log(f"Consultando slice: {slice_min} <= valor < {slice_max}")
+        return stream_slice_to_parquet(
+            session=session,
+            database_id=database_id,
             table_id=table_id,
-            dataset_id=dataset_id,
-            partition_column="data_extracao",
-            source_format="parquet",
+            slice_min=slice_min,
+            slice_max=slice_max,
+            extraction_date=extraction_date,
+            output_path=os.path.join(partition_folder, f"{slice_min}_{slice_max}.parquet"),
+            row_cap=row_cap,
         )
+
+    end = max_value + 1
+    cursor = min_value
+    # Tamanho do primeiro slice: colunas únicas têm no máximo uma linha por valor;
+    # nas demais, usamos a densidade média da tabela
+    width = slice_size
+    if not QUERY_COLUMNS[database_id][table_id]["slice_column_unique"]:
+        count = count_rows(session, database_id, table_id, date_start, date_end)
+        density = count / (end - min_value)
+        log(f"Este dataset possui {count} linhas e {density:.2f} linhas por valor")
+        width = max(1, int(slice_size / density)) if density else end - min_value
+    split_slices = []
+    total_rows = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        run_slice = with_prefect_context(run_slice)
+        running = {}
+
+        while running or split_slices or cursor < end:
+            while len(running) < max_workers and (split_slices or cursor < end):
+                if split_slices:
+                    bounds = split_slices.pop()
+                else:
+                    bounds = (cursor, min(cursor + width, end))
+                    cursor = bounds[1]
+                running[executor.submit(run_slice, bounds)] = bounds
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                slice_min, slice_max = running.pop(future)
+                rows = future.result()
+                slice_width = slice_max - slice_min
+
+                if rows is None:
+                    if slice_width <= 1:
+                        raise Exception(
+                            f"Slice {slice_min} <= valor < {slice_max} tem mais de "
+                            f"{row_cap} linhas e não pode ser dividido"
+                        )
+                    log(f"Slice {slice_min} <= valor < {slice_max} truncado; dividindo")
+                    middle = slice_min + slice_width // 2
+                    split_slices.extend([(slice_min, middle), (middle, slice_max)])
+                    width = min(width, max(slice_width // 2, 1))
+                    continue
+
+                total_rows += rows
+                # Ajusta o próximo slice pela densidade observada, crescendo no máximo 4x
+                density = rows / slice_width
+                target_width = int(slice_size / density) if density else slice_width * 4
+                width = max(1, min(target_width, slice_width * 4))
+
+    log(f"Extração concluída: {total_rows} linhas")
+
+    if total_rows == 0:
+        log(f"Nenhuma linha extraída para {bq_table_id}. Upload ignorado", level="warning")
+        shutil.rmtree(root_folder)
+        return
+
+    upload_to_datalake.run(
+        input_path=root_folder,
+        dataset_id=bq_dataset_id,
+        table_id=bq_table_id,
+        dump_mode="append",
+        source_format="parquet",
+        if_exists="replace",
+        if_storage_data_exists="replace",
+        biglake_table=True,
+        dataset_is_public=False,
+        exception_on_missing_input_file=True,
+    )
+
+    shutil.rmtree(root_folder)
+
+
+@task
+def get_extraction_datetime() -> datetime:
+    return datetime.now()
@@ -8,3 +8,7 @@ class constants(Enum):
     INFISICAL_PATH = "/siclom"
     APY_KEY = "X-API-KEY"
     URL = "URL"
+
+    # Endpoint paginado de PrEP
+    PREP_PAGE_SIZE = 50
+    PREP_MAX_WORKERS = 8
@@ -5,19 +5,25 @@ import pytz
 import requests
 from google.cloud import bigquery
 from pandas import DataFrame, DateOffset
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from pipelines.datalake.extract_load.siclom_api.constants import constants
+from pipelines.utils.concurrency import build_session, thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 
+# Retentativas das requisições à API do SICLOM
+RETRIES = Retry(total=2, backoff_factor=1, status_forcelist=[502, 503, 504, 104])
 
-def make_request(url: str, headers: dict) -> requests.Response | None:
-    """Faz requisição para uma API utilizando o método GET."""
-    session = requests.Session()
-    retries = Retry(total=2, backoff_factor=1, status_forcelist=[502, 503, 504, 104])
-    session.mount("https://", HTTPAdapter(max_retries=retries))
+
+def make_request(
+    url: str, headers: dict, session: requests.Session | None = None
+) -> requests.Response | None:
+    """Faz requisição para uma API utilizando o método GET.
+
+    Se `session` não for informada, uma sessão nova é criada para a requisição.
+    """
+    session = session or build_session(max_retries=RETRIES)
     try:
         response = session.get(url=url, headers=headers)
     except requests.exceptions.RequestException:
@@ -89,52 +95,57 @@ def get_siclom_period_data(base_url: str, endpoint: str, api_key: str, period: s
             response.raise_for_status()
     else:
         return get_siclom_prep_data.run(
-            base_url=base_url, 
-            endpoint=endpoint, 
-            api_key=api_key, 
-            period=period
+            base_url=base_url, endpoint=endpoint, api_key=api_key, period=period
         )
 
 
 @task
-def get_siclom_prep_data(base_url: str, endpoint: str, api_key: str, period: str) -> DataFrame:
+def get_siclom_prep_data(
+    base_url: str,
+    endpoint: str,
+    api_key: str,
+    period: str,
+    page_size: int = constants.PREP_PAGE_SIZE.value,
+    max_workers: int = constants.PREP_MAX_WORKERS.value,
+) -> DataFrame:
     """Faz a requisição para a API do SICLOM utilizando a busca por mês e ano para dados de PREP.
     Este endpoint é paginado e possui uma lógica de extração diferente dos demais, por isso foi necessário criar uma task específica para ele.
+
+    A primeira página informa o total de páginas (`pageCount`); as demais são buscadas em
+    paralelo, com até `max_workers` requisições simultâneas sobre uma mesma sessão, e montadas
+    na ordem das páginas.
     """
     log(f"Buscando dados de PREP de {period}...")
 
     headers = {"Accept": "application/json", "X-API-KEY": api_key}
+    session = build_session(pool_size=max_workers, max_retries=RETRIES)
+
+    def get_page(page_number: int) -> dict | None:
+        url = f"{base_url}{endpoint}{period}?page={page_number}&numItemsPerPage={page_size}"
+        response = make_request(url=url, headers=headers, session=session)
+        if not response or response.status_code != 200:
+            return None
+        return response.json().get("resultado")
+
+    first_page = get_page(1)
+    if not first_page:
+        log("Nenhum dado retornado para o período solicitado.")
+        return DataFrame()
 
-    url = f"{base_url}{endpoint}{period}?page=1&numItemsPerPage=50"
-    extracted_data = []
-    response = make_request(url=url, headers=headers)
+    extracted_data = list(first_page["items"])
+    page_count = first_page.get("pageCount") or 1
+    log(f"Iniciando extração de {page_count} páginas...")
 
-    if not response:
-        return DataFrame()
-    else:
-        payload = response.json()
-        if "resultado" not in payload:
-            log("Nenhum dado retornado para o período solicitado.")
-            return DataFrame()
-        page = payload["resultado"]
+    page_numbers = list(range(2, page_count + 1))
+    pages = thread_map(get_page, page_numbers, max_workers=max_workers)
+
+    failed_pages = [number for number, page in zip(page_numbers, pages) if page is None]
+    if failed_pages:
+        raise Exception(f"Falha ao extrair as páginas {failed_pages} de {page_count} ({period}).")
+
+    for page in pages:
         extracted_data.extend(page["items"])
-        next = page["next"]
-        log("Iniciando extração por paginação...")
-        while next:
-            log(f'Extraindo página {page["current"]}/{page["pageCount"]}...')
-            url = f"{base_url}{endpoint}{period}?page={next}&numItemsPerPage=50"
-            response = make_request(url=url, headers=headers)
-            if not response or response.status_code != 200:
-                break
-            payload = response.json()
-            if "resultado" not in payload:
-                break
-            page = payload["resultado"]
-            extracted_data.extend(page["items"])
-            if "next" in page:
-                next = page["next"]
-            else:
-                break
+
     df = DataFrame(extracted_data)
     df["extracted_at"] = datetime.now(pytz.timezone("America/Sao_Paulo")).strftime(
         "%Y-%m-%d %H:%M:%S"
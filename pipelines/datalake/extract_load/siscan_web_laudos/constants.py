@@ -9,5 +9,6 @@ CONFIG = {
     "partition_column": "data_extracao",
     "source_format": "parquet",
     "num_workers": 3,
+    "num_sessions": 1,
     "output_dir": ".",
 }
@@ -30,7 +30,7 @@ from pipelines.utils.credential_injector import (
     authenticated_create_flow_run as create_flow_run,
 )
 from pipelines.utils.credential_injector import (
-    authenticated_wait_for_flow_run as wait_for_flow_run,
+    authenticated_wait_for_flow_runs as wait_for_flow_runs,
 )
 
 # internos
@@ -66,6 +66,7 @@ with Flow(
     OPCAO_EXAME = Parameter("opcao_exame", default="mamografia")
     DATA_INICIAL = Parameter("data_inicial", default="01/01/2025")
     DATA_FINAL = Parameter("data_final", default="31/01/2025")
+    NUM_SESSIONS = Parameter("num_sessions", default=CONFIG["num_sessions"])
 
     # PARAMETROS BQ ----------------------------------
     BQ_DATASET = Parameter("bq_dataset", default="brutos_siscan_web")
@@ -82,6 +83,7 @@ with Flow(
         start_date=DATA_INICIAL,
         end_date=DATA_FINAL,
         output_dir=CONFIG["output_dir"],
+        num_sessions=NUM_SESSIONS,
     )
 
     any_records = check_records(file_path=raw_files)
@@ -171,11 +173,11 @@ with Flow(
         run_name=unmapped(None),
     )
 
-    wait_for_operator_runs = wait_for_flow_run.map(
-        flow_run_id=created_operator_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(True),
+    wait_for_operator_runs = wait_for_flow_runs(
+        flow_run_ids=created_operator_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=True,
     )
 
 with Flow(
@@ -243,11 +245,11 @@ with Flow(
         run_name=unmapped(None),
     )
 
-    wait_for_operator_runs = wait_for_flow_run.map(
-        flow_run_id=created_operator_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(True),
+    wait_for_operator_runs = wait_for_flow_runs(
+        flow_run_ids=created_operator_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=True,
     )
 
 
@@ -3,10 +3,15 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
 
 from prefeitura_rio.pipelines_utils.logging import log
 
+from pipelines.utils.concurrency import thread_map
+
+_FORMATO_DATA = "%d/%m/%Y"
+
 
 class ScraperError(RuntimeError):
     """Erro de alto nível do scraper."""
@@ -22,38 +27,88 @@ from .patients import iterate_patients  # noqa: E402
 __all__ = ["ScraperError", "run_scraper"]
 
 
-def run_scraper(
+def _dividir_periodo(start_date: str, end_date: str, partes: int) -> List[Tuple[str, str]]:
+    """Divide o período ``dd/mm/YYYY`` em até ``partes`` janelas disjuntas e contíguas."""
+    inicio = datetime.strptime(start_date, _FORMATO_DATA)
+    fim = datetime.strptime(end_date, _FORMATO_DATA)
+    total_dias = (fim - inicio).days + 1
+    partes = max(1, min(partes, total_dias))
+
+    janelas = []
+    for parte in range(partes):
+        janela_inicio = inicio + timedelta(days=parte * total_dias // partes)
+        janela_fim = inicio + timedelta(days=(parte + 1) * total_dias // partes - 1)
+        janelas.append((janela_inicio.strftime(_FORMATO_DATA), janela_fim.strftime(_FORMATO_DATA)))
+    return janelas
+
+
+def _executar_sessao(
     email: str,
     password: str,
     opcao_exame: str,
     start_date: str,
     end_date: str,
-    *,
-    headless: bool | None = None,
+    headless: bool | None,
 ) -> List[Dict[str, Any]]:
-    """Fluxo de ponta a ponta que devolve lista de laudos em dicionários."""
-    log(f"Iniciando scraper com opcao_exame={opcao_exame}, período: {start_date} a {end_date}")
+    """Executa uma sessão completa do navegador para um único período."""
     driver = init_firefox(headless=headless)
     try:
-        log("Realizando login...")
+        log(f"[{start_date} a {end_date}] Realizando login...")
         login(email, password, driver)
-        log("Login realizado com sucesso.")
+        log(f"[{start_date} a {end_date}] Login realizado com sucesso.")
 
-        log("Navegando para página de laudos...")
+        log(f"[{start_date} a {end_date}] Navegando para página de laudos...")
         goto_laudo_page(driver)
-        log("Página de laudos carregada.")
 
-        log("Aplicando filtros...")
+        log(f"[{start_date} a {end_date}] Aplicando filtros...")
         set_filters(driver, opcao_exame, start_date, end_date)
-        log("Filtros aplicados.")
 
-        log("Iterando por pacientes...")
-        laudos = iterate_patients(driver, opcao_exame)
-        log(f"Scraper finalizado. Total de laudos: {len(laudos)}")
-        return laudos
+        log(f"[{start_date} a {end_date}] Iterando por pacientes...")
+        return iterate_patients(driver, opcao_exame)
+    finally:
+        driver.quit()
+        log(f"[{start_date} a {end_date}] Driver encerrado.")
+
+
+def run_scraper(
+    email: str,
+    password: str,
+    opcao_exame: str,
+    start_date: str,
+    end_date: str,
+    *,
+    headless: bool | None = None,
+    sessoes: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Fluxo de ponta a ponta que devolve lista de laudos em dicionários.
+
+    Com ``sessoes > 1``, o período é dividido em janelas disjuntas e cada janela é
+    coletada por uma sessão própria do navegador, em paralelo.
+    """
+    log(f"Iniciando scraper com opcao_exame={opcao_exame}, período: {start_date} a {end_date}")
+    janelas = _dividir_periodo(start_date, end_date, sessoes)
+    log(f"Coletando {len(janelas)} janela(s) em paralelo: {janelas}")
+
+    try:
+        resultados_por_janela = thread_map(
+            lambda janela: _executar_sessao(
+                email, password, opcao_exame, janela[0], janela[1], headless
+            ),
+            janelas,
+            max_workers=len(janelas),
+        )
     except Exception as e:
         log(f"Erro durante execução do scraper: {e}")
         raise
-    finally:
-        driver.quit()
-        log("Driver encerrado.")
+
+    laudos: List[Dict[str, Any]] = []
+    protocolos_vistos = set()
+    for resultados in resultados_por_janela:
+        for laudo in resultados:
+            if laudo["n_protocolo"] not in protocolos_vistos:
+                protocolos_vistos.add(laudo["n_protocolo"])
+                laudos.append(laudo)
+
+    log(f"Scraper finalizado. Total de laudos: {len(laudos)}")
+    return laudos
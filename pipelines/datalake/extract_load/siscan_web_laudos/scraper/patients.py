@@ -6,12 +6,11 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, List, Set, Tuple
 
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver import Firefox
 from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from prefeitura_rio.pipelines_utils.logging import log
@@ -29,169 +28,183 @@ _FORMATO_DATA = "%d/%m/%Y"
 
 
 # --------------------------------------------------------------------------- #
-# Helpers                                                                    #
+# Página de detalhes                                                          #
 # --------------------------------------------------------------------------- #
-def _get_elem(driver: Firefox, locator: tuple[str, str]):
+# Cada campo é descrito por ``(modo, locators)``: ``"txt"`` lê o texto visível e
+# ``"val"`` lê o ``value`` do input (ou o texto, se vazio). Quando há mais de um
+# locator, vale o primeiro que devolver conteúdo.
+Campo = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+CAMPOS_GERAIS: Dict[str, Campo] = {
+    # ----------------------------- Cabeçalho ------------------------------- #
+    "unidade_nome": ("txt", (DET_NOME,)),
+    "unidade_uf": ("txt", (DET_UF,)),
+    "n_exame": ("txt", (DET_NEXAME,)),
+    "data_solicitacao": ("txt", (DET_DATA,)),
+    "unidade_cnes": ("txt", (DET_CNES,)),
+    "unidade_municipio": ("txt", (DET_MUNICIPIO,)),
+    "n_prontuario": ("txt", (DET_NPRONT,)),
+    "n_protocolo": ("txt", (DET_NPROTO,)),
+    # ------------------------------- Paciente ------------------------------ #
+    "paciente_cartao_sus": ("val", (DET_CARTAO_SUS,)),
+    "paciente_nome": ("val", (DET_NOME_PACIENTE,)),
+    "paciente_dt_nasc": ("val", (DET_DATA_NASCIMENTO,)),
+    "paciente_mae": ("val", (DET_MAE,)),
+    "paciente_uf": ("val", (DET_UF_PACIENTE,)),
+    "paciente_bairro": ("val", (DET_BAIRRO,)),
+    "paciente_cep": ("val", (DET_CEP, DET_CEP2)),
+    "paciente_sexo": ("val", (DET_SEXO,)),
+    "paciente_idade": ("val", (DET_IDADE,)),
+    "paciente_telefone": ("val", (DET_TELEFONE,)),
+    "paciente_municipio": ("val", (DET_MUNICIPIO_PACIENTE,)),
+    "paciente_logradouro": ("val", (DET_ENDERECO,)),
+    "paciente_endereco_complemento": ("val", (DET_COMPLEMENTO,)),
+    # ------------------------------ Prestador ------------------------------ #
+    "prestador_nome": ("val", (DET_NOME_PRESTADOR,)),
+    "prestador_cnpj": ("val", (DET_CNPJ,)),
+    "prestador_uf": ("val", (DET_UF_PRESTADOR,)),
+    "prestador_cnes": ("val", (DET_CNES_PRESTADOR,)),
+    "data_realizacao": ("val", (DET_DATA_RECEBIMENTO,)),
+    "prestador_municipio": ("val", (DET_MUNICIPIO_PRESTADOR,)),
+    # ----------------------------- Resultados ------------------------------ #
+    "profissional_responsavel_nome": ("val", (DET_RESPONSAVEL_RESULTADO,)),
+    "profissional_responsavel_cns": ("val", (DET_CNS_RESULTADO,)),
+    "profissional_responsavel_crm": ("val", (DET_CONSELHO,)),
+    "data_liberacao_resultado": ("val", (DET_DATA_LIBERACAO_RESULTADO,)),
+}
+
+CAMPOS_MAMOGRAFIA: Dict[str, Campo] = {
+    # ------------------------------ Indicação ------------------------------ #
+    "mamografia_tipo": ("val", (DET_TIPO_MAMOGRAFIA,)),
+    "mamografia_rastreamento_tipo": ("val", (DET_TIPO_MAMOGRAFIA_RASTREAMENTO,)),
+    "achado_exame_clinico": ("val", (DET_ACHADO_EXAME_CLINICO,)),
+    "achado_exame_direita": ("val", (DET_ACHADO_EXAME_DIREITA,)),
+    "data_ultima_menstruacao": ("val", (DET_DATA_ULTIMA_MENSTRUACAO,)),
+    # ------------------------------ Mamografia ----------------------------- #
+    "numero_filmes": ("val", (DET_NUMERO_FILMES,)),
+    "mama_direita_pele": ("val", (DET_MAMA_DIREITA_PELE,)),
+    "tipo_mama_direita": ("val", (DET_TIPO_MAMA_DIREITA,)),
+    "microcalcificacoes": ("val", (DET_MICROCALCIFICACOES,)),
+    "linfonodos_axiliares_direita": ("val", (DET_LINFONODOS_AXILIARES_DIREITA,)),
+    "achados_benignos_direita": ("val", (DET_ACHADOS_BENIGNOS_DIREITA,)),
+    "mama_esquerda_pele": ("val", (DET_MAMA_ESQUERDA_PELE,)),
+    "tipo_mama_esquerda": ("val", (DET_TIPO_MAMA_ESQUERDA,)),
+    "linfonodos_axiliares_esquerda": ("val", (DET_LINFONODOS_AXILIARES_ESQUERDA,)),
+    "achados_benignos_esquerda": ("val", (DET_ACHADOS_BENIGNOS_ESQUERDA,)),
+    # --------------------- Classificação Radiológica ----------------------- #
+    "classif_radiologica_direita": ("val", (DET_CLASSIF_RADIOLOGICA_DIREITA,)),
+    "classif_radiologica_esquerda": ("val", (DET_CLASSIF_RADIOLOGICA_ESQUERDA,)),
+    "texto_mamas_labels": ("txt", (DET_MAMAS_LABELS,)),
+    # ---------------------------- Recomendações ---------------------------- #
+    "recomendacoes": ("val", (DET_RECOMENDACOES,)),
+    # -------------------------- Observações Gerais ------------------------- #
+    "observacoes_gerais": ("txt", (DET_OBSERVACOES_GERAIS,)),
+}
+
+CAMPOS_HISTO_MAMA: Dict[str, Campo] = {
+    "lateralidade": ("val", (DET_LATERALIDADE,)),
+    "localizacao": ("val", (DET_LOCALIZACAO,)),
+    "procedimento_cirurgico": ("val", (DET_PROCEDIMENTO_CIRURGICO,)),
+    "exame_macroscopico": ("val", (DET_EXAME_MACROSCOPICO,)),
+    "microcalcificacoes_histo": ("val", (DET_MICROCALCIFICACOES_HISTO,)),
+    "lesao_neoplasico": ("val", (DET_LESAO_NEOPLASICO,)),
+    "lesao_benigno": ("val", (DET_LESAO_BENIGNO,)),
+    "registrado_apac": ("val", (DET_REGISTRADO_APAC,)),
+    "multifocalidade": ("val", (DET_MULTIFOCALIDADE,)),
+    "multicentricidade": ("val", (DET_MULTICENTRICIDADE,)),
+    "grau_histologico": ("val", (DET_GRAU_HISTOLOGICO,)),
+    "invasao_vascular": ("val", (DET_INVASAO_VASCULAR,)),
+    "infiltracao_perineural": ("val", (DET_INFILTRACAO_PERINEURAL,)),
+    "embolizacao_linfatica": ("val", (DET_EMBOLIZACAO_LINFATICA,)),
+    "margens_cirurgicas": ("val", (DET_MARGENS_CIRURGICAS,)),
+    "receptor_estrogeno": ("val", (DET_RECEPTOR_ESTROGENO,)),
+    "receptor_progesterona": ("val", (DET_RECEPTOR_PROGESTERONA,)),
+    "estudos_imuno": ("val", (DET_ESTUDOS_IMUNO,)),
+    "observacoes_gerais_histo": ("txt", (DET_OBSERVACOES_GERAIS_HISTO,)),
+}
+
+CAMPOS_POR_EXAME: Dict[str, Dict[str, Campo]] = {
+    "mamografia": CAMPOS_MAMOGRAFIA,
+    "histo_mama": CAMPOS_HISTO_MAMA,
+}
+
+# Lê todos os campos numa única chamada ao geckodriver (em vez de uma por campo).
+# Para cada campo, lê o texto visível ou o ``value`` do primeiro elemento encontrado.
+_JS_EXTRAIR_CAMPOS = """
+const campos = arguments[0];
+const localizar = (by, valor) => {
+    switch (by) {
+        case "id": return document.getElementById(valor);
+        case "class name": return document.getElementsByClassName(valor)[0] || null;
+        case "css selector": return document.querySelector(valor);
+        case "name": return document.getElementsByName(valor)[0] || null;
+        case "xpath": return document.evaluate(
+            valor, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+        ).singleNodeValue;
+        default: return null;
+    }
+};
+const texto = (el) => (el.innerText || "").trim();
+const valor = (el) => {
+    const v = el.value !== undefined ? el.value : el.getAttribute("value");
+    return (v || "").toString().trim() || texto(el);
+};
+const resultado = {};
+for (const [chave, modo, locators] of campos) {
+    resultado[chave] = "";
+    for (const [by, v] of locators) {
+        const el = localizar(by, v);
+        const conteudo = el ? (modo === "val" ? valor(el) : texto(el)) : "";
+        if (conteudo) {
+            resultado[chave] = conteudo;
+            break;
+        }
+    }
+}
+return resultado;
+"""
+
+
+def _esperar_pagina_detalhe(driver: Firefox) -> None:
+    """Garante que campo de protocolo esteja visível antes de extrair dados."""
+    esperar_visivel(driver, DET_NPROTO, 300)  # noqa: F403
+
+
+def extrair_campos(driver: Firefox, campos: Dict[str, Campo]) -> Dict[str, str]:
     """
-    Retorna o primeiro elemento que corresponde ao locator ou ``None``.
+    Extrai vários campos da página atual com uma única chamada ``execute_script``.
 
     Args:
         driver: Instância do Firefox WebDriver.
-        locator: Tupla ``(By, value)`` do elemento desejado.
+        campos: Mapeamento ``chave -> (modo, locators)``.
 
     Returns:
-        O primeiro ``WebElement`` encontrado ou ``None`` caso inexistente.
+        Dicionário com todas as chaves de ``campos``; string vazia se o campo
+        não existir ou estiver vazio.
     """
-    elems: List[WebElement] = driver.find_elements(*locator)
-    return elems[0] if elems else None
-
-
-def get_txt(driver: Firefox, locator: tuple[str, str]) -> str:
-    """Texto limpo do elemento – string vazia se não existir ou estiver vazio."""
-    elem = _get_elem(driver, locator)
-    return elem.text.strip() if elem and elem.text else ""
-
-
-def get_val(driver: Firefox, locator: tuple[str, str]) -> str:
-    """Valor de input/textarea ou texto do elemento; vazio se não existir."""
-    elem = _get_elem(driver, locator)
-    if not elem:
-        return ""
-    value = (elem.get_attribute("value") or "").strip()
-    return value if value else get_txt(driver, locator)
+    argumentos = [
+        [chave, modo, [list(locator) for locator in locators]]
+        for chave, (modo, locators) in campos.items()
+    ]
+    return driver.execute_script(_JS_EXTRAIR_CAMPOS, argumentos) or {}
 
 
-# --------------------------------------------------------------------------- #
-# Página de detalhes                                                          #
-# --------------------------------------------------------------------------- #
-def _esperar_pagina_detalhe(driver: Firefox) -> None:
-    """Garante que campo de protocolo esteja visível antes de extrair dados."""
-    esperar_visivel(driver, DET_NPROTO, 300)  # noqa: F403
-
-
-def _extrair_detalhes(driver: Firefox) -> Dict[str, Any]:
+def _extrair_detalhes(driver: Firefox, opcao_exame: str) -> Dict[str, Any]:
     """
-    Extrai os campos de detalhes do laudo.
+    Extrai os campos de detalhes do laudo, gerais e específicos do tipo de exame.
 
     Se o campo não existir ou estiver vazio, retorna string vazia mantendo
     todas as chaves no dicionário.
     """
-    detalhes: Dict[str, Any] = {
-        # ----------------------------- Cabeçalho --------------------------- #
-        "unidade_nome": get_txt(driver, DET_NOME),  # noqa: F403
-        "unidade_uf": get_txt(driver, DET_UF),  # noqa: F403
-        "n_exame": get_txt(driver, DET_NEXAME),  # noqa: F403
-        "data_solicitacao": (
-            datetime.strptime(get_txt(driver, DET_DATA), _FORMATO_DATA).date().isoformat()
-            if get_txt(driver, DET_DATA)
-            else ""
-        ),
-        "unidade_cnes": get_txt(driver, DET_CNES),  # noqa: F403
-        "unidade_municipio": get_txt(driver, DET_MUNICIPIO),  # noqa: F403
-        "n_prontuario": get_txt(driver, DET_NPRONT),  # noqa: F403
-        "n_protocolo": get_txt(driver, DET_NPROTO),  # noqa: F403
-        # ------------------------------- Paciente -------------------------- #
-        "paciente_cartao_sus": get_val(driver, DET_CARTAO_SUS),  # noqa: F403
-        "paciente_nome": get_val(driver, DET_NOME_PACIENTE),  # noqa: F403
-        "paciente_dt_nasc": get_val(driver, DET_DATA_NASCIMENTO),  # noqa: F403
-        "paciente_mae": get_val(driver, DET_MAE),  # noqa: F403
-        "paciente_uf": get_val(driver, DET_UF_PACIENTE),  # noqa: F403
-        "paciente_bairro": get_val(driver, DET_BAIRRO),  # noqa: F403
-        # noqa: F403
-        "paciente_cep": get_val(driver, DET_CEP) or get_val(driver, DET_CEP2),  # noqa: F403
-        "paciente_sexo": get_val(driver, DET_SEXO),  # noqa: F403
-        "paciente_idade": get_val(driver, DET_IDADE),  # noqa: F403
-        "paciente_telefone": get_val(driver, DET_TELEFONE),  # noqa: F403
-        "paciente_municipio": get_val(driver, DET_MUNICIPIO_PACIENTE),  # noqa: F403
-        "paciente_logradouro": get_val(driver, DET_ENDERECO),  # noqa: F403
-        "paciente_endereco_complemento": get_val(driver, DET_COMPLEMENTO),  # noqa: F403
-        # ------------------------------ Prestador -------------------------- #
-        "prestador_nome": get_val(driver, DET_NOME_PRESTADOR),  # noqa: F403
-        "prestador_cnpj": get_val(driver, DET_CNPJ),  # noqa: F403
-        "prestador_uf": get_val(driver, DET_UF_PRESTADOR),  # noqa: F403
-        "prestador_cnes": get_val(driver, DET_CNES_PRESTADOR),  # noqa: F403
-        "data_realizacao": get_val(driver, DET_DATA_RECEBIMENTO),  # noqa: F403
-        "prestador_municipio": get_val(driver, DET_MUNICIPIO_PRESTADOR),  # noqa: F403
-        # ----------------------------- Resultados -------------------------- #
-        "profissional_responsavel_nome": get_val(driver, DET_RESPONSAVEL_RESULTADO),  # noqa: F403
-        "profissional_responsavel_cns": get_val(driver, DET_CNS_RESULTADO),  # noqa: F403
-        "profissional_responsavel_crm": get_val(driver, DET_CONSELHO),  # noqa: F403
-        "data_liberacao_resultado": get_val(driver, DET_DATA_LIBERACAO_RESULTADO),  # noqa: F403
-    }
-
-    return detalhes
+    campos = {**CAMPOS_GERAIS, **CAMPOS_POR_EXAME.get(opcao_exame, {})}
+    detalhes: Dict[str, Any] = extrair_campos(driver, campos)
 
+    if detalhes.get("data_solicitacao"):
+        detalhes["data_solicitacao"] = (
+            datetime.strptime(detalhes["data_solicitacao"], _FORMATO_DATA).date().isoformat()
+        )
 
-def _extrair_detalhes_especificos_mamo(driver: Firefox, detalhes: Dict[str, Any]) -> None:
-    """Extrai campos específicos para mamografia e atualiza o dicionário."""
-    detalhes.update(
-        {
-            # ------------------------------ Indicação -------------------------- #
-            "mamografia_tipo": get_val(driver, DET_TIPO_MAMOGRAFIA),  # noqa: F403
-            "mamografia_rastreamento_tipo": get_val(
-                driver, DET_TIPO_MAMOGRAFIA_RASTREAMENTO
-            ),  # noqa: F403
-            "achado_exame_clinico": get_val(driver, DET_ACHADO_EXAME_CLINICO),  # noqa: F403
-            "achado_exame_direita": get_val(driver, DET_ACHADO_EXAME_DIREITA),  # noqa: F403
-            "data_ultima_menstruacao": get_val(driver, DET_DATA_ULTIMA_MENSTRUACAO),  # noqa: F403
-            # ------------------------------ Mamografia ------------------------- #
-            "numero_filmes": get_val(driver, DET_NUMERO_FILMES),  # noqa: F403
-            "mama_direita_pele": get_val(driver, DET_MAMA_DIREITA_PELE),  # noqa: F403
-            "tipo_mama_direita": get_val(driver, DET_TIPO_MAMA_DIREITA),  # noqa: F403
-            "microcalcificacoes": get_val(driver, DET_MICROCALCIFICACOES),  # noqa: F403
-            "linfonodos_axiliares_direita": get_val(
-                driver, DET_LINFONODOS_AXILIARES_DIREITA
-            ),  # noqa: F403
-            "achados_benignos_direita": get_val(driver, DET_ACHADOS_BENIGNOS_DIREITA),  # noqa: F403
-            "mama_esquerda_pele": get_val(driver, DET_MAMA_ESQUERDA_PELE),  # noqa: F403
-            "tipo_mama_esquerda": get_val(driver, DET_TIPO_MAMA_ESQUERDA),  # noqa: F403
-            "linfonodos_axiliares_esquerda": get_val(
-                driver, DET_LINFONODOS_AXILIARES_ESQUERDA
-            ),  # noqa: F403
-            "achados_benignos_esquerda": get_val(
-                driver, DET_ACHADOS_BENIGNOS_ESQUERDA
-            ),  # noqa: F403
-            # --------------------- Classificação Radiológica ------------------- #
-            "classif_radiologica_direita": get_val(
-                driver, DET_CLASSIF_RADIOLOGICA_DIREITA
-            ),  # noqa: F403
-            "classif_radiologica_esquerda": get_val(
-                driver, DET_CLASSIF_RADIOLOGICA_ESQUERDA
-            ),  # noqa: F403
-            "texto_mamas_labels": get_txt(driver, DET_MAMAS_LABELS),  # noqa: F403
-            # ---------------------------- Recomendações ------------------------ #
-            "recomendacoes": get_val(driver, DET_RECOMENDACOES),  # noqa: F403
-            # -------------------------- Observações Gerais --------------------- #
-            "observacoes_gerais": get_txt(driver, DET_OBSERVACOES_GERAIS),  # noqa: F403
-        }
-    )
-
-
-def _extrair_detalhes_especificos_histo_mama(driver: Firefox, detalhes: Dict[str, Any]) -> None:
-    """Extrai campos específicos para histopatologia de mama e atualiza o dicionário."""
-    detalhes.update(
-        {
-            "lateralidade": get_val(driver, DET_LATERALIDADE),  # noqa: F403
-            "localizacao": get_val(driver, DET_LOCALIZACAO),  # noqa: F403
-            "procedimento_cirurgico": get_val(driver, DET_PROCEDIMENTO_CIRURGICO),  # noqa: F403
-            "exame_macroscopico": get_val(driver, DET_EXAME_MACROSCOPICO),  # noqa: F403
-            "microcalcificacoes_histo": get_val(driver, DET_MICROCALCIFICACOES_HISTO),  # noqa: F403
-            "lesao_neoplasico": get_val(driver, DET_LESAO_NEOPLASICO),  # noqa: F403
-            "lesao_benigno": get_val(driver, DET_LESAO_BENIGNO),  # noqa: F403
-            "registrado_apac": get_val(driver, DET_REGISTRADO_APAC),  # noqa: F403
-            "multifocalidade": get_val(driver, DET_MULTIFOCALIDADE),  # noqa: F403
-            "multicentricidade": get_val(driver, DET_MULTICENTRICIDADE),  # noqa: F403
-            "grau_histologico": get_val(driver, DET_GRAU_HISTOLOGICO),  # noqa: F403
-            "invasao_vascular": get_val(driver, DET_INVASAO_VASCULAR),  # noqa: F403
-            "infiltracao_perineural": get_val(driver, DET_INFILTRACAO_PERINEURAL),  # noqa: F403
-            "embolizacao_linfatica": get_val(driver, DET_EMBOLIZACAO_LINFATICA),  # noqa: F403
-            "margens_cirurgicas": get_val(driver, DET_MARGENS_CIRURGICAS),  # noqa: F403
-            "receptor_estrogeno": get_val(driver, DET_RECEPTOR_ESTROGENO),  # noqa: F403
-            "receptor_progesterona": get_val(driver, DET_RECEPTOR_PROGESTERONA),  # noqa: F403
-            "estudos_imuno": get_val(driver, DET_ESTUDOS_IMUNO),  # noqa: F403
-            "observacoes_gerais_histo": get_txt(driver, DET_OBSERVACOES_GERAIS_HISTO),  # noqa: F403
-        }
-    )
+    return detalhes
 
 
 def _proxima_pagina(driver: Firefox) -> bool:
@@ -256,17 +269,9 @@ def iterate_patients(driver: Firefox, opcao_exame: str) -> List[Dict[str, Any]]:
                 esperar_carregamento(driver)
                 continue
 
-            # detalhes gerais, comuns a todos os laudos
-            log("Extraindo detalhes gerais do laudo…")
-            detalhes = _extrair_detalhes(driver)
-
-            # detalhes específicos por tipo de exame
-            log(f"Extraindo detalhes específicos para tipo '{opcao_exame}'…")
-            match opcao_exame:
-                case "mamografia":
-                    _extrair_detalhes_especificos_mamo(driver, detalhes)
-                case "histo_mama":
-                    _extrair_detalhes_especificos_histo_mama(driver, detalhes)
+            # detalhes gerais e específicos do tipo de exame, numa só chamada
+            log(f"Extraindo detalhes do laudo (tipo '{opcao_exame}')…")
+            detalhes = _extrair_detalhes(driver, opcao_exame)
 
             protocolo = detalhes.get("n_protocolo", "DESCONHECIDO")
             if detalhes["n_protocolo"] not in protocolos_vistos:  # verifica nº de protocolo
@@ -25,6 +25,7 @@ def run_siscan_scraper(
     start_date: str,
     end_date: str,
     output_dir: str = ".",
+    num_sessions: int = 1,
 ):
     """
     Executa o scraper do SISCAN para coletar dados de pacientes em um intervalo de datas.
@@ -35,6 +36,8 @@ def run_siscan_scraper(
         start_date (str): Data inicial no formato 'dd/mm/YYYY'.
         end_date (str): Data final no formato 'dd/mm/YYYY'.
         output_dir (str): Diretório onde os arquivos parquet serão salvos.
+        num_sessions (int): Número de sessões do navegador em paralelo, cada uma
+            coletando uma parte disjunta do período.
 
     Retorna:
         List[str]: Lista de caminhos dos arquivos parquet gerados.
@@ -53,6 +56,7 @@ def run_siscan_scraper(
             start_date=start_date,
             end_date=end_date,
             headless=True,
+            sessoes=num_sessions,
         )
         log(f"Dados coletados com sucesso. Total de registros: {len(pacientes)}")
 
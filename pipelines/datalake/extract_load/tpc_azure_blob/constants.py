@@ -23,3 +23,25 @@ class constants(Enum):
     }
 
     DATASET_ID = "brutos_estoque_central_tpc"
+
+    # Tratamento das colunas de cada arquivo:
+    # - required: linhas com valor vazio nessas colunas são descartadas
+    # - decimal_comma: números com vírgula decimal ("1,5") convertidos para float
+    # - date_dmy: datas no formato dd/mm/yyyy convertidas para date
+    # - truncate: colunas cortadas no número de caracteres indicado (ex.: timestamp -> data)
+    COLUMN_SPEC = {
+        "posicao": {
+            "required": ["sku"],
+            "decimal_comma": ["volume", "peso_bruto", "qtd_dispo", "qtd_roma", "preco_unitario"],
+            "date_dmy": ["dt_situacao"],
+            "truncate": {"validade": 10},
+        },
+        "pedidos": {
+            "decimal_comma": ["valor", "peso", "volume", "quantidade_peca", "valor_total"],
+        },
+        "recebimento": {
+            "decimal_comma": ["qt", "qt_fis", "pr_unit", "vl_merc", "vl_total", "qt_rec"],
+        },
+    }
+
+    CHUNKSIZE = 100_000
@@ -83,6 +83,7 @@ with Flow(
     create_partitions_task = create_partitions(
         data_path=local_folders["raw"],
         partition_directory=local_folders["partition_directory"],
+        file_type="parquet",
         upstream_tasks=[transformed_file],
     )
 
@@ -91,7 +92,7 @@ with Flow(
         dataset_id=DATASET_ID,
         table_id=TABLE_ID,
         if_exists="replace",
-        csv_delimiter=";",
+        source_format="parquet",
         if_storage_data_exists="replace",
         biglake_table=True,
         dataset_is_public=False,
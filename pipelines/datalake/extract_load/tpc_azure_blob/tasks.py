@@ -10,6 +10,8 @@ import sys
 from datetime import datetime, timedelta
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytz
 from prefect.engine.signals import ENDRUN
 from prefect.engine.state import Failed
@@ -18,6 +20,10 @@ from prefeitura_rio.pipelines_utils.logging import log
 from pipelines.datalake.extract_load.tpc_azure_blob.constants import (
     constants as tpc_constants,
 )
+from pipelines.datalake.extract_load.tpc_azure_blob.utils import (
+    build_parquet_schema,
+    conform_chunk,
+)
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.tasks import download_azure_blob, get_secret_key
 
@@ -91,21 +97,29 @@ def extract_data_from_blob(
 
 
 @task
-def transform_data(file_path: str, blob_file: str):
+def transform_data(file_path: str, blob_file: str) -> str:
     """
-    Reads a CSV file from the given filepath, applies some data cleaning and formatting operations,
-    and saves the resulting dataframe back to the same file in a different format.
+    Reads the CSV file in chunks, applies the column conversions configured for the blob in
+    `COLUMN_SPEC` and writes the result as a typed Parquet file next to the original one.
+    The original CSV is removed so that only the Parquet file is partitioned and uploaded.
 
     Args:
-        filepath (str): The path to the CSV file to be processed.
+        file_path (str): The path to the CSV file to be processed.
+        blob_file (str): The type of blob file (posicao, pedidos or recebimento).
 
     Returns:
-        None
+        str: The path of the Parquet file.
     """
 
-    log("Conforming CSV to GCP")
+    log("Converting CSV to Parquet")
 
-    df = pd.read_csv(
+    spec = tpc_constants.COLUMN_SPEC.value.get(blob_file, {})
+    parquet_path = os.path.splitext(file_path)[0] + ".parquet"
+
+    tz = pytz.timezone("Brazil/East")
+    data_carga = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
+
+    chunks = pd.read_csv(
         file_path,
         sep=";",
         quoting=csv.QUOTE_MINIMAL,
@@ -114,45 +128,28 @@ def transform_data(file_path: str, blob_file: str):
         escapechar="\\",
         keep_default_na=False,
         dtype=str,
+        chunksize=tpc_constants.CHUNKSIZE.value,
     )
 
-    if blob_file == "posicao":
-        # remove registros errados
-        df = df[df.sku != ""]
-
-        # converte para valores numéricos
-        df["volume"] = df.volume.apply(lambda x: float(x.replace(",", ".")))
-        df["peso_bruto"] = df.peso_bruto.apply(lambda x: float(x.replace(",", ".")))
-        df["qtd_dispo"] = df.qtd_dispo.apply(lambda x: float(x.replace(",", ".")))
-        df["qtd_roma"] = df.qtd_roma.apply(lambda x: float(x.replace(",", ".")))
-        df["preco_unitario"] = df.preco_unitario.apply(
-            lambda x: float(x.replace(",", ".")) if x != "" else x
-        )
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            chunk = conform_chunk(chunk, spec)
+            chunk["_data_carga"] = data_carga
 
-        # converte as validades
-        df["validade"] = df.validade.apply(lambda x: x[:10])
-        df["dt_situacao"] = df.dt_situacao.apply(lambda x: x[-4:] + "-" + x[3:5] + "-" + x[:2])
-    elif blob_file == "pedidos":
-        # converte para valores numéricos
-        df["valor"] = df.valor.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-        df["peso"] = df.peso.apply(lambda x: float(x.replace(",", ".")))
-        df["volume"] = df.volume.apply(lambda x: float(x.replace(",", ".")))
-        df["quantidade_peca"] = df.quantidade_peca.apply(lambda x: float(x.replace(",", ".")))
-        df["valor_total"] = df.valor_total.apply(
-            lambda x: float(x.replace(",", ".")) if x != "" else x
-        )
-    elif blob_file == "recebimento":
-        df["qt"] = df.qt.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-        df["qt_fis"] = df.qt_fis.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-        df["pr_unit"] = df.pr_unit.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-        df["vl_merc"] = df.vl_merc.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-        df["vl_total"] = df.vl_total.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-        df["qt_rec"] = df.qt_rec.apply(lambda x: float(x.replace(",", ".")) if x != "" else x)
-
-    # add load date column
-    tz = pytz.timezone("Brazil/East")
-    df["_data_carga"] = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
+            if writer is None:
+                schema = build_parquet_schema(list(chunk.columns), spec)
+                writer = pq.ParquetWriter(parquet_path, schema)
+
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    os.remove(file_path)
 
-    df.to_csv(file_path, index=False, sep=";", encoding="utf-8", quoting=0, decimal=".")
+    log(f"Parquet file with {rows} rows saved to {parquet_path}")
 
-    log("CSV now conform")
+    return parquet_path
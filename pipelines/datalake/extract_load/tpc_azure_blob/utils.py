@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import pandas as pd
+import pyarrow as pa
+
 from pipelines.utils.credential_injector import (
     authenticated_task as task,  # importar aqui
 )
@@ -40,3 +43,52 @@ def report_csv_validation_errors(blob_file: str, error_logs: list[str]):
         message=full_message,
         monitor_slug="data-ingestion",
     )
+
+
+def conform_chunk(df: pd.DataFrame, spec: dict) -> pd.DataFrame:
+    """
+    Aplica a especificação de colunas de um arquivo da TPC a um bloco do CSV.
+
+    As conversões são vetorizadas: valores vazios viram nulos e valores inválidos
+    levantam erro, como na conversão linha a linha.
+
+    Args:
+        df (pd.DataFrame): Bloco do CSV lido com `dtype=str` e sem valores nulos.
+        spec (dict): Especificação do arquivo (ver `constants.COLUMN_SPEC`).
+
+    Returns:
+        pd.DataFrame: O bloco com as colunas convertidas.
+    """
+    for column in spec.get("required", []):
+        df = df[df[column] != ""]
+
+    df = df.copy()
+
+    for column in spec.get("decimal_comma", []):
+        values = df[column].str.replace(",", ".", regex=False).replace("", None)
+        df[column] = pd.to_numeric(values).astype("float64")
+
+    for column in spec.get("date_dmy", []):
+        df[column] = pd.to_datetime(df[column].replace("", None), format="%d/%m/%Y")
+
+    for column, length in spec.get("truncate", {}).items():
+        df[column] = df[column].str.slice(0, length)
+
+    return df
+
+
+def build_parquet_schema(columns: list, spec: dict) -> pa.Schema:
+    """
+    Monta o schema Parquet de um arquivo da TPC a partir da especificação de colunas.
+
+    Args:
+        columns (list): Colunas do arquivo, na ordem em que aparecem.
+        spec (dict): Especificação do arquivo (ver `constants.COLUMN_SPEC`).
+
+    Returns:
+        pa.Schema: Schema com float64 para números, date32 para datas e string para o resto.
+    """
+    types = {column: pa.float64() for column in spec.get("decimal_comma", [])}
+    types.update({column: pa.date32() for column in spec.get("date_dmy", [])})
+
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
@@ -2,9 +2,13 @@
 import ipaddress
 import re
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
+from pipelines.utils.concurrency import with_prefect_context
 from pipelines.utils.logger import log
 
 
@@ -12,30 +16,57 @@ from pipelines.utils.logger import log
 class HostHeaderSSLAdapter(requests.adapters.HTTPAdapter):
     _ipv4_regex = re.compile(r"^([0-9]+\.?\b){4}$")
 
+    # Cache de resoluções compartilhado pelo processo: hostname -> (IP, expira_em)
+    _cache = {}
+    _cache_lock = threading.Lock()
+    # Limites para o TTL informado pelo servidor, em segundos
+    MIN_TTL = 30
+    MAX_TTL = 3600
+
+    dns_servers = [
+        # Cloudflare
+        "1.1.1.1",
+        "1.0.0.1",
+        # Google
+        "8.8.8.8",
+        "8.8.4.4",
+        # Quad9
+        "9.9.9.10",
+        "149.112.112.10",
+        # OpenDNS
+        "208.67.222.222",
+        "208.67.220.220",
+    ]
+
     def resolve(self, hostname):
-        # Tentamos vários servidores em busca de um que tenha o IP do site
-        dns_servers = [
-            # Cloudflare
-            "1.1.1.1",
-            "1.0.0.1",
-            # Google
-            "8.8.8.8",
-            "8.8.4.4",
-            # Quad9
-            "9.9.9.10",
-            "149.112.112.10",
-            # OpenDNS
-            "208.67.222.222",
-            "208.67.220.220",
-        ]
-        for server in dns_servers:
-            results = dns_lookup(hostname, server)
-            if "A" in results:
-                return results["A"][0]
+        cls = type(self)
+        with cls._cache_lock:
+            cached = cls._cache.get(hostname)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+
+            ip, ttl = self._race_lookup(hostname)
+            ttl = min(max(ttl, self.MIN_TTL), self.MAX_TTL)
+            cls._cache[hostname] = (ip, time.monotonic() + ttl)
+            return ip
+
+    def _race_lookup(self, hostname):
+        # Consultamos todos os servidores ao mesmo tempo e usamos a primeira
+        # resposta que tenha o IP do site
+        executor = ThreadPoolExecutor(max_workers=len(self.dns_servers))
+        lookup = with_prefect_context(dns_lookup)
+        try:
+            futures = [executor.submit(lookup, hostname, server) for server in self.dns_servers]
+            for future in as_completed(futures):
+                results = future.result()
+                if "A" in results:
+                    return (results["A"][0], results.get("TTL", self.MIN_TTL))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         # Se chegamos aqui, nenhum servidor de DNS conseguiu traduzir
         # o hostname para um IP
         raise ConnectionError(
-            f"None of the {len(dns_servers)} servers could resolve hostname '{hostname}'"
+            f"None of the {len(self.dns_servers)} servers could resolve hostname '{hostname}'"
         )
 
     def send(self, request, **kwargs):
@@ -177,10 +208,14 @@ def parse_dns_response(res, dq_len, req):
         elif type_num == 5:
             type_ = "CNAME"
 
-        reader.read(6)
+        reader.read(2)
+        ttl = to_int(reader.read(4))
         data = reader.read(2)
         data = reader.read(to_int(data))
         add_record_to_result(result, type_, data, reader)
+        if type_ == "A":
+            # Menor TTL entre os registros A da resposta
+            result["TTL"] = min(ttl, result.get("TTL", ttl))
 
     return result
 
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import re
+import threading
 from typing import List, Optional, Tuple, Union
 
 import requests
@@ -24,19 +25,36 @@ def split_case_number(case_num: str) -> tuple:
     return (sec, num, year)
 
 
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Retorna a sessão compartilhada pelo processo, criando-a na primeira chamada,
+    para que as conexões com o site do TCM sejam reaproveitadas entre requisições.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Alguns servidores de DNS parecem não ter o IP do site do TCM
+            # Quando isso acontece, ficamos presos em ConnectionError
+            # Então, usamos um Adapter que tenta vários (Cloudflare, Google, etc)
+            # e usa o primeiro IP que encontrar
+            session = requests.Session()
+            retries = Retry(total=3, backoff_factor=15, status_forcelist=[500, 502, 503, 504])
+            session.mount("https://", HostHeaderSSLAdapter(max_retries=retries))
+            _session = session
+        return _session
+
+
 def send_request(
     method: str, url: str, data: Optional[dict] = None, expected_type: str = "html"
 ) -> Tuple[Union[str, Optional[BeautifulSoup]]]:
     method = method.strip().upper()
     log(f"Sending {method} request expecting '{expected_type}' response: {url}")
 
-    # Alguns servidores de DNS parecem não ter o IP do site do TCM
-    # Quando isso acontece, ficamos presos em ConnectionError
-    # Então, usamos um Adapter que tenta vários (Cloudflare, Google, etc)
-    # e usa o primeiro IP que encontrar
-    session = requests.Session()
-    retries = Retry(total=3, backoff_factor=15, status_forcelist=[500, 502, 503, 504])
-    session.mount("https://", HostHeaderSSLAdapter(max_retries=retries))
+    session = get_session()
 
     res = None
     if method == "POST":
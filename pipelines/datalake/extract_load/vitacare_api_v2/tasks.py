@@ -14,11 +14,8 @@ from pipelines.datalake.extract_load.vitacare_api_v2.constants import (
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 from pipelines.utils.monitor import send_email
-from pipelines.utils.tasks import (
-    cloud_function_request,
-    get_secret_key,
-    load_file_from_bigquery,
-)
+from pipelines.utils.sms import filter_estabelecimentos
+from pipelines.utils.tasks import cloud_function_request, get_secret_key
 
 
 @task(nout=2)
@@ -39,13 +36,9 @@ def generate_endpoint_params(
     )
 
     # Listagem de estabelecimentos por AP
-    estabelecimentos = load_file_from_bigquery.run(
-        project_name="rj-sms",
-        dataset_name="saude_dados_mestres",
-        table_name="estabelecimento",
-    )[["id_cnes", "area_programatica", "prontuario_versao"]]
-
-    estabelecimentos = estabelecimentos[estabelecimentos["prontuario_versao"] == "vitacare"]
+    estabelecimentos = filter_estabelecimentos(prontuario_versao="vitacare")[
+        ["id_cnes", "area_programatica"]
+    ]
     estabelecimentos = estabelecimentos.groupby("area_programatica").agg(
         cnes_list=("id_cnes", list)
     )
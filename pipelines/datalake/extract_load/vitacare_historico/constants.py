@@ -21,6 +21,13 @@ class vitacare_constants(Enum):
     DB_SCHEMA = "dbo"
     BQ_PARTITION_COLUMN = "extracted_at"
 
+    # Extração concorrente dos bancos de cada CNES
+    MAX_WORKERS = 4
+    CHUNKSIZE = 100_000
+    MAX_ATTEMPTS = 3
+    # Tamanho dos arquivos locais a partir do qual eles são carregados no datalake
+    UPLOAD_THRESHOLD_BYTES = 1024**3
+
     TABLES_TO_EXTRACT = [
         "AGENDAMENTOS",
         "ALERGIAS",
@@ -20,7 +20,7 @@ from pipelines.datalake.extract_load.vitacare_historico.tasks import (
     build_operator_params,
     get_tables_to_extract,
     get_vitacare_cnes_from_bigquery,
-    process_cnes_table,
+    process_cnes_tables,
 )
 from pipelines.utils.credential_injector import (
     authenticated_create_flow_run as create_flow_run,
@@ -28,6 +28,9 @@ from pipelines.utils.credential_injector import (
 from pipelines.utils.credential_injector import (
     authenticated_wait_for_flow_run as wait_for_flow_run,
 )
+from pipelines.utils.credential_injector import (
+    authenticated_wait_for_flow_runs as wait_for_flow_runs,
+)
 from pipelines.utils.flow import Flow
 from pipelines.utils.prefect import get_current_flow_labels
 from pipelines.utils.state_handlers import handle_flow_state_change
@@ -46,10 +49,8 @@ with Flow(
     TABLE_NAME = Parameter("table_name", required=True)
     ENVIRONMENT = Parameter("environment", default="dev", required=True)
     DB_SCHEMA = Parameter("db_schema", default=vitacare_constants.DB_SCHEMA.value)
-    PARTITION_COLUMN = Parameter(
-        "partition_column", default=vitacare_constants.BQ_PARTITION_COLUMN.value
-    )
     RENAME_FLOW = Parameter("rename_flow", default=True)
+    MAX_WORKERS = Parameter("max_workers", default=vitacare_constants.MAX_WORKERS.value)
 
     DATASET_ID = vitacare_constants.DATASET_ID.value
     SECRET_PATH = vitacare_constants.INFISICAL_PATH.value
@@ -84,16 +85,16 @@ with Flow(
 
     cnes_to_process = get_vitacare_cnes_from_bigquery()
 
-    process_cnes_table.map(
-        db_host=unmapped(db_host),
-        db_port=unmapped(db_port),
-        db_user=unmapped(db_user),
-        db_password=unmapped(db_password),
-        db_schema=unmapped(DB_SCHEMA),
-        db_table=unmapped(TABLE_NAME),
-        dataset_id=unmapped(DATASET_ID),
-        partition_column=unmapped(PARTITION_COLUMN),
-        cnes_code=cnes_to_process,
+    process_cnes_tables(
+        db_host=db_host,
+        db_port=db_port,
+        db_user=db_user,
+        db_password=db_password,
+        db_schema=DB_SCHEMA,
+        db_table=TABLE_NAME,
+        dataset_id=DATASET_ID,
+        cnes_codes=cnes_to_process,
+        max_workers=MAX_WORKERS,
     )
 
 with Flow(
@@ -116,7 +117,6 @@ with Flow(
         tables=tables_to_process,
         env=ENVIRONMENT,
         schema=DB_SCHEMA,
-        part_col=vitacare_constants.BQ_PARTITION_COLUMN.value,
     )
 
     created_operator_runs = create_flow_run.map(
@@ -127,11 +127,11 @@ with Flow(
         run_name=unmapped(None),
     )
 
-    wait_for_operator_runs = wait_for_flow_run.map(
-        flow_run_id=created_operator_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(False),
+    wait_for_operator_runs = wait_for_flow_runs(
+        flow_run_ids=created_operator_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=False,
     )
 
     dbt_params = build_dbt_paramns(env=ENVIRONMENT)
@@ -146,7 +146,7 @@ with Flow(
         )
 
     with case(SKIP_DBT_RUN, False):
-        wait_for_dbt_runs = wait_for_flow_run.map(
+        wait_for_dbt_runs = wait_for_flow_run(
             flow_run_id=created_dbt_runs,
             stream_states=True,
             stream_logs=True,
@@ -3,134 +3,237 @@
 Tasks para extração e transformação de dados do Vitacare Historic SQL Server
 """
 
-from datetime import timedelta
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
 
 import pandas as pd
-from google.cloud import bigquery
+import pyarrow.parquet as pq
+import pytz
 from sqlalchemy import create_engine
 
 from pipelines.datalake.extract_load.vitacare_historico.constants import (
     vitacare_constants,
 )
 from pipelines.datalake.extract_load.vitacare_historico.utils import transform_dataframe
+from pipelines.utils.concurrency import thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
-from pipelines.utils.tasks import upload_df_to_datalake
+from pipelines.utils.sms import filter_estabelecimentos
+from pipelines.utils.tasks import upload_to_datalake
 
+NOT_FOUND_ERRORS = {
+    "table": ["Invalid object name"],
+    "database": ["Cannot open database", "(4060)", "(911)"],
+}
 
-@task(max_retries=3, retry_delay=timedelta(minutes=2))
-def process_cnes_table(
+
+def build_engine(db_host: str, db_port: str, db_user: str, db_password: str, pool_size: int):
+    """
+    Cria um único pool de conexões para o servidor. Cada banco `vitacare_historic_{cnes}`
+    é consultado pelo nome completo da tabela, então as conexões são reaproveitadas
+    entre os CNES.
+    """
+    connection_string = (
+        f"mssql+pyodbc://{db_user}:{db_password}@{db_host}:{db_port}/master"
+        "?driver=ODBC+Driver+17+for+SQL+Server&TrustServerCertificate=yes"
+    )
+    return create_engine(connection_string, pool_size=pool_size, pool_pre_ping=True)
+
+
+def extract_cnes_table(
+    engine,
+    db_schema: str,
+    db_table: str,
+    cnes_code: str,
+    extracted_at: datetime,
+    output_path: str,
+    chunksize: int,
+) -> int:
+    """
+    Extrai a tabela de um CNES em blocos e grava em um arquivo parquet.
+
+    Returns:
+        int: Número de linhas gravadas. Se a tabela estiver vazia, nenhum arquivo é criado.
+    """
+    db_name = f"vitacare_historic_{cnes_code}"
+    query = f"SELECT * FROM [{db_name}].[{db_schema}].[{db_table}]"
+
+    writer = None
+    total_rows = 0
+    try:
+        for chunk in pd.read_sql(query, engine, chunksize=chunksize):
+            if chunk.empty:
+                continue
+            table = transform_dataframe(chunk, cnes_code, extracted_at)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+            total_rows += table.num_rows
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(output_path)
+        raise
+
+    if writer is not None:
+        writer.close()
+    return total_rows
+
+
+@task
+def process_cnes_tables(
     db_host: str,
     db_port: str,
     db_user: str,
     db_password: str,
     db_schema: str,
     db_table: str,
-    cnes_code: str,
+    cnes_codes: list,
     dataset_id: str,
-    partition_column: str,
+    max_workers: int = vitacare_constants.MAX_WORKERS.value,
 ):
+    """
+    Extrai a tabela `db_table` dos bancos de todos os CNES, com até `max_workers` bancos
+    ao mesmo tempo, e carrega os dados no datalake em poucas cargas consolidadas: os
+    arquivos parquet de cada CNES são acumulados e enviados juntos sempre que passam de
+    `UPLOAD_THRESHOLD_BYTES`, e uma última vez no final.
 
+    Cada CNES é tentado até `MAX_ATTEMPTS` vezes. A task falha no final se algum CNES
+    não puder ser extraído, depois de carregar os demais.
+    """
     bq_table_rename = {
         "ATENDIMENTOS": "acto",
         "PACIENTES": "cadastro",
     }
     bq_table_id = bq_table_rename.get(db_table.upper(), db_table.lower())
 
-    full_table_name = f"{db_schema}.{db_table}"
-    log(f"[process_cnes_table] Iniciando extração para tabela {db_table} do CNES: {cnes_code}")
-
-    db_name = f"vitacare_historic_{cnes_code}"
-
-    connection_string = (
-        f"mssql+pyodbc://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
-        "?driver=ODBC+Driver+17+for+SQL+Server&TrustServerCertificate=yes"
-    )
-
-    try:
-        engine = create_engine(connection_string)
-
-        query = f"SELECT * FROM {full_table_name}"
-
-        total_rows = 0
-        is_first_chunk = True
+    engine = build_engine(db_host, db_port, db_user, db_password, pool_size=max_workers)
 
-        chunks = pd.read_sql(query, engine, chunksize=500000)
-        data_processed_successfully = False
+    root_folder = f"./data/{uuid.uuid4()}"
+    ready_folder = os.path.join(root_folder, "ready")
+    os.makedirs(ready_folder, exist_ok=True)
+    upload_lock = threading.Lock()
+    state = {"pending_bytes": 0, "uploads": 0}
 
-        for chunk in chunks:
-            dataframe = transform_dataframe(chunk, cnes_code, db_table)
-
-            if dataframe.empty:
+    def upload_ready_files():
+        if state["pending_bytes"] == 0:
+            return
+        log(
+            f"[process_cnes_tables] Carregando {state['pending_bytes'] / 1024**2:.0f} MB "
+            f"da tabela {db_table} no datalake"
+        )
+        upload_to_datalake.run(
+            input_path=ready_folder,
+            dataset_id=dataset_id,
+            table_id=bq_table_id,
+            dump_mode="append",
+            source_format="parquet",
+            if_exists="replace" if state["uploads"] == 0 else "append",
+            if_storage_data_exists="replace" if state["uploads"] == 0 else "append",
+            biglake_table=True,
+            dataset_is_public=False,
+            exception_on_missing_input_file=True,
+        )
+        shutil.rmtree(ready_folder)
+        os.makedirs(ready_folder)
+        state["pending_bytes"] = 0
+        state["uploads"] += 1
+
+    def process_cnes(cnes_code: str) -> bool:
+        db_name = f"vitacare_historic_{cnes_code}"
+        file_name = f"{cnes_code}_{uuid.uuid4()}.parquet"
+        output_path = os.path.join(root_folder, file_name)
+
+        for attempt in range(1, vitacare_constants.MAX_ATTEMPTS.value + 1):
+            extracted_at = datetime.now(pytz.timezone("America/Sao_Paulo")).replace(tzinfo=None)
+            try:
+                total_rows = extract_cnes_table(
+                    engine,
+                    db_schema,
+                    db_table,
+                    cnes_code,
+                    extracted_at,
+                    output_path,
+                    chunksize=vitacare_constants.CHUNKSIZE.value,
+                )
+                break
+            except Exception as e:
+                error_message = str(e)
+                if any(error in error_message for error in NOT_FOUND_ERRORS["table"]):
+                    log(
+                        f"[process_cnes_tables] Tabela {db_table} não encontrada para o CNES {cnes_code}",  # noqa
+                        level="warning",
+                    )
+                    return True
+                if any(error in error_message for error in NOT_FOUND_ERRORS["database"]):
+                    log(
+                        f"[process_cnes_tables] Banco de dados {db_name} não encontrado para o CNES {cnes_code}",  # noqa
+                        level="warning",
+                    )
+                    return True
                 log(
-                    f"[process_cnes_table] Tabela '{db_table}' do CNES {cnes_code} vazia. Upload ignorado",  # noqa
+                    f"[process_cnes_tables] Erro inesperado no CNES {cnes_code} "
+                    f"(tentativa {attempt}): {error_message[:250]}",
                     level="warning",
                 )
-                continue
-
-            upload_df_to_datalake.run(
-                df=dataframe,
-                dataset_id=dataset_id,
-                table_id=bq_table_id,
-                partition_column=partition_column,
-                source_format="parquet",
-                if_exists="replace" if is_first_chunk else "append",
-                if_storage_data_exists="replace" if is_first_chunk else "append",
-            )
-
-            is_first_chunk = False
-            total_rows += len(dataframe)
-            data_processed_successfully = True
-
-            log(
-                f"[process_cnes_table] Upload feito para o CNES {cnes_code} "
-                f"Total de linhas: {total_rows}"
-            )
+                if attempt == vitacare_constants.MAX_ATTEMPTS.value:
+                    return False
+                time.sleep(60 * attempt)
 
-        if not data_processed_successfully and total_rows == 0:
+        if total_rows == 0:
             log(
-                f"[process_cnes_table] Tabela '{db_table}' do CNES {cnes_code} está vazia",
+                f"[process_cnes_tables] Tabela '{db_table}' do CNES {cnes_code} está vazia",
                 level="warning",
             )
+            return True
+
+        log(f"[process_cnes_tables] CNES {cnes_code} extraído. Total de linhas: {total_rows}")
+
+        # Os arquivos prontos ficam à parte, particionados pela data de extração
+        # (`BQ_PARTITION_COLUMN`), para que uma carga não pegue arquivos incompletos
+        date = extracted_at.strftime("%Y-%m-%d")
+        partition = f"ano_particao={date[:4]}/mes_particao={date[5:7]}/data_particao={date}"
+        ready_path = os.path.join(ready_folder, partition, file_name)
+        with upload_lock:
+            os.makedirs(os.path.dirname(ready_path), exist_ok=True)
+            os.replace(output_path, ready_path)
+            state["pending_bytes"] += os.path.getsize(ready_path)
+            if state["pending_bytes"] >= vitacare_constants.UPLOAD_THRESHOLD_BYTES.value:
+                upload_ready_files()
+        return True
 
-        else:
-            log(
-                f"[process_cnes_table] Tabela '{db_table}' do CNES {cnes_code} processada com sucesso.",  # noqa
-                level="info",
-            )
-    except Exception as e:
-        error_message = str(e)
+    try:
+        results = thread_map(process_cnes, cnes_codes, max_workers=max_workers)
+        with upload_lock:
+            upload_ready_files()
+    finally:
+        shutil.rmtree(root_folder, ignore_errors=True)
+        engine.dispose()
+
+    failed = [cnes for cnes, success in zip(cnes_codes, results) if not success]
+    if failed:
+        log(
+            f"[process_cnes_tables] Falha na extração da tabela {db_table} para os CNES: {failed}",
+            level="error",
+        )
+        raise RuntimeError(f"Falha na extração de {len(failed)} CNES")
 
-        if "Invalid object name" in error_message:
-            log(
-                f"[process_cnes_table] Tabela {db_table} não encontrada para o CNES {cnes_code}",
-                level="warning",
-            )
-        elif "Cannot open database" in error_message or "(4060)" in error_message:
-            log(
-                f"[process_cnes_table] Banco de dados {db_name} não encontrado para o CNES {cnes_code}",  # noqa
-                level="warning",
-            )
-        else:
-            log(f"[process_cnes_table] Erro inesperado {error_message[:250]}", level="error")
-            raise
+    log(f"[process_cnes_tables] Tabela '{db_table}' processada para {len(cnes_codes)} CNES.")
 
 
 @task(max_retries=2, retry_delay=timedelta(minutes=1))
 def get_vitacare_cnes_from_bigquery() -> list:
-    query = """
-        SELECT DISTINCT id_cnes
-        FROM `rj-sms.saude_dados_mestres.estabelecimento`
-        WHERE prontuario_versao = 'vitacare'
-        AND prontuario_episodio_tem_dado = 'sim'
-    """
-    log(f"Buscando códigos CNES do BigQuery com a query: {query}")
+    log("Buscando códigos CNES da tabela saude_dados_mestres.estabelecimento")
     try:
-        client = bigquery.Client()
-
-        query_job = client.query(query)
+        estabelecimentos = filter_estabelecimentos(
+            prontuario_versao="vitacare", prontuario_episodio_tem_dado="sim"
+        )
 
-        cnes_list = [str(row.id_cnes) for row in query_job if row.id_cnes is not None]
+        cnes_list = estabelecimentos["id_cnes"].drop_duplicates().tolist()
 
         if not cnes_list:
             log(
@@ -155,7 +258,7 @@ def get_tables_to_extract() -> list:
 
 
 @task
-def build_operator_params(tables: list, env: str, schema: str, part_col: str) -> list:
+def build_operator_params(tables: list, env: str, schema: str) -> list:
     params_list = []
     for table in tables:
         params_list.append(
@@ -163,7 +266,6 @@ def build_operator_params(tables: list, env: str, schema: str, part_col: str) ->
                 "table_name": table,
                 "environment": env,
                 "db_schema": schema,
-                "partition_column": part_col,
                 "rename_flow": True,
             }
         )
@@ -3,43 +3,50 @@
 from datetime import datetime
 
 import pandas as pd
-import pytz
+import pyarrow as pa
+import pyarrow.compute as pc
 
 from pipelines.utils.data_cleaning import remove_columns_accents
 
 # --- Funções auxiliares para pré-processamento ---
 
+# Quebras de linha, tabulações e NULs viram um espaço
+CONTROL_CHARS_PATTERN = r"[\n\r\t\x00]+"
 
-def clean_ut_id(val):
+
+def clean_ut_id(values: pd.Series) -> pd.Series:
     """
     Decodifica e limpa valores VARBINARY de 'ut_id'
     """
-    if isinstance(val, bytes):
-        try:
-            return val.decode("utf-16-le", errors="ignore").replace("\x00", "").strip()
-        except UnicodeDecodeError:
-            return val.decode("latin-1", errors="ignore").replace("\x00", "").strip()
-    return str(val).replace("\x00", "").strip()
+    if values.dtype == object:
+        is_bytes = values.map(type) == bytes
+        decoded = values.str.decode("utf-16-le", errors="ignore")
+        values = decoded.where(is_bytes, values.astype(str))
+    else:
+        values = values.astype(str)
+    return values.str.replace("\x00", "", regex=False).str.strip()
 
 
-def transform_dataframe(df: pd.DataFrame, cnes_code: str, db_table: str) -> pd.DataFrame:
+def transform_dataframe(df: pd.DataFrame, cnes_code: str, extracted_at: datetime) -> pa.Table:
     """
-    Aplica transformações DataFrames extraídos daq Vitacare
+    Aplica transformações aos DataFrames extraídos da Vitacare e os converte em uma tabela
+    Arrow só com colunas de texto, como as gravadas por `upload_df_to_datalake`
     """
-    if df.empty:
-        return df
-
-    now = datetime.now(pytz.timezone("America/Sao_Paulo")).replace(tzinfo=None)
-    df["extracted_at"] = now
+    df["extracted_at"] = extracted_at
     df["id_cnes"] = cnes_code
 
     df.columns = remove_columns_accents(df)
 
     # Aplica clean_ut_id se a coluna existe
     if "ut_id" in df.columns:
-        df["ut_id"] = df["ut_id"].apply(clean_ut_id)
-
-    for col in df.select_dtypes(include=["object"]).columns:
-        df[col] = df[col].astype(str).str.replace(r"[\n\r\t\x00]+", " ", regex=True)
-
-    return df
+        df["ut_id"] = clean_ut_id(df["ut_id"])
+
+    table = pa.Table.from_pandas(df.astype(str), preserve_index=False)
+    # O tipo é fixado para que todos os blocos tenham o mesmo schema no parquet
+    columns = [
+        pc.replace_substring_regex(
+            column.cast(pa.string()), pattern=CONTROL_CHARS_PATTERN, replacement=" "
+        )
+        for column in table.columns
+    ]
+    return pa.Table.from_arrays(columns, names=table.column_names)
@@ -3,34 +3,28 @@ import json
 from datetime import datetime, timedelta
 
 import pandas as pd
-import requests
 
+from pipelines.utils.concurrency import build_session, thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
+from pipelines.utils.infisical import get_secrets_from_path
 from pipelines.utils.logger import log
-from pipelines.utils.tasks import get_secret_key, load_file_from_bigquery
+from pipelines.utils.sms import filter_estabelecimentos
 
 
 @task
 def get_all_api_data(environment: str = "dev") -> str:
 
-    df = load_file_from_bigquery.run(
-        project_name="rj-sms",
-        dataset_name="saude_dados_mestres",
-        table_name="estabelecimento",
-    )
-    df = df[(df["prontuario_versao"] == "vitai") & (df["prontuario_episodio_tem_dado"] == "sim")]
+    df = filter_estabelecimentos(prontuario_versao="vitai", prontuario_episodio_tem_dado="sim")
 
     cnes_list = df["id_cnes"].tolist()
 
+    # Uma única leitura da pasta de segredos em vez de uma consulta por CNES
+    secrets = get_secrets_from_path(path="/prontuario-vitai", environment=environment)
+
     api_data = []
     for cnes in cnes_list:
-        try:
-            api_url = get_secret_key.run(
-                environment=environment,
-                secret_name=f"API_URL_{cnes}",
-                secret_path="/prontuario-vitai",
-            )
-        except Exception:
+        api_url = secrets.get(f"API_URL_{cnes}")
+        if not api_url:
             log(f"A URL da API não foi encontrada para o CNES {cnes}")
             continue
 
@@ -46,10 +40,12 @@ def get_all_api_data(environment: str = "dev") -> str:
 
 @task
 def extract_data(
-    api_data: str, api_token: str, endpoint_path: str, target_date: str
+    api_data: str, api_token: str, endpoint_path: str, target_date: str, max_workers: int = 6
 ) -> pd.DataFrame:
 
     endpoint_url = f"{api_data['api_url']}{endpoint_path}"
+    headers = {"Authorization": f"Bearer {api_token}"}
+    session = build_session(pool_size=max_workers)
 
     if "listByPeriodo" in endpoint_path:
         # Dividir data em lista de 24 janelas de 1h
@@ -62,51 +58,67 @@ def extract_data(
                 )
             )
 
-        responses = []
-        for window in windows:
-            endpoint_params = {
-                "dataInicial": window[0],
-                "dataFinal": window[1],
-            }
+        def fetch_window(window: tuple) -> tuple:
             try:
-                response = requests.get(
+                response = session.get(
                     endpoint_url,
-                    headers={"Authorization": f"Bearer {api_token}"},
-                    params=endpoint_params,
+                    headers=headers,
+                    params={"dataInicial": window[0], "dataFinal": window[1]},
                     timeout=90,
                 )
                 response.raise_for_status()
-                responses.extend(response.json())
+                return response.json(), None
             except Exception as e:
-                log(f"Error extracting data from {endpoint_url}: {e}")
+                return None, e
+
+        results = thread_map(fetch_window, windows, max_workers=max_workers)
+
+        responses = []
+        failed_windows = []
+        for window, (data, error) in zip(windows, results):
+            if error is not None:
+                failed_windows.append(f"{window[0]} - {window[1]}: {error}")
                 continue
+            responses.extend(data)
+
+        if failed_windows:
+            log(
+                f"{len(failed_windows)} de {len(windows)} janelas falharam para o CNES "
+                f"{api_data['cnes']} em {endpoint_url}:\n" + "\n".join(failed_windows),
+                level="error",
+            )
 
         return responses
     elif "{estabelecimento_id}" in endpoint_path:
-        response = requests.get(
+        response = session.get(
             f"{api_data['api_url']}/v1/estabelecimentos/",
-            headers={"Authorization": f"Bearer {api_token}"},
+            headers=headers,
             timeout=90,
         )
         response.raise_for_status()
 
         estabelecimento_id_list = [x["id"] for x in response.json()]
 
-        responses = []
-        for estabelecimento_id in estabelecimento_id_list:
-            response = requests.get(
+        def fetch_estabelecimento(estabelecimento_id) -> list:
+            response = session.get(
                 endpoint_url.format(estabelecimento_id=estabelecimento_id),
-                headers={"Authorization": f"Bearer {api_token}"},
+                headers=headers,
                 timeout=90,
             )
             response.raise_for_status()
-            responses.extend(response.json())
+            return response.json()
+
+        responses = []
+        for data in thread_map(
+            fetch_estabelecimento, estabelecimento_id_list, max_workers=max_workers
+        ):
+            responses.extend(data)
 
         return responses
     else:
-        response = requests.get(
+        response = session.get(
             endpoint_url,
-            headers={"Authorization": f"Bearer {api_token}"},
+            headers=headers,
             timeout=90,
         )
         response.raise_for_status()
@@ -19,7 +19,7 @@ from pipelines.utils.credential_injector import (
     authenticated_create_flow_run as create_flow_run,
 )
 from pipelines.utils.credential_injector import (
-    authenticated_wait_for_flow_run as wait_for_flow_run,
+    authenticated_wait_for_flow_runs as wait_for_flow_runs,
 )
 from pipelines.utils.flow import Flow
 from pipelines.utils.prefect import get_current_flow_labels
@@ -209,11 +209,11 @@ with Flow(
         labels=unmapped(current_flow_run_labels),
     )
 
-    wait_runs_task = wait_for_flow_run.map(
-        flow_run_id=created_flow_runs,
-        stream_states=unmapped(True),
-        stream_logs=unmapped(True),
-        raise_final_state=unmapped(True),
+    wait_runs_task = wait_for_flow_runs(
+        flow_run_ids=created_flow_runs,
+        stream_states=True,
+        stream_logs=True,
+        raise_final_state=True,
     )
 
 datalake_extract_vitai_db_manager.storage = GCS(global_constants.GCS_FLOWS_BUCKET.value)
@@ -1,13 +1,17 @@
 # -*- coding: utf-8 -*-
 """
-Constants for DBT.
+Constants for the GDrive to GCS migration.
 """
 from enum import Enum
 
 
 class constants(Enum):
     """
-    Constant values for the execute dbt flows
+    Constant values for the GDrive to GCS migration flow
     """
 
-    DUMMY = "dummy"
+    DRIVE_API_URL = "https://www.googleapis.com/drive/v3/files"
+    # Tamanho dos blocos baixados e enviados; múltiplo de 256 KiB, exigido pelo GCS
+    CHUNK_SIZE = 8 * 1024 * 1024
+    # Número de membros de um zip enviados ao mesmo tempo
+    MAX_WORKERS = 4
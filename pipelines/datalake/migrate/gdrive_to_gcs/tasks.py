@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
+import io
 import os
 import zipfile
 from datetime import timedelta
 
 from google.cloud import storage
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
 
+from pipelines.datalake.migrate.gdrive_to_gcs.constants import (
+    constants as gdrive_constants,
+)
+from pipelines.datalake.migrate.gdrive_to_gcs.utils import (
+    DriveRangeFile,
+    build_drive_session,
+    get_file_size,
+    iter_drive_content,
+    iter_file_chunks,
+    write_chunks_to_blob,
+)
+from pipelines.utils.concurrency import thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 
@@ -25,62 +36,61 @@ def get_fully_qualified_bucket_name(bucket_name: str, environment: str):
 
 
 @task(max_retries=3, retry_delay=timedelta(minutes=5))
-def download_to_gcs(file_info: dict, bucket_name: str, folder_name: str):
-    gauth = GoogleAuth(
-        settings={
-            "client_config_backend": "service",
-            "service_config": {
-                "client_json_file_path": "/tmp/credentials.json",
-            },
-        }
-    )
-    gauth.ServiceAuth()
-    drive = GoogleDrive(gauth)
-
-    # Download file from Google Drive
-    os.makedirs(os.path.dirname(file_info["path"]), exist_ok=True)
-
-    file = drive.CreateFile({"id": file_info["id"]})
-    file.GetContentFile(file_info["path"])
-    log(f"Downloaded file {file_info['path']} from Google Drive", level="info")
-
-    files = []
-    # If the file is a zip, unzip it
-    if file_info["path"].endswith(".zip"):
-        try:
-            with zipfile.ZipFile(file_info["path"], "r") as zip_ref:
-                current_dir = os.path.dirname(file_info["path"])
-                zip_ref.extractall(current_dir)
-
-                # Remove the zip file
-                os.remove(file_info["path"])
-                log(f"Removed zip file {file_info['path']}", level="info")
-
-                # Discover the files from the zip
-                files = zip_ref.namelist()
-                files = [os.path.join(current_dir, file) for file in files]
-                log(f"Extracted files: {files}", level="info")
-        except Exception as e:
-            log(f"Error extracting zip file {file_info['path']}: {e}", level="error")
-            raise e
-    else:
-        files = [file_info["path"]]
-
-    # Upload to GCS
+def download_to_gcs(
+    file_info: dict,
+    bucket_name: str,
+    folder_name: str,
+    max_workers: int = gdrive_constants.MAX_WORKERS.value,
+    drive_api_url: str = gdrive_constants.DRIVE_API_URL.value,
+):
+    """
+    Copies a Google Drive file to GCS without writing it to local disk. The file is
+    downloaded in chunks straight into a resumable upload; zip files are read in place
+    with range requests and up to `max_workers` members are uploaded at the same time.
+    """
+    chunk_size = gdrive_constants.CHUNK_SIZE.value
+    session = build_drive_session(pool_size=max_workers + 1)
     bucket = storage.Client().bucket(bucket_name)
 
-    blob_urls = []
-    for file_path in files:
-        blob_name = file_path.replace("./", f"{folder_name}/")
-        log(f"Uploading file {file_path} to GCS as {blob_name}", level="info")
-        blob = bucket.blob(blob_name)
-
-        blob.upload_from_filename(file_path)
-        log(f"Uploaded file {file_path} to GCS", level="info")
-
-        # Remove the file from the local directory
-        os.remove(file_path)
-        log(f"Removed file {file_path} from local directory", level="info")
-        blob_urls.append(blob.public_url)
-
-    return blob_urls
+    def blob_name(file_path: str) -> str:
+        return file_path.replace("./", f"{folder_name}/")
+
+    if not file_info["path"].endswith(".zip"):
+        name = blob_name(file_info["path"])
+        log(f"Streaming file {file_info['path']} from Google Drive to GCS as {name}")
+        blob = bucket.blob(name)
+        write_chunks_to_blob(
+            iter_drive_content(session, drive_api_url, file_info["id"], chunk_size),
+            blob,
+            chunk_size,
+        )
+        log(f"Uploaded file {file_info['path']} to GCS", level="info")
+        return [blob.public_url]
+
+    size = get_file_size(session, drive_api_url, file_info["id"])
+    current_dir = os.path.dirname(file_info["path"])
+
+    def open_zip() -> zipfile.ZipFile:
+        # A small buffer only serves the headers; the member data is read in larger
+        # requests, limited to the compressed size of the member
+        raw = DriveRangeFile(session, drive_api_url, file_info["id"], size)
+        return zipfile.ZipFile(io.BufferedReader(raw, buffer_size=256 * 1024), "r")
+
+    try:
+        with open_zip() as zip_ref:
+            members = [member for member in zip_ref.namelist() if not member.endswith("/")]
+    except Exception as e:
+        log(f"Error reading zip file {file_info['path']}: {e}", level="error")
+        raise e
+    log(f"Streaming {len(members)} files from {file_info['path']} to GCS", level="info")
+
+    def upload_member(member: str) -> str:
+        # Each thread reads the archive through its own file object
+        name = blob_name(os.path.join(current_dir, member))
+        blob = bucket.blob(name)
+        with open_zip() as zip_ref, zip_ref.open(member) as source:
+            write_chunks_to_blob(iter_file_chunks(source, chunk_size), blob, chunk_size)
+        log(f"Uploaded file {member} to GCS as {name}", level="info")
+        return blob.public_url
+
+    return thread_map(upload_member, members, max_workers=max_workers)
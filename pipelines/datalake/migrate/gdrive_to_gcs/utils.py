@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming transfer of Google Drive files to GCS, without writing them to local disk.
+"""
+import io
+import queue
+import threading
+from typing import Iterator
+
+import requests
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2 import service_account
+
+from pipelines.utils.googleutils import abort_blob_writer
+
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+
+
+def build_drive_session(
+    credentials_path: str = "/tmp/credentials.json", pool_size: int = 8
+) -> requests.Session:
+    """
+    Creates an authorized session for the Drive API, with `pool_size` connections.
+    """
+    credentials = service_account.Credentials.from_service_account_file(
+        credentials_path, scopes=DRIVE_SCOPES
+    )
+    session = AuthorizedSession(credentials)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_file_size(session: requests.Session, drive_api_url: str, file_id: str) -> int:
+    """
+    Returns the size in bytes of a Drive file.
+    """
+    response = session.get(
+        f"{drive_api_url}/{file_id}",
+        params={"fields": "size", "supportsAllDrives": "true"},
+        timeout=60,
+    )
+    response.raise_for_status()
+    return int(response.json()["size"])
+
+
+class DriveRangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file over the content of a Drive file. Each read is an HTTP
+    range request, so `zipfile` can read the central directory and the members of an
+    archive without downloading it. Wrap it in an `io.BufferedReader` to read in
+    large chunks.
+    """
+
+    def __init__(self, session: requests.Session, drive_api_url: str, file_id: str, size: int):
+        super().__init__()
+        self.session = session
+        self.url = f"{drive_api_url}/{file_id}"
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+
+        response = self.session.get(
+            self.url,
+            params={"alt": "media", "supportsAllDrives": "true"},
+            headers={"Range": f"bytes={self.position}-{end - 1}"},
+            timeout=300,
+        )
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"Range request not supported for {self.url}")
+
+        data = response.content
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def iter_drive_content(
+    session: requests.Session, drive_api_url: str, file_id: str, chunk_size: int
+) -> Iterator[bytes]:
+    """
+    Downloads the content of a Drive file in chunks of `chunk_size` bytes.
+    """
+    with session.get(
+        f"{drive_api_url}/{file_id}",
+        params={"alt": "media", "supportsAllDrives": "true"},
+        stream=True,
+        timeout=300,
+    ) as response:
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size=chunk_size)
+
+
+def write_chunks_to_blob(chunks: Iterator[bytes], blob, chunk_size: int, prefetch: int = 2):
+    """
+    Writes the chunks to a GCS resumable upload. The chunks are read by a separate
+    thread, so the next chunks are downloaded while the current one is uploaded.
+    """
+    buffer = queue.Queue(maxsize=prefetch)
+    errors = []
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(e)
+        put(done)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    writer = blob.open("wb", chunk_size=chunk_size)
+    try:
+        while True:
+            chunk = buffer.get()
+            if chunk is done:
+                break
+            writer.write(chunk)
+        if errors:
+            raise errors[0]
+        writer.close()
+    except BaseException:
+        abort_blob_writer(writer)
+        raise
+    finally:
+        stop.set()
+        producer.join(timeout=5)
+
+
+def iter_file_chunks(file: io.IOBase, chunk_size: int) -> Iterator[bytes]:
+    """
+    Reads a file object in chunks of `chunk_size` bytes.
+    """
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
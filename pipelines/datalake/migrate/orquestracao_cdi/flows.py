@@ -33,6 +33,9 @@ from pipelines.utils.credential_injector import (
 from pipelines.utils.credential_injector import (
     authenticated_wait_for_flow_run as wait_for_flow_run,
 )
+from pipelines.utils.credential_injector import (
+    authenticated_wait_for_flow_runs as wait_for_flow_runs,
+)
 from pipelines.utils.flow import Flow
 from pipelines.utils.prefect import get_current_flow_labels
 from pipelines.utils.state_handlers import handle_flow_state_change
@@ -98,12 +101,12 @@ with Flow(
         )
 
         ## Agrega (1) e (2)
-        wait_dos = wait_for_flow_run.map(
-            flow_run_id=[dou_flow_run, dorj_flow_run],
-            stream_states=unmapped(True),
-            stream_logs=unmapped(True),
-            raise_final_state=unmapped(False),
-            max_duration=unmapped(timedelta(minutes=60)),
+        wait_dos = wait_for_flow_runs(
+            flow_run_ids=[dou_flow_run, dorj_flow_run],
+            stream_states=True,
+            stream_logs=True,
+            raise_final_state=False,
+            max_duration=timedelta(minutes=60),
         )
 
         ## (3) dbt
@@ -145,12 +148,12 @@ with Flow(
             parameters=tcm_params,
             labels=unmapped(current_flow_run_labels),
         )
-        wait_tcm = wait_for_flow_run.map(
-            flow_run_id=tcm_flow_runs,
-            stream_states=unmapped(True),
-            stream_logs=unmapped(True),
-            raise_final_state=unmapped(False),
-            max_duration=unmapped(timedelta(minutes=20)),
+        wait_tcm = wait_for_flow_runs(
+            flow_run_ids=tcm_flow_runs,
+            stream_states=True,
+            stream_logs=True,
+            raise_final_state=False,
+            max_duration=timedelta(minutes=20),
         )
 
         ## (5) Email
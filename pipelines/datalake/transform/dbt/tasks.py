@@ -24,7 +24,7 @@ from pipelines.datalake.transform.dbt.constants import (
     constants as execute_dbt_constants,
 )
 from pipelines.utils.credential_injector import authenticated_task as task
-from pipelines.utils.dbt import Summarizer, log_to_file, process_dbt_logs
+from pipelines.utils.dbt import DbtEventCollector, Summarizer
 from pipelines.utils.googleutils import (
     download_from_cloud_storage,
     upload_to_cloud_storage,
@@ -122,9 +122,14 @@ def execute_dbt(
 
         log(f"Executing dbt command: {' '.join(cli_args)}", level="info")
 
-    dbt_runner = dbtRunner()
+    # Events are consumed as they are emitted, so the log file never has to be re-parsed
+    event_collector = DbtEventCollector(report_path="dbt_log.txt")
+    dbt_runner = dbtRunner(callbacks=[event_collector])
     start_time = datetime.now()
-    running_result: dbtRunnerResult = dbt_runner.invoke(cli_args)
+    try:
+        running_result: dbtRunnerResult = dbt_runner.invoke(cli_args)
+    finally:
+        report_path = event_collector.close()
     end_time = datetime.now()
     execution_time = (end_time - start_time).total_seconds()
 
@@ -145,6 +150,9 @@ def execute_dbt(
         "start_time": start_time,
         "end_time": end_time,
         "log_path": log_path,
+        "report_path": report_path,
+        "node_results": event_collector.node_results,
+        "slowest_nodes": event_collector.slowest_nodes(),
     }
 
 
@@ -225,10 +233,12 @@ def create_dbt_report(
         None
     """
     running_results = execution_info["running_result"]
-    log_path = execution_info["log_path"]
+    log_path = execution_info["report_path"]
 
-    logs = process_dbt_logs(log_path=os.path.join(repository_path, "logs", "dbt.log"))
-    log_path = log_to_file(logs)
+    slowest_nodes = "\n".join(
+        f"- {node}: {seconds:.1f}s" for node, seconds in execution_info["slowest_nodes"]
+    )
+    log(f"{len(execution_info['node_results'])} nós executados. Mais lentos:\n{slowest_nodes}")
     summarizer = Summarizer()
 
     is_successful, has_warnings = True, False
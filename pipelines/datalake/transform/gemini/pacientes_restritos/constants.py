@@ -14,6 +14,10 @@ class constants(Enum):
     INFISICAL_PATH = "/"
     INFISICAL_API_KEY = "GEMINI_API_KEY"
     GEMINI_MODEL = "gemini-2.0-flash"
+    GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+    BATCH_MAX_TOKENS = 8000
+    BATCH_MAX_ITEMS = 25
+    MAX_WORKERS = 4
     DATASET_ID = "intermediario_historico_clinico"
     TABLE_ID = "paciente_restrito"
     QUERY = """
@@ -36,3 +40,9 @@ class constants(Enum):
         order by rand()
         limit 10
     """
+    CACHE_QUERY = """
+        SELECT raw, flag_gemini, motivo_gemini
+        FROM `rj-sms.intermediario_historico_clinico.paciente_restrito`
+        WHERE flag_gemini IN ('0', '1')
+        QUALIFY row_number() OVER (PARTITION BY raw ORDER BY _extracted_at DESC) = 1
+    """
@@ -3,7 +3,7 @@
 """
 DBT flows
 """
-from prefect import Parameter, case, unmapped
+from prefect import Parameter, case
 from prefect.executors import LocalDaskExecutor
 from prefect.run_configs import KubernetesRun
 from prefect.storage import GCS
@@ -16,8 +16,7 @@ from pipelines.datalake.transform.gemini.pacientes_restritos.schedules import (
     hci_pacientes_restritos_daily_update_schedule,
 )
 from pipelines.datalake.transform.gemini.pacientes_restritos.tasks import (
-    get_result_gemini,
-    parse_result_dataframe,
+    classify_atendimentos,
     reduce_raw_column,
 )
 from pipelines.utils.flow import Flow
@@ -45,6 +44,11 @@ with Flow(
     ENVIRONMENT = Parameter("environment", default="dev")
     QUERY = Parameter("query", default=hci_pacientes_restritos_constants.QUERY.value)
 
+    # Gemini
+    MAX_WORKERS = Parameter(
+        "max_workers", default=hci_pacientes_restritos_constants.MAX_WORKERS.value
+    )
+
     #####################################
     # Set environment
     ####################################
@@ -71,13 +75,18 @@ with Flow(
         secret_name=hci_pacientes_restritos_constants.INFISICAL_API_KEY.value,
         environment=ENVIRONMENT,
     )
-    list_result = get_result_gemini.map(
-        atendimento=motivo_atendimento_reduced,
-        id_atendimento=id_atendimento,
-        cpf=cpf,
-        gemini_key=unmapped(gemini_key),
+    cached_results = query_table_from_bigquery(
+        sql_query=hci_pacientes_restritos_constants.CACHE_QUERY.value,
+        env=ENVIRONMENT,
+    )
+    df_result = classify_atendimentos(
+        atendimentos=motivo_atendimento_reduced,
+        ids_atendimento=id_atendimento,
+        cpfs=cpf,
+        gemini_key=gemini_key,
+        cached_results=cached_results,
+        max_workers=MAX_WORKERS,
     )
-    df_result = parse_result_dataframe(list_result=list_result)
 
     #     ####################################
     #     # Tasks section #3 - Load data to BQ
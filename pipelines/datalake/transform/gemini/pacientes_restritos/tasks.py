@@ -5,15 +5,20 @@
 Tasks for execute_dbt
 """
 
-import json
 import re
-from datetime import timedelta
 
 import pandas as pd
 import requests
 from prefeitura_rio.pipelines_utils.logging import log
 
 from pipelines.datalake.transform.gemini.pacientes_restritos.constants import constants
+from pipelines.datalake.transform.gemini.pacientes_restritos.utils import (
+    AdaptiveBackoff,
+    build_batches,
+    classify_batch,
+    text_hash,
+)
+from pipelines.utils.concurrency import thread_map
 from pipelines.utils.credential_injector import authenticated_task as task
 
 
@@ -41,91 +46,77 @@ def reduce_raw_column(df: pd.DataFrame) -> pd.DataFrame:
     return df["motivo_atendimento_reduced"].values, df["id_hci"].values, df["cpf"].values
 
 
-@task(max_retries=3, retry_delay=timedelta(seconds=30))
-def get_result_gemini(atendimento: str, id_atendimento: str, cpf: str, gemini_key=str) -> dict:
-    """
-    Get the result from Gemini
-    Args:
-        atendimento (str): Atendimento to be analyzed
-        id_atendimento (str): ID of the atendimento
-        cpf (str): CPF of the patient
-        gemini_key (str): Key to access Gemini
-    Returns:
-        result (dict): Result from Gemini
-    """
-    prompt = """
-    Abaixo um relato clinico relacionado a um paciente quem contém alguma menção ao diagnóstico de HIV.
-    Identifique com o formato {"flag": "1 caso o paciente em questao tenha o diagnostico confirmado e 0 caso contrário.", "motivo":"Explique o motivo de escolha da flag"}
-    """
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{constants.GEMINI_MODEL.value}:generateContent?key={gemini_key}"
-
-    data = {"contents": [{"parts": [{"text": prompt + atendimento}]}]}
-    headers = {"Content-type": "application/json"}
-
-    response = requests.post(url, data=json.dumps(data), headers=headers)
-
-    if response.status_code == 200:
-        response = response.json()["candidates"][0]["content"]["parts"][0]["text"]
-        result = {"result": response, "raw": atendimento, "id_hci": id_atendimento, "cpf": cpf}
-
-        return result
-    else:
-        raise ValueError(f"API call failed, error: {response.status_code} - {response.reason}")
-
-
 @task
-def parse_result_dataframe(list_result: list) -> pd.DataFrame:
+def classify_atendimentos(
+    atendimentos: list,
+    ids_atendimento: list,
+    cpfs: list,
+    gemini_key: str,
+    cached_results: pd.DataFrame,
+    api_url: str = constants.GEMINI_API_URL.value,
+    max_workers: int = constants.MAX_WORKERS.value,
+) -> pd.DataFrame:
     """
-    Parse the result from Gemini
+    Classify the atendimentos with Gemini. Identical texts are classified only once, and
+    the texts already classified in previous runs are taken from `cached_results`; the
+    remaining ones are sent in concurrent batches with structured JSON output.
     Args:
-        list_result (list): List of results from Gemini
+        atendimentos (list): Atendimentos to be analyzed
+        ids_atendimento (list): IDs of the atendimentos
+        cpfs (list): CPFs of the patients
+        gemini_key (str): Key to access Gemini
+        cached_results (pd.DataFrame): Previous results, with the columns 'raw',
+            'flag_gemini' and 'motivo_gemini'
+        api_url (str): Base URL of the Gemini models API
+        max_workers (int): Maximum number of concurrent requests
     Returns:
-        df (pd.DataFrame): Dataframe with the results
+        df (pd.DataFrame): Dataframe with the results. Atendimentos that could not be
+            classified are left out and will be sent again in the next run
     """
-
-    def parse_result_row(dict_result: str) -> dict:
-        """
-        Parse the result from Gemini
-        Args:
-            dict_result (str): Result from Gemini
-        Returns:
-            result (dict): Result from Gemini
-        """
-        dict_result = dict_result.replace("\n", "")
-        regexp_flag = re.compile(r'.*{"flag": {0,1}(?P<flag>.*), "motivo": {0,1}(?P<motivo>.*)}.*')
-        re_match = regexp_flag.match(dict_result)
-
-        if re_match is None:
-            return {"flag": "", "motivo": dict_result}
-
-        if "flag" in re_match.groupdict().keys():
-            flag = re_match.group("flag")
-            flag = flag.replace('"', "")
-            flag = flag.replace('"', "")
-        else:
-            flag = ""
-
-        if "motivo" in re_match.groupdict().keys():
-            motivo = re_match.group("motivo")
-            motivo = motivo.replace('"', "")
-            motivo = motivo.replace('"', "")
-        else:
-            motivo = dict_result
-
-        result = {"flag": flag, "motivo": motivo}
-
-        return result
-
-    df = pd.DataFrame(list_result)
-    df["result_json"] = df["result"].apply(lambda x: parse_result_row(x))
-    df = pd.json_normalize(
-        df[["raw", "id_hci", "cpf", "result_json"]].to_dict(orient="records"), max_level=1
+    cache = {
+        text_hash(row.raw): (row.flag_gemini, row.motivo_gemini)
+        for row in cached_results.itertuples(index=False)
+    }
+
+    df = pd.DataFrame({"raw": atendimentos, "id_hci": ids_atendimento, "cpf": cpfs})
+    df["hash"] = df["raw"].map(text_hash)
+
+    texts = dict(zip(df["hash"], df["raw"]))
+    new_texts = {key: text for key, text in texts.items() if key not in cache}
+    log(
+        f"{len(df)} atendimentos, {len(texts)} textos distintos, "
+        f"{len(new_texts)} textos a classificar"
     )
-    df.rename(
-        {"result_json.flag": "flag_gemini", "result_json.motivo": "motivo_gemini"},
-        axis=1,
-        inplace=True,
+
+    batches = build_batches(
+        new_texts, constants.BATCH_MAX_TOKENS.value, constants.BATCH_MAX_ITEMS.value
     )
+    url = f"{api_url}/{constants.GEMINI_MODEL.value}:generateContent?key={gemini_key}"
+    session = requests.Session()
+    session.headers.update({"Content-type": "application/json"})
+    backoff = AdaptiveBackoff()
+
+    def classify(batch: dict) -> dict:
+        try:
+            return classify_batch(session, url, batch, backoff)
+        except Exception as e:
+            log(f"Batch of {len(batch)} texts failed: {e}", level="warning")
+            return {}
+
+    for results in thread_map(classify, batches, max_workers=max_workers):
+        cache.update(results)
+
+    classified = df["hash"].isin(cache.keys())
+    if not classified.all():
+        log(
+            f"{(~classified).sum()} atendimentos could not be classified and will be retried "
+            "in the next run",
+            level="error",
+        )
+
+    df = df[classified].copy()
+    df["flag_gemini"] = df["hash"].map(lambda key: cache[key][0])
+    df["motivo_gemini"] = df["hash"].map(lambda key: cache[key][1])
     df["_extracted_at"] = pd.Timestamp.now()
 
-    return df
+    return df.drop(columns=["hash"])
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# flake8: noqa: E501
+"""
+Utils for the Gemini classification of restricted patients
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import requests
+
+PROMPT = """
+Abaixo uma lista de relatos clinicos, cada um identificado por um "id", relacionados a pacientes que contêm alguma menção ao diagnóstico de HIV.
+Para cada relato, responda com o mesmo "id", a "flag" igual a "1" caso o paciente em questao tenha o diagnostico confirmado e "0" caso contrário, e em "motivo" explique o motivo de escolha da flag.
+"""
+
+RESPONSE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "flag": {"type": "STRING", "enum": ["0", "1"]},
+            "motivo": {"type": "STRING"},
+        },
+        "required": ["id", "flag", "motivo"],
+    },
+}
+
+
+def text_hash(text: str) -> str:
+    """
+    Content hash used as the cache key of a text
+    Args:
+        text (str): Text to be classified
+    Returns:
+        str: SHA-256 of the stripped text
+    """
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of a text (about 4 characters per token)
+    """
+    return len(text) // 4 + 1
+
+
+def build_batches(texts: Dict[str, str], max_tokens: int, max_items: int) -> List[Dict[str, str]]:
+    """
+    Group the texts in batches that fit in the token budget of a request
+    Args:
+        texts (dict): Texts to be classified, by hash
+        max_tokens (int): Maximum estimated input tokens of a batch
+        max_items (int): Maximum number of texts of a batch
+    Returns:
+        list: Batches of texts, by hash
+    """
+    batches = []
+    batch, batch_tokens = {}, 0
+    for key, text in texts.items():
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = {}, 0
+        batch[key] = text
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class AdaptiveBackoff:
+    """
+    Backoff shared by the threads that call the API. A 429 response pauses every
+    thread and doubles the delay of the next pause; successful calls shrink it back.
+    """
+
+    def __init__(self, initial_delay: float = 2.0, max_delay: float = 120.0):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.delay = initial_delay
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            pause = self.resume_at - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+
+    def throttled(self, retry_after: float = None):
+        with self.lock:
+            pause = retry_after or self.delay * random.uniform(1.0, 1.5)
+            self.resume_at = max(self.resume_at, time.monotonic() + pause)
+            self.delay = min(self.delay * 2, self.max_delay)
+
+    def succeeded(self):
+        with self.lock:
+            self.delay = max(self.delay / 2, self.initial_delay)
+
+
+def classify_batch(
+    session: requests.Session,
+    url: str,
+    batch: Dict[str, str],
+    backoff: AdaptiveBackoff,
+    max_attempts: int = 5,
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Classify a batch of texts in a single request with structured JSON output
+    Args:
+        session (requests.Session): Session used for the requests
+        url (str): generateContent URL of the model, with the API key
+        batch (dict): Texts to be classified, by hash
+        backoff (AdaptiveBackoff): Backoff shared by all the batches
+        max_attempts (int): Maximum number of attempts of the request
+    Returns:
+        dict: (flag, motivo) of each text, by hash. Texts without a valid answer after
+            `max_attempts` are left out
+    """
+
+    def build_request(keys: List[str]) -> dict:
+        relatos = [{"id": i, "relato": batch[key]} for i, key in enumerate(keys)]
+        return {
+            "contents": [{"parts": [{"text": PROMPT + json.dumps(relatos, ensure_ascii=False)}]}],
+            "generationConfig": {
+                "responseMimeType": "application/json",
+                "responseSchema": RESPONSE_SCHEMA,
+                "temperature": 0,
+            },
+        }
+
+    results = {}
+    pending = list(batch.keys())
+    for attempt in range(1, max_attempts + 1):
+        backoff.wait()
+        try:
+            response = session.post(url, json=build_request(pending), timeout=120)
+        except requests.RequestException:
+            if attempt == max_attempts:
+                raise
+            time.sleep(2**attempt)
+            continue
+
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            backoff.throttled(float(retry_after) if retry_after else None)
+            continue
+        if response.status_code >= 500 and attempt < max_attempts:
+            time.sleep(2**attempt)
+            continue
+        if response.status_code != 200:
+            raise ValueError(f"API call failed, error: {response.status_code} - {response.reason}")
+
+        backoff.succeeded()
+        text = response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        try:
+            answers = {item["id"]: item for item in json.loads(text)}
+        except (ValueError, KeyError, TypeError):
+            continue
+
+        for i, key in enumerate(pending):
+            answer = answers.get(i)
+            if answer is not None and str(answer.get("flag")) in ("0", "1"):
+                results[key] = (str(answer["flag"]), answer.get("motivo", ""))
+
+        # The texts the model left out are sent again
+        pending = [key for key in pending if key not in results]
+        if not pending:
+            break
+
+    return results
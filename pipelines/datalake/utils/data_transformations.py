@@ -8,8 +8,11 @@ Data transformations functions for data lake
 import os
 import re
 from datetime import date, datetime, timedelta
+from typing import Callable
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 try:
     import pyreaddbc
@@ -139,6 +142,51 @@ def convert_to_parquet(
     return parquet_file_path
 
 
+def get_flow_metadata(
+    file_path: str,
+    snapshot_date: str = None,
+    parse_date_from: str = None,
+) -> dict:
+    """
+    Builds the flow metadata columns added to every row of a file.
+
+    Parameters:
+    file_path (str): The path to the file.
+    snapshot_date (str, optional): The snapshot date to be added as metadata. Defaults to None.
+    parse_date_from (str, optional): The source from which to parse the snapshot date. Defaults to None.
+
+    Raises:
+    ValueError: If neither snapshot_date nor parse_date_from is provided.
+    ValueError: If an invalid value is provided for parse_date_from.
+
+    Returns:
+    dict: A mapping of metadata column names to their values.
+    """
+
+    if snapshot_date is None and parse_date_from is None:
+        raise ValueError("Either snapshot_date or parse_date_from must be provided")
+
+    tz = pytz.timezone("Brazil/East")
+
+    metadata = {"imported_at": datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")}
+
+    if snapshot_date is not None:
+        metadata["created_at"] = snapshot_date
+    else:
+        if parse_date_from == "filename":
+            snapshot_date = re.findall(r"\d{6}", file_path)[0]
+            snapshot_date = f"{snapshot_date[:4]}-{snapshot_date[-2:]}"
+        elif parse_date_from == "last_modified":
+            snapshot_date = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y-%m-%d")
+        else:
+            raise ValueError("Invalid value for parse_date_from")
+
+        log(f"Date parsed from filename: {snapshot_date}", level="debug")
+        metadata["_data_snapshot"] = snapshot_date
+
+    return metadata
+
+
 def add_flow_metadata(
     file_path: str,
     file_type: str = "csv",
@@ -167,13 +215,12 @@ def add_flow_metadata(
 
     """
 
-    if snapshot_date is None and parse_date_from is None:
-        raise ValueError("Either snapshot_date or parse_date_from must be provided")
-
-    tz = pytz.timezone("Brazil/East")
-
     log(f"Adding date metadata to {file_path} ...", level="debug")
 
+    metadata = get_flow_metadata(
+        file_path=file_path, snapshot_date=snapshot_date, parse_date_from=parse_date_from
+    )
+
     if file_type == "csv":
         df = pd.read_csv(file_path, sep=sep, keep_default_na=False, dtype="str")
     elif file_type == "parquet":
@@ -182,25 +229,8 @@ def add_flow_metadata(
         log(f"Invalid value for file_type: {file_type}", level="error")
         raise ValueError("Invalid value for file_type")
 
-    df["imported_at"] = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S")
-
-    if snapshot_date is not None:
-        df["created_at"] = snapshot_date
-    else:
-        if parse_date_from == "filename":
-            snapshot_date = re.findall(r"\d{6}", file_path)[0]
-            snapshot_date = f"{snapshot_date[:4]}-{snapshot_date[-2:]}"
-        elif parse_date_from == "last_modified":
-            snapshot_date = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y-%m-%d")
-        else:
-            raise ValueError("Invalid value for parse_date_from")
-
-        if date:
-            log(f"Date parsed from filename: {snapshot_date}", level="debug")
-            df["_data_snapshot"] = snapshot_date
-        else:
-            log("Failed to parse date from filename", level="error")
-            raise ValueError("Failed to parse date from filename")
+    for column, value in metadata.items():
+        df[column] = value
 
     if file_type == "csv":
         df.to_csv(file_path, index=False, sep=sep, encoding="utf-8")
@@ -208,3 +238,90 @@ def add_flow_metadata(
         df.to_parquet(file_path, index=False)
 
     return file_path
+
+
+def stream_to_parquet(
+    file_path: str,
+    file_type: str = "csv",
+    csv_sep: str = ";",
+    encoding: str = "utf-8",
+    metadata: dict = None,
+    conform_header: bool = True,
+    fix_columns: Callable[[list], list] = None,
+    chunksize: int = 100_000,
+) -> str:
+    """
+    Converts a file to Parquet in a single streaming pass.
+
+    The input is read in record batches of `chunksize` rows. Header fixes, header
+    conformance and metadata columns are applied to each batch before it is appended to
+    the Parquet file, so the file is decoded once and memory stays bounded by the batch size.
+
+    Args:
+        file_path (str): The path to the input file.
+        file_type (str, optional): The type of the input file. Defaults to "csv".
+        csv_sep (str, optional): The separator used in the CSV file. Defaults to ";".
+        encoding (str, optional): The encoding of the input file. Defaults to "utf-8".
+        metadata (dict, optional): Constant columns added to every row. Defaults to None.
+        conform_header (bool, optional): Whether to conform the header to the datalake format.
+            Defaults to True.
+        fix_columns (Callable, optional): Function applied to the raw column names before
+            conformance. Defaults to None.
+        chunksize (int, optional): Number of rows per record batch. Defaults to 100_000.
+
+    Returns:
+        str: The path to the converted Parquet file.
+    """
+
+    match file_type:
+        case "csv":
+            chunks = pd.read_csv(
+                file_path,
+                sep=csv_sep,
+                dtype=str,
+                keep_default_na=False,
+                encoding=encoding,
+                chunksize=chunksize,
+            )
+        case "dbc":
+            dbf_file = file_path.replace(".dbc", ".dbf")
+            pyreaddbc.dbc2dbf(file_path, dbf_file)
+            chunks = Dbf5(dbf_file, codec=encoding).to_dataframe(chunksize=chunksize, na="")
+        case "dbf":
+            chunks = Dbf5(file_path, codec=encoding).to_dataframe(chunksize=chunksize, na="")
+        case _:
+            log(f"File type {file_type} not found", level="error")
+            raise ValueError("The file type must be 'csv', 'dbc' or 'dbf'")
+
+    parquet_file_path = file_path.replace(f".{file_type}", ".parquet")
+
+    columns = None
+    writer = None
+    try:
+        for chunk in chunks:
+            chunk = chunk.astype(str)
+
+            if columns is None:
+                columns = list(chunk.columns)
+                if fix_columns:
+                    columns = fix_columns(columns)
+                if conform_header:
+                    columns = remove_columns_accents(pd.DataFrame(columns=columns))
+            chunk.columns = columns
+
+            for column, value in (metadata or {}).items():
+                chunk[column] = value
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_file_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        log(f"No records found in {file_path}", level="warning")
+        pd.DataFrame(columns=columns).to_parquet(parquet_file_path, index=False)
+
+    return parquet_file_path
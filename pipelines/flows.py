@@ -1,79 +1,182 @@
 # -*- coding: utf-8 -*-
-# pylint: disable=W0401, W0614, W0611
-# flake8: noqa: F401, F403
-
 """
-Imports all flows for every project so we can register all of them.
+Registry of the flows of every project.
+
+Importing this module does not import any flow. `from pipelines.flows import <flow>` and
+`get_flow` import only the module that declares the flow, so a single flow does not load
+the dependencies of all the others. Running this file as a script, as the registration
+does, imports every flow module into its namespace so all of them can be registered.
 """
+import ast
+import importlib
+import os
+from functools import lru_cache
+from typing import Dict
+
+FLOW_MODULES = [
+    # ===============================
+    # EXTRACT AND LOAD
+    # ===============================
+    "pipelines.datalake.extract_load.centralregulacao_mysql.flows",
+    "pipelines.datalake.extract_load.cientificalab_api.flows",
+    "pipelines.datalake.extract_load.coordenadas_estabelecimentos_pgeo3.flows",
+    "pipelines.datalake.extract_load.datalake_bigquery.flows",
+    "pipelines.datalake.extract_load.datasus_ftp.flows",
+    "pipelines.datalake.extract_load.diario_oficial_rj.flows",
+    "pipelines.datalake.extract_load.diario_oficial_uniao.flows",
+    "pipelines.datalake.extract_load.diario_oficial_uniao_api.flows",
+    "pipelines.datalake.extract_load.exames_laboratoriais_api.flows",
+    "pipelines.datalake.extract_load.extract_gdb.flows",
+    "pipelines.datalake.extract_load.gal_gcs.flows",
+    "pipelines.datalake.extract_load.google_sheets.flows",
+    "pipelines.datalake.extract_load.medilab_api.flows",
+    "pipelines.datalake.extract_load.minhasaude_mongodb.flows",
+    "pipelines.datalake.extract_load.prontuario_gcs.flows",
+    "pipelines.datalake.extract_load.relational_db.flows",
+    "pipelines.datalake.extract_load.rnds_historico.flows",
+    "pipelines.datalake.extract_load.ser_metabase.flows",
+    "pipelines.datalake.extract_load.siclom_api.flows",
+    "pipelines.datalake.extract_load.siscan_web_laudos.flows",
+    "pipelines.datalake.extract_load.sisreg_api.flows",
+    "pipelines.datalake.extract_load.sisreg_web.flows",
+    "pipelines.datalake.extract_load.smsrio_mysql.flows",
+    "pipelines.datalake.extract_load.subpav_mysql.flows",
+    "pipelines.datalake.extract_load.tpc_azure_blob.flows",
+    "pipelines.datalake.extract_load.tribunal_de_contas_rj.flows",
+    "pipelines.datalake.extract_load.vitacare_api_v2.flows",
+    "pipelines.datalake.extract_load.vitacare_gdrive.flows",
+    "pipelines.datalake.extract_load.vitacare_historico.flows",
+    "pipelines.datalake.extract_load.vitai_api.flows",
+    "pipelines.datalake.extract_load.vitai_db.flows",
+    # ===============================
+    # MIGRATE
+    # ===============================
+    "pipelines.datalake.migrate.bq_to_subpav.flows",
+    "pipelines.datalake.migrate.gcs_to_cloudsql.flows",
+    "pipelines.datalake.migrate.gdrive_to_gcs.flows",
+    "pipelines.datalake.migrate.orquestracao_cdi.flows",
+    # ===============================
+    # TRANSFORM
+    # ===============================
+    "pipelines.datalake.transform.dbt.flows",
+    # ===============================
+    # GEMINI
+    # ===============================
+    "pipelines.datalake.transform.gemini.pacientes_restritos.flows",
+    # ===============================
+    # REPORTS
+    # ===============================
+    "pipelines.reports.alerta_atualizacao_tabelas.flows",
+    "pipelines.reports.alerta_jobs_caros.flows",
+    "pipelines.reports.checks_bucket_files.flows",
+    "pipelines.reports.emails_subgeral_gestao.flows",
+    "pipelines.reports.informes_seguranca.flows",
+    "pipelines.reports.ingestao_dados.flows",
+    "pipelines.reports.long_running_flows.flows",
+    "pipelines.reports.monitoramento_hci.flows",
+    # ===============================
+    # TOOLS
+    # ===============================
+    "pipelines.tools.healthchecks.flows",
+    "pipelines.tools.unschedule_old_flows.flows",
+]
+
+
+def _module_path(module_name: str) -> str:
+    """
+    Returns the path of the source file of a module of the `pipelines` package.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(package_dir, *module_name.split(".")[1:]) + ".py"
+
+
+@lru_cache(maxsize=None)
+def get_flow_index() -> Dict[str, str]:
+    """
+    Maps the flows to the modules that declare them, reading the source of the modules
+    instead of importing them. Each flow is indexed both by its variable name and by its
+    Prefect name (e.g. `flow_healthcheck` and `"Tool: Health Check"`).
+
+    Returns:
+        Dict[str, str]: The module name of each flow.
+    """
+    index = {}
+    for module_name in FLOW_MODULES:
+        with open(_module_path(module_name), encoding="utf-8") as file:
+            tree = ast.parse(file.read())
+
+        for node in tree.body:
+            if not isinstance(node, ast.With):
+                continue
+            for item in node.items:
+                call = item.context_expr
+                if not (
+                    isinstance(call, ast.Call)
+                    and isinstance(call.func, ast.Name)
+                    and call.func.id == "Flow"
+                    and isinstance(item.optional_vars, ast.Name)
+                ):
+                    continue
+                index[item.optional_vars.id] = module_name
+
+                name = call.args[0] if call.args else None
+                for keyword in call.keywords:
+                    if keyword.arg == "name":
+                        name = keyword.value
+                if isinstance(name, ast.Constant):
+                    index[name.value] = module_name
+    return index
+
+
+def get_flow(name: str):
+    """
+    Imports and returns a flow, by its variable name or by its Prefect name. Only the
+    module that declares the flow is imported.
+
+    Raises:
+        KeyError: If no flow module declares the flow.
+    """
+    index = get_flow_index()
+    if name not in index:
+        raise KeyError(f"Flow {name} not found in {__name__}")
+
+    from prefect import Flow  # pylint: disable=import-outside-toplevel
+
+    module = importlib.import_module(index[name])
+    if hasattr(module, name):
+        return getattr(module, name)
+
+    for value in vars(module).values():
+        if isinstance(value, Flow) and value.name == name:
+            return value
+    raise KeyError(f"Flow {name} not found in {index[name]}")
+
+
+def load_all_flows(namespace: dict) -> dict:
+    """
+    Imports every flow module into `namespace`, as `from <module> import *` would.
+    """
+    for module_name in FLOW_MODULES:
+        module = importlib.import_module(module_name)
+        public = getattr(module, "__all__", None)
+        if public is None:
+            public = [key for key in vars(module) if not key.startswith("_")]
+        namespace.update({key: getattr(module, key) for key in public})
+    return namespace
+
+
+def __getattr__(name: str):
+    try:
+        return get_flow(name)
+    except KeyError as e:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from e
+
+
+def __dir__():
+    return sorted(set(globals()) | set(get_flow_index()))
+
 
-# ===============================
-# EXTRACT AND LOAD
-# ===============================
-from pipelines.datalake.extract_load.centralregulacao_mysql.flows import *
-from pipelines.datalake.extract_load.cientificalab_api.flows import *
-from pipelines.datalake.extract_load.coordenadas_estabelecimentos_pgeo3.flows import *
-from pipelines.datalake.extract_load.datalake_bigquery.flows import *
-from pipelines.datalake.extract_load.datasus_ftp.flows import *
-from pipelines.datalake.extract_load.diario_oficial_rj.flows import *
-from pipelines.datalake.extract_load.diario_oficial_uniao.flows import *
-from pipelines.datalake.extract_load.diario_oficial_uniao_api.flows import *
-from pipelines.datalake.extract_load.exames_laboratoriais_api.flows import *
-from pipelines.datalake.extract_load.extract_gdb.flows import *
-from pipelines.datalake.extract_load.gal_gcs.flows import *
-from pipelines.datalake.extract_load.google_sheets.flows import *
-from pipelines.datalake.extract_load.medilab_api.flows import *
-from pipelines.datalake.extract_load.minhasaude_mongodb.flows import *
-from pipelines.datalake.extract_load.prontuario_gcs import *
-from pipelines.datalake.extract_load.prontuario_gcs.flows import *
-from pipelines.datalake.extract_load.relational_db.flows import *
-from pipelines.datalake.extract_load.rnds_historico.flows import *
-from pipelines.datalake.extract_load.ser_metabase.flows import *
-from pipelines.datalake.extract_load.siclom_api.flows import *
-from pipelines.datalake.extract_load.siscan_web_laudos.flows import *
-from pipelines.datalake.extract_load.sisreg_api.flows import *
-from pipelines.datalake.extract_load.sisreg_web.flows import *
-from pipelines.datalake.extract_load.smsrio_mysql.flows import *
-from pipelines.datalake.extract_load.subpav_mysql.flows import *
-from pipelines.datalake.extract_load.tpc_azure_blob.flows import *
-from pipelines.datalake.extract_load.tribunal_de_contas_rj.flows import *
-from pipelines.datalake.extract_load.vitacare_api_v2.flows import *
-from pipelines.datalake.extract_load.vitacare_gdrive.flows import *
-from pipelines.datalake.extract_load.vitacare_historico.flows import *
-from pipelines.datalake.extract_load.vitai_api.flows import *
-from pipelines.datalake.extract_load.vitai_db.flows import *
-
-# ===============================
-# MIGRATE
-# ===============================
-from pipelines.datalake.migrate.bq_to_subpav.flows import *
-from pipelines.datalake.migrate.gcs_to_cloudsql.flows import *
-from pipelines.datalake.migrate.gdrive_to_gcs.flows import *
-from pipelines.datalake.migrate.orquestracao_cdi.flows import *
-
-# ===============================
-# TRANSFORM
-# ===============================
-from pipelines.datalake.transform.dbt.flows import *
-
-# ===============================
-# GEMINI
-# ===============================
-from pipelines.datalake.transform.gemini.pacientes_restritos.flows import *
-from pipelines.reports.alerta_atualizacao_tabelas.flows import *
-from pipelines.reports.alerta_jobs_caros.flows import *
-from pipelines.reports.checks_bucket_files.flows import *
-from pipelines.reports.emails_subgeral_gestao.flows import *
-from pipelines.reports.informes_seguranca.flows import *
-
-# ===============================
-# REPORTS
-# ===============================
-from pipelines.reports.ingestao_dados.flows import *
-from pipelines.reports.long_running_flows.flows import *
-from pipelines.reports.monitoramento_hci.flows import *
-
-# ===============================
-# TOOLS
-# ===============================
-from pipelines.tools.healthchecks.flows import *
-from pipelines.tools.unschedule_old_flows.flows import *
+# When executed as a script (e.g. by `runpy` during the registration, or by Prefect when
+# loading a script storage), expose every flow in the namespace, as the star imports did
+if __name__ != "pipelines.flows":
+    load_all_flows(globals())
@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
+import numpy as np
 import pandas as pd
 
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.infisical import inject_all_secrets
 from pipelines.utils.logger import log
 from pipelines.utils.monitor import send_message
-from pipelines.utils.prefect import cancel_flow_run, get_prefect_project_id, run_query
+from pipelines.utils.prefect import (
+    cancel_flow_runs,
+    get_prefect_client,
+    get_prefect_project_id,
+)
 
 
 @task
@@ -33,10 +38,15 @@ def detect_running_flows(environment: str) -> pd.DataFrame:
             - flow_id: The ID of the flow.
     """
     query = """
-        query UpcomingFlowRuns($projectId: uuid) {
+        query UpcomingFlowRuns($projectId: uuid, $limit: Int, $last_id: uuid) {
         flow_run(
-            where: {flow: {project_id: {_eq: $projectId}}, state: {_in: ["Running", "Submitted"]}}
-            order_by: [{scheduled_start_time: asc}, {flow: {name: asc}}]
+            where: {
+                id: {_gt: $last_id},
+                flow: {project_id: {_eq: $projectId}},
+                state: {_in: ["Running", "Submitted"]}
+            }
+            order_by: {id: asc}
+            limit: $limit
         ) {
             id
             name
@@ -52,18 +62,23 @@ def detect_running_flows(environment: str) -> pd.DataFrame:
         }
     }
     """
-    data = run_query.run(
-        query=query,
-        variables={"projectId": get_prefect_project_id.run(environment=environment)},
+    flow_runs = list(
+        get_prefect_client().paginate(
+            query=query,
+            key="flow_run",
+            variables={"projectId": get_prefect_project_id.run(environment=environment)},
+        )
     )
-    if len(data["data"]["flow_run"]) == 0:
+    if len(flow_runs) == 0:
         return None
 
-    result = pd.DataFrame(data["data"]["flow_run"])
+    result = pd.DataFrame(flow_runs)
 
     # Data processing
-    result["flow_name"] = result["flow"].apply(lambda x: x["name"])
-    result["flow_id"] = result["flow"].apply(lambda x: x["id"])
+    result["flow_name"] = [flow["name"] for flow in result["flow"]]
+    result["flow_id"] = [flow["id"] for flow in result["flow"]]
+    # Pages come ordered by id; keep the previous order of the report
+    result = result.sort_values(["scheduled_start_time", "flow_name", "id"], ignore_index=True)
     result["composed_name"] = result["flow_name"] + " -> " + result["name"]
     result["scheduled_start_time"] = pd.to_datetime(
         result["scheduled_start_time"], format="mixed"
@@ -71,37 +86,16 @@ def detect_running_flows(environment: str) -> pd.DataFrame:
     result["scheduled_start_time"] = result["scheduled_start_time"].dt.tz_convert(
         "America/Sao_Paulo"
     )
-    result["beginning_datetime"] = result["scheduled_start_time"].apply(
-        lambda x: x.strftime("%d/%m/%Y %H:%M:%S")
-    )
-    result["duration_minutes"] = result["scheduled_start_time"].apply(
-        lambda x: (pd.Timestamp.now(tz="America/Sao_Paulo") - x).total_seconds() / 60
-    )
-    result["flow_run_url"] = result["id"].apply(
-        lambda x: f"https://pipelines.dados.rio/flow-run/{x}"
-    )
+    result["beginning_datetime"] = result["scheduled_start_time"].dt.strftime("%d/%m/%Y %H:%M:%S")
+    result["duration_minutes"] = (
+        pd.Timestamp.now(tz="America/Sao_Paulo") - result["scheduled_start_time"]
+    ).dt.total_seconds() / 60
+    result["flow_run_url"] = "https://pipelines.dados.rio/flow-run/" + result["id"]
 
-    # Classification Type
-    def classify(duration):
-        if duration > 24 * 60:
-            return "long"
-        elif duration > 12 * 60:
-            return "warning"
-        else:
-            return "normal"
-
-    result["classification_type"] = result["duration_minutes"].apply(classify)
-
-    #  Classification Emoji
-    def classify_emoji(duration):
-        if duration > 24 * 60:
-            return "☠️"
-        elif duration > 12 * 60:
-            return "⚠️"
-        else:
-            return ""
-
-    result["classification_emoji"] = result["duration_minutes"].apply(classify_emoji)
+    # Classification Type and Emoji
+    conditions = [result["duration_minutes"] > 24 * 60, result["duration_minutes"] > 12 * 60]
+    result["classification_type"] = np.select(conditions, ["long", "warning"], default="normal")
+    result["classification_emoji"] = np.select(conditions, ["☠️", "⚠️"], default="")
 
     result.drop(columns="flow", inplace=True)
 
@@ -174,9 +168,10 @@ def cancel_flows(running_flows: pd.DataFrame):
 
     full_message = [f"São {long_running_flows.shape[0]} execuções longas em cancelamento:"]
 
+    cancelled = cancel_flow_runs.run(flow_run_ids=long_running_flows["id"].tolist())
+
     for _, flow_run in long_running_flows.iterrows():
-        success = cancel_flow_run.run(flow_run_id=flow_run["id"])
-        success_emoji = "✅" if success else "❌"
+        success_emoji = "✅" if cancelled.get(flow_run["id"]) else "❌"
         message = f"- [**{flow_run['composed_name']}**]({flow_run['flow_run_url']}) de {flow_run['duration_minutes']:.1f} minutos :: Sucesso {success_emoji}"  # noqa
         full_message.append(message)
         log(message)
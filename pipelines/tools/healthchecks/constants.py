@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=C0103
+"""
+Constants for the health checks
+"""
+from enum import Enum
+
+
+class constants(Enum):
+    """
+    Constant values for the health check flow
+    """
+
+    # Tempo máximo de uma execução completa, somando todas as tentativas
+    DEADLINE_SECONDS = 180
+    PROBE_TIMEOUT_SECONDS = 45
+    MAX_ATTEMPTS = 3
+    RETRY_DELAY_SECONDS = 5
+    MAX_WORKERS = 16
+
+    VITAI_API_ENDPOINT = "/v1/atendimento/listByPeriodo"
+    VITAI_API_PARAMS = {"dataInicial": "23/07/2025 09:00:00", "dataFinal": "23/07/2025 12:00:00"}
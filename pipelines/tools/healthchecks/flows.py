@@ -5,12 +5,12 @@ from prefect.run_configs import KubernetesRun
 from prefect.storage import GCS
 
 from pipelines.constants import constants
+from pipelines.tools.healthchecks.constants import constants as healthcheck_constants
 from pipelines.tools.healthchecks.schedules import schedule
 from pipelines.tools.healthchecks.tasks import (
-    smsrio_db_health_check,
+    get_health_check_targets,
+    run_health_checks,
     transform_to_df,
-    vitai_api_health_check,
-    vitai_db_health_check,
 )
 from pipelines.utils.flow import Flow
 from pipelines.utils.state_handlers import handle_flow_state_change
@@ -25,16 +25,14 @@ with Flow(
 ) as flow_healthcheck:
 
     ENVIRONMENT = Parameter("environment", default="dev")
+    DEADLINE_SECONDS = Parameter(
+        "deadline_seconds", default=healthcheck_constants.DEADLINE_SECONDS.value
+    )
 
-    result_vitai_db = vitai_db_health_check(enviroment=ENVIRONMENT)
-    result_smsrio_db = smsrio_db_health_check(enviroment=ENVIRONMENT)
-    result_vitai_api = vitai_api_health_check(enviroment=ENVIRONMENT)
+    targets = get_health_check_targets(enviroment=ENVIRONMENT)
+    results = run_health_checks(targets=targets, deadline_seconds=DEADLINE_SECONDS)
 
-    results_as_df = transform_to_df(
-        results_smsrio=result_smsrio_db,
-        results_vitai_db=result_vitai_db,
-        results_vitai_api=result_vitai_api,
-    )
+    results_as_df = transform_to_df(results=results)
 
     upload_df_to_datalake(
         df=results_as_df,
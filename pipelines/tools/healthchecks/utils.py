@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Probes used by the health checks
+"""
+import http.client
+import ssl
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from typing import List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from pipelines.utils.concurrency import with_prefect_context
+from pipelines.utils.logger import log
+
+
+def probe_http(
+    url: str, timeout: float, headers: Optional[dict] = None, params: Optional[dict] = None
+) -> dict:
+    """
+    Sends a GET request to `url` and measures its latency in three steps.
+
+    Returns:
+        dict: `connect` (TCP and TLS handshake), `ttfb` (from the start until the status
+            line is received) and `total` (until the body is read), in seconds.
+    """
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    query = "&".join(filter(None, [parts.query, urlencode(params or {})]))
+    if query:
+        path = f"{path}?{query}"
+
+    if parts.scheme == "https":
+        connection = http.client.HTTPSConnection(
+            parts.hostname, parts.port, timeout=timeout, context=ssl.create_default_context()
+        )
+    else:
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+
+    try:
+        start = time.perf_counter()
+        connection.connect()
+        connected = time.perf_counter()
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        first_byte = time.perf_counter()
+        response.read()
+        end = time.perf_counter()
+    finally:
+        connection.close()
+
+    if response.status >= 400:
+        raise RuntimeError(f"HTTP {response.status} {response.reason}")
+
+    return {
+        "connect": connected - start,
+        "ttfb": first_byte - start,
+        "total": end - start,
+    }
+
+
+def probe_db(db_url: str, timeout: float) -> dict:
+    """
+    Opens a connection to `db_url` and runs `SELECT 1`, without a connection pool.
+
+    Returns:
+        dict: `connect` (until the connection is open), `ttfb` (until the first row is
+            received) and `total`, in seconds.
+    """
+    connect_args = {}
+    if db_url.startswith(("postgresql", "mysql")):
+        connect_args["connect_timeout"] = max(int(timeout), 1)
+    engine = create_engine(db_url, poolclass=NullPool, connect_args=connect_args)
+
+    try:
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            connected = time.perf_counter()
+            result = connection.execute(text("SELECT 1"))
+            result.fetchone()
+            first_byte = time.perf_counter()
+        end = time.perf_counter()
+    finally:
+        engine.dispose()
+
+    return {
+        "connect": connected - start,
+        "ttfb": first_byte - start,
+        "total": end - start,
+    }
+
+
+def run_probes(
+    targets: List[dict],
+    deadline_seconds: float,
+    max_attempts: int = 3,
+    retry_delay_seconds: float = 5,
+    max_workers: int = 16,
+) -> List[dict]:
+    """
+    Runs the probes of all targets concurrently, within a global deadline.
+
+    Each target is a dict with its `slug`, a `probe` (a function that receives the
+    timeout in seconds and returns the measured latencies) and the `timeout` of each
+    attempt. A target is retried up to `max_attempts` times while there is time left;
+    targets still running at the deadline are reported as unhealthy.
+
+    Returns:
+        List[dict]: One result per target, in the same order as `targets`.
+    """
+    deadline = time.monotonic() + deadline_seconds
+
+    def check(target: dict) -> dict:
+        errors = []
+        for attempt in range(1, max_attempts + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                latencies = target["probe"](min(target["timeout"], remaining))
+            except Exception as e:
+                errors.append(str(e))
+                log(f"Health Check {target['slug']} failed (attempt {attempt}): {e}")
+                if attempt < max_attempts:
+                    time.sleep(max(min(retry_delay_seconds, deadline - time.monotonic()), 0))
+                continue
+            return build_result(target["slug"], attempt, latencies=latencies)
+        return build_result(target["slug"], len(errors), error=errors[-1] if errors else None)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [executor.submit(with_prefect_context(check), target) for target in targets]
+    pending = set(futures)
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        _, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+    # Probes still running are not awaited; their threads end with their own timeouts
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for target, future in zip(targets, futures):
+        if future in pending:
+            results.append(
+                build_result(target["slug"], None, error=f"deadline of {deadline_seconds}s")
+            )
+        else:
+            results.append(future.result())
+    return results
+
+
+def build_result(
+    slug: str,
+    attempts: Optional[int],
+    latencies: Optional[dict] = None,
+    error: Optional[str] = None,
+) -> dict:
+    """
+    Builds the health check record of a target.
+    """
+    if latencies is not None:
+        log(f"Health Check {slug} succeeded in {latencies['total']:.3f}s")
+        return {
+            "is_healthy": True,
+            "slug": slug,
+            "message": f"Health Check {slug} succeeded.",
+            "duration": latencies["total"],
+            "connect_duration": latencies["connect"],
+            "ttfb_duration": latencies["ttfb"],
+            "attempts": attempts,
+            "created_at": datetime.now(),
+        }
+
+    return {
+        "is_healthy": False,
+        "slug": slug,
+        "message": f"Health Check {slug} failed: {error or 'no attempt before the deadline'}",
+        "duration": None,
+        "connect_duration": None,
+        "ttfb_duration": None,
+        "attempts": attempts,
+        "created_at": datetime.now(),
+    }
+
+
+def http_target(
+    slug: str,
+    url: str,
+    timeout: float,
+    headers: Optional[dict] = None,
+    params: Optional[dict] = None,
+) -> dict:
+    """Health check target for an HTTP endpoint."""
+    probe = partial(probe_http, url, headers=headers, params=params)
+    return {"slug": slug, "probe": probe, "timeout": timeout}
+
+
+def db_target(slug: str, db_url: str, timeout: float) -> dict:
+    """Health check target for a database."""
+    return {"slug": slug, "probe": partial(probe_db, db_url), "timeout": timeout}
@@ -6,6 +6,7 @@ from prefect.client import Client
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 from pipelines.utils.monitor import send_message
+from pipelines.utils.prefect import mutate_many, paginate_query
 
 
 @task
@@ -25,33 +26,40 @@ def query_non_archived_flows(environment="staging"):
     project_name = "production" if environment == "prod" else environment
     prefect_client = Client()
     query = """
-        query ($offset: Int, $project_name: String){
+        query ($limit: Int, $last_id: uuid, $project_name: String){
             flow(
                 where: {
+                    id: {_gt: $last_id},
                     archived: {_eq: false},
                     project: {name:{_eq:$project_name}}
                 }
-                offset: $offset
+                order_by: {id: asc}
+                limit: $limit
             ){
+                id
                 name
                 version
             }
         }
     """
 
-    # Request data from Prefect API
-    request_response = prefect_client.graphql(
-        query=query, variables={"offset": 0, "project_name": project_name}
+    # Request data from Prefect API, page by page
+    flows = list(
+        paginate_query(
+            prefect_client.graphql,
+            query=query,
+            key="flow",
+            variables={"project_name": project_name},
+        )
     )
-    data = request_response["data"]
 
-    active_flows = [(flow["name"], flow["version"]) for flow in data["flow"]]
+    active_flows = [(flow["name"], flow["version"]) for flow in flows]
     log(f"Number of Non Archived Flows: {len(active_flows)}")
 
     unique_non_archived_flows = list(set(active_flows))
     log(f"Number of Unique Non Archived Flows: {len(unique_non_archived_flows)}")
 
-    lines = [f"- {flow['name']}@v{flow['version']}" for flow in data["flow"]]
+    lines = [f"- {flow['name']}@v{flow['version']}" for flow in flows]
     message = f"Non Archived Flows in Project {project_name}:\n" + "\n".join(lines)
     log(message)
 
@@ -196,32 +204,28 @@ def report_to_discord(flows_to_archive: list[list[dict]]):
 
 
 @task
-def archive_flow_versions(flow_versions_to_archive: list) -> None:
+def archive_flow_versions(flow_versions_to_archive: list, chunk_size: int = 50) -> None:
     """
-    Archive flow versions from the API.
+    Archive flow versions from the API, sending one request per chunk of flows.
     """
     prefect_client = Client()
 
-    query = """
-        mutation($flow_id: UUID!) {
-            archive_flow (
-                input: {
-                    flow_id: $flow_id
-                }
-            ) {
-                success
-            }
-        }
-    """
+    results = mutate_many(
+        prefect_client.graphql,
+        field="archive_flow",
+        argument="flow_id",
+        argument_type="UUID!",
+        selection="success",
+        values=[flow["id"] for flow in flow_versions_to_archive],
+        chunk_size=chunk_size,
+    )
+
     reports = []
     for flow in flow_versions_to_archive:
-        response = prefect_client.graphql(query=query, variables=dict(flow_id=flow["id"]))
-
         flow_title = f"{flow['name']} @ v{flow['version']}"
         flow_url = f"https://pipelines.dados.rio/flow/{flow['id']}"
-        report = f"- [{flow_title}]({flow_url}) arquivado com status=`{response}`"
-
-        reports.append(report)
+        status = results[flow["id"]]
+        reports.append(f"- [{flow_title}]({flow_url}) arquivado com status=`{status}`")
 
     reports = sorted(reports)
     log("\n".join(reports))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers to run I/O-bound work concurrently inside Prefect tasks.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Union
+
+import prefect
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def with_prefect_context(function: Callable) -> Callable:
+    """
+    Wraps a function so that it runs with the Prefect context of the caller.
+
+    The Prefect context is thread-local, so functions submitted to a thread pool would
+    otherwise lose the logger and the flow parameters used by `log` and by the
+    credential injector.
+
+    Args:
+        function (Callable): The function to be wrapped.
+
+    Returns:
+        Callable: The wrapped function.
+    """
+    context = prefect.context.to_dict()
+
+    def wrapped(*args, **kwargs):
+        with prefect.context(**context):
+            return function(*args, **kwargs)
+
+    return wrapped
+
+
+def thread_map(function: Callable, items: Iterable, max_workers: int = 4) -> List[Any]:
+    """
+    Applies `function` to every item using a bounded thread pool.
+
+    Results are returned in the same order as `items`. The first exception raised by
+    `function` is propagated to the caller.
+
+    Args:
+        function (Callable): The function applied to each item.
+        items (Iterable): The items to be processed.
+        max_workers (int, optional): Maximum number of concurrent calls. Defaults to 4.
+
+    Returns:
+        List[Any]: The results of `function` for each item.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(with_prefect_context(function), items))
+
+
+def build_session(pool_size: int = 1, max_retries: Union[Retry, int] = 0) -> requests.Session:
+    """
+    Creates a session whose connection pool holds `pool_size` connections per host, so
+    that requests made concurrently by `thread_map` workers reuse their connections.
+
+    Args:
+        pool_size (int, optional): Connections kept open per host, usually the number of
+            workers. Defaults to 1.
+        max_retries (Union[Retry, int], optional): Retry policy of the transport adapter.
+            Defaults to 0, no retries.
+
+    Returns:
+        requests.Session: The session, mounted for both HTTP and HTTPS.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
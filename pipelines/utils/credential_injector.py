@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
-from typing import Any, Callable, Union
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Union
 
 import prefect
+from prefect.engine import signals, state
 from prefect.tasks.prefect import create_flow_run, wait_for_flow_run
 
 from pipelines.utils.infisical import inject_bd_credentials
@@ -91,3 +95,157 @@ def authenticated_wait_for_flow_run(**kwargs):
     logger = prefect.context.get("logger")
     logger.debug(f"Waiting Flow Run with params: {kwargs}")
     return wait_for_flow_run.run(**kwargs)
+
+
+def get_state_class(state_name: str, default: type) -> type:
+    """
+    Returns the Prefect state class of a state name (e.g. "Failed"), or `default` if the
+    name is unknown.
+    """
+    state_class = getattr(state, state_name or "", None)
+    if isinstance(state_class, type) and issubclass(state_class, state.State):
+        return state_class
+    return default
+
+
+def watch_flow_runs(
+    run_query: Callable[..., dict],
+    flow_run_ids: List[str],
+    stream_states: bool = True,
+    stream_logs: bool = False,
+    max_duration: timedelta = timedelta(hours=12),
+    min_poll_interval: float = 5,
+    max_poll_interval: float = 60,
+) -> Dict[str, str]:
+    """
+    Waits for several flow runs at once, with a single GraphQL query per poll.
+
+    Each poll asks only for the runs that have not finished yet. The interval between
+    polls starts at `min_poll_interval` and grows up to `max_poll_interval` while no run
+    changes its state.
+
+    Args:
+        run_query (Callable): Function that receives `query` and `variables` and returns
+            the response, e.g. `prefect.Client().graphql`.
+        flow_run_ids (List[str]): The flow runs to wait for.
+        stream_states (bool, optional): Log the state changes of the runs.
+        stream_logs (bool, optional): Log the logs of the runs.
+        max_duration (timedelta, optional): Maximum time to wait for the runs.
+        min_poll_interval (float, optional): Shortest interval between polls, in seconds.
+        max_poll_interval (float, optional): Longest interval between polls, in seconds.
+
+    Returns:
+        Dict[str, str]: The final state of each flow run (e.g. "Success", "Failed").
+
+    Raises:
+        RuntimeError: If some run does not finish within `max_duration`.
+    """
+    if isinstance(flow_run_ids, str):
+        flow_run_ids = [flow_run_ids]
+
+    logger = prefect.context.get("logger")
+    deadline = time.monotonic() + max_duration.total_seconds()
+    names, states, logs_since = {}, {}, {}
+    pending = list(dict.fromkeys(flow_run_ids))
+    interval = min_poll_interval
+
+    while pending:
+        # One aliased `flow_run` field per run, so each one has its own log cursor
+        declarations, fields, variables = [], [], {}
+        for i, flow_run_id in enumerate(pending):
+            declarations.append(f"$id{i}: uuid")
+            variables[f"id{i}"] = flow_run_id
+            selection = "id name state"
+            if stream_logs:
+                declarations.append(f"$since{i}: timestamptz")
+                variables[f"since{i}"] = logs_since.get(flow_run_id, "1970-01-01T00:00:00+00:00")
+                selection += (
+                    f" logs(where: {{timestamp: {{_gt: $since{i}}}}},"
+                    " order_by: {timestamp: asc}) { timestamp level message }"
+                )
+            fields.append(f"r{i}: flow_run(where: {{id: {{_eq: $id{i}}}}}) {{ {selection} }}")
+        query = f"query({', '.join(declarations)}) {{\n" + "\n".join(fields) + "\n}"
+        data = run_query(query=query, variables=variables)["data"]
+
+        changed = False
+        for i, flow_run_id in enumerate(pending):
+            if not data.get(f"r{i}"):
+                raise ValueError(f"Flow run {flow_run_id} not found")
+            flow_run = data[f"r{i}"][0]
+            names[flow_run_id] = flow_run["name"]
+
+            for entry in flow_run.get("logs") or []:
+                logger.log(
+                    logging.getLevelName(entry["level"]),
+                    f"Flow {flow_run['name']!r}: {entry['message']}",
+                )
+                logs_since[flow_run_id] = entry["timestamp"]
+
+            if flow_run["state"] != states.get(flow_run_id):
+                changed = True
+                states[flow_run_id] = flow_run["state"]
+                if stream_states:
+                    logger.info(f"Flow {flow_run['name']!r}: Entered state <{flow_run['state']}>")
+
+        pending = [
+            flow_run_id
+            for flow_run_id in pending
+            if not issubclass(get_state_class(states[flow_run_id], state.Pending), state.Finished)
+        ]
+        if not pending:
+            break
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError(
+                f"Flow runs {[names[flow_run_id] for flow_run_id in pending]} did not finish "
+                f"within {max_duration}"
+            )
+        interval = min_poll_interval if changed else min(interval * 1.5, max_poll_interval)
+        time.sleep(min(interval, remaining))
+
+    return {flow_run_id: states[flow_run_id] for flow_run_id in dict.fromkeys(flow_run_ids)}
+
+
+@authenticated_task()
+def authenticated_wait_for_flow_runs(
+    flow_run_ids: List[str],
+    stream_states: bool = True,
+    stream_logs: bool = False,
+    raise_final_state: bool = False,
+    max_duration: timedelta = timedelta(hours=12),
+) -> Dict[str, str]:
+    """
+    Waits for a set of flow runs in a single task, instead of one
+    `authenticated_wait_for_flow_run` per run. See `watch_flow_runs`.
+
+    Args:
+        flow_run_ids (List[str]): The flow runs to wait for.
+        stream_states (bool, optional): Log the state changes of the runs.
+        stream_logs (bool, optional): Log the logs of the runs.
+        raise_final_state (bool, optional): Fail the task if some run did not succeed.
+        max_duration (timedelta, optional): Maximum time to wait for the runs.
+
+    Returns:
+        Dict[str, str]: The final state of each flow run.
+    """
+    client = prefect.Client()
+    final_states = watch_flow_runs(
+        client.graphql,
+        flow_run_ids=flow_run_ids,
+        stream_states=stream_states,
+        stream_logs=stream_logs,
+        max_duration=max_duration,
+    )
+
+    failed = [
+        flow_run_id
+        for flow_run_id, final_state in final_states.items()
+        if not issubclass(get_state_class(final_state, state.Failed), state.Success)
+    ]
+    if raise_final_state and failed:
+        raise signals.FAIL(
+            message=f"{len(failed)} of {len(final_states)} flow runs did not succeed: {failed}",
+            result=final_states,
+        )
+    return final_states
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
-import json
+import gzip
+import hashlib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import timedelta
+from typing import Iterator, List
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 
 from pipelines.constants import constants
+from pipelines.utils.concurrency import with_prefect_context
 from pipelines.utils.credential_injector import authenticated_task as task
+from pipelines.utils.logger import log
 from pipelines.utils.tasks import get_secret_key
 
 
@@ -45,33 +53,138 @@ def authenticate(environment: str) -> str:
         raise Exception(f"Error getting API token ({response.status_code}) - {response.json()}")
 
 
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(environment: str, pool_size: int = 8, refresh: bool = False):
+    """
+    Returns the API URL and an authenticated session for the Datalake Hub, created once
+    per process and environment.
+
+    Args:
+        environment (str): The environment of the secrets.
+        pool_size (int, optional): Number of pooled connections. Defaults to 8.
+        refresh (bool, optional): Gets a new token for the cached session. Defaults to False.
+
+    Returns:
+        tuple: The API URL and the session.
+    """
+    with _sessions_lock:
+        if environment not in _sessions:
+            api_url = get_secret_key.run(
+                secret_path=constants.DATALAKE_HUB_PATH.value,
+                secret_name=constants.DATALAKE_HUB_API_URL.value,
+                environment=environment,
+            )
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[environment] = (api_url, session)
+            refresh = True
+
+        api_url, session = _sessions[environment]
+        if refresh:
+            token = authenticate.run(environment=environment)
+            session.headers["Authorization"] = f"Bearer {token}"
+        return api_url, session
+
+
+def iter_record_chunks(
+    dataframe: pd.DataFrame, max_chunk_bytes: int, rows_per_slice: int = 10_000
+) -> Iterator[List[bytes]]:
+    """
+    Serializes the rows as JSON records, with all values as strings, and groups them in
+    chunks of at most `max_chunk_bytes` (a single larger record forms its own chunk).
+    Only one slice of `rows_per_slice` rows is converted at a time.
+    """
+    chunk, chunk_bytes = [], 2
+    for start in range(0, len(dataframe), rows_per_slice):
+        rows = dataframe.iloc[start : start + rows_per_slice].astype(str)
+        for record in rows.to_json(orient="records", lines=True).encode("utf-8").splitlines():
+            if chunk and chunk_bytes + len(record) + 1 > max_chunk_bytes:
+                yield chunk
+                chunk, chunk_bytes = [], 2
+            chunk.append(record)
+            chunk_bytes += len(record) + 1
+    if chunk:
+        yield chunk
+
+
 @task
-def load_asset(dataframe: pd.DataFrame, asset_id: str, environment: str):
-    api_url = get_secret_key.run(
-        secret_path=constants.DATALAKE_HUB_PATH.value,
-        secret_name=constants.DATALAKE_HUB_API_URL.value,
-        environment=environment,
-    )
-    token = authenticate.run(environment=environment)
+def load_asset(
+    dataframe: pd.DataFrame,
+    asset_id: str,
+    environment: str,
+    max_chunk_bytes: int = 8 * 1024 * 1024,
+    max_workers: int = 4,
+    max_attempts: int = 5,
+    compress: bool = True,
+) -> dict:
+    """
+    Writes the DataFrame to a Datalake Hub asset in chunks of at most `max_chunk_bytes`
+    of JSON, sent concurrently by up to `max_workers` threads.
 
-    # Convert all columns to string
-    dataframe = dataframe.astype(str)
+    Each chunk is gzip-compressed (if `compress`) and carries an `Idempotency-Key`
+    derived from its content, so the retries of a chunk can be deduplicated by the API.
+    A chunk refused as too large (413) is split in half and sent again.
 
-    dataframe.to_json(open("./records.json", "w+"), orient="records")
-    records = json.load(open("./records.json", "r"))
+    Returns:
+        dict: The number of records and chunks sent and the report of each chunk.
+    """
+    api_url, session = get_session(environment, pool_size=max_workers)
+    url = f"{api_url}write/{asset_id}"
 
-    response = requests.post(
-        url=f"{api_url}write/{asset_id}",
-        timeout=500,
-        headers={
-            "Authorization": f"Bearer {token}",
+    def post(records: List[bytes]) -> list:
+        body = b"[" + b",".join(records) + b"]"
+        headers = {
             "Content-Type": "application/json",
-        },
-        json=records,
-    )
-    report = response.json()
+            "Idempotency-Key": hashlib.sha256(asset_id.encode() + body).hexdigest(),
+        }
+        if compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        for attempt in range(1, max_attempts + 1):
+            try:
+                response = session.post(url, data=body, headers=headers, timeout=300)
+            except requests.RequestException as e:
+                if attempt == max_attempts:
+                    raise
+                log(f"Chunk of {len(records)} records failed ({e}), retrying", level="warning")
+                time.sleep(2**attempt)
+                continue
+
+            if response.status_code == 201:
+                return [response.json()]
+            if response.status_code == 413 and len(records) > 1:
+                middle = len(records) // 2
+                return post(records[:middle]) + post(records[middle:])
+            if response.status_code == 401 and attempt < max_attempts:
+                get_session(environment, refresh=True)
+                continue
+            if response.status_code in (429, 500, 502, 503, 504) and attempt < max_attempts:
+                time.sleep(2**attempt)
+                continue
+            raise Exception(
+                f"Error loading asset to Datalake Hub ({response.status_code}) - {response.text}"
+            )
 
-    if response.status_code != 201:
-        raise Exception(f"Error loading asset to Datalake Hub ({response.status_code}) - {report}")
+    reports = []
+    total_records = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for records in iter_record_chunks(dataframe, max_chunk_bytes):
+            # Keeps at most two chunks per worker in memory
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    reports.extend(future.result())
+            pending.add(executor.submit(with_prefect_context(post), records))
+            total_records += len(records)
+        for future in pending:
+            reports.extend(future.result())
 
-    return report
+    log(f"{total_records} records loaded to asset {asset_id} in {len(reports)} chunks")
+    return {"records": total_records, "chunks": len(reports), "reports": reports}
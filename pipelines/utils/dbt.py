@@ -1,67 +1,70 @@
 # -*- coding: utf-8 -*-
 # pylint: disable= C0301
 # flake8: noqa E501
-import re
+import heapq
 
-import pandas as pd
 from dbt.contracts.results import RunResult, SourceFreshnessResult
-from prefeitura_rio.pipelines_utils.logging import log
 
+DEFAULT_REPORT_LEVELS = ("info", "error", "warn")
 
-def process_dbt_logs(log_path: str = "dbt_repository/logs/dbt.log") -> pd.DataFrame:
-    """
-    Process the contents of a dbt log file and return a DataFrame containing the parsed log entries
-
-    Args:
-        log_path (str): The path to the dbt log file. Defaults to "dbt_repository/logs/dbt.log".
-
-    Returns:
-        pd.DataFrame: A DataFrame containing the parsed log entries.
-    """
-
-    with open(log_path, "r", encoding="utf-8", errors="ignore") as log_file:
-        log_content = log_file.read()
-
-    result = re.split(r"(\x1b\[0m\d{2}:\d{2}:\d{2}\.\d{6})", log_content)
-    parts = [part.strip() for part in result][1:]
-
-    splitted_log = []
-    for i in range(0, len(parts), 2):
-        time = parts[i].replace(r"\x1b[0m", "")
-        level = parts[i + 1][1:6].replace(" ", "")
-        text = parts[i + 1][7:]
-        splitted_log.append((time, level, text))
 
-    full_logs = pd.DataFrame(splitted_log, columns=["time", "level", "text"])
-
-    return full_logs
-
-
-def log_to_file(logs: pd.DataFrame, levels=None) -> str:
+class DbtEventCollector:
     """
-    Writes the logs to a file and returns the file path.
+    A `dbtRunner` callback that consumes dbt's structured events as they are emitted.
 
-    Args:
-        logs (pd.DataFrame): The logs to be written to the file.
-        levels (list): The levels of logs to be written to the file.
+    Events in `levels` are appended to a report file one line at a time, and the
+    timing and status of every finished node are aggregated, so no log file needs
+    to be re-read after the run.
 
-    Returns:
-        str: The file path of the generated log file.
+    Attributes:
+        report_path (str): The path of the generated report file.
+        node_results (dict): Maps each node unique id to its status and execution time.
+        level_counts (dict): Number of events received per level.
     """
-    if levels is None:
-        levels = ["info", "error", "warn"]
-    logs = logs[logs.level.isin(levels)]
 
-    report = []
-    for _, row in logs.iterrows():
-        report.append(f"{row['time']} [{row['level'].rjust(5, ' ')}] {row['text']}")
-    report = "\n".join(report)
-    log(f"Logs do DBT:{report}")
-
-    with open("dbt_log.txt", "w+", encoding="utf-8") as log_file:
-        log_file.write(report)
-
-    return "dbt_log.txt"
+    def __init__(self, report_path: str = "dbt_log.txt", levels=DEFAULT_REPORT_LEVELS):
+        self.report_path = report_path
+        self.levels = set(levels)
+        self.node_results = {}
+        self.level_counts = {}
+        self._report_file = open(report_path, "w+", encoding="utf-8")
+
+    def __call__(self, event) -> None:
+        info = event.info
+        level = info.level
+        self.level_counts[level] = self.level_counts.get(level, 0) + 1
+
+        if level in self.levels and info.msg:
+            time = info.ts.ToDatetime().strftime("%H:%M:%S.%f")
+            self._report_file.write(f"{time} [{level.rjust(5, ' ')}] {info.msg}\n")
+
+        if info.name == "NodeFinished":
+            node_info = event.data.node_info
+            self.node_results[node_info.unique_id] = {
+                "status": node_info.node_status,
+                "execution_time": event.data.run_result.execution_time,
+            }
+
+    def close(self) -> str:
+        """
+        Flushes and closes the report file.
+
+        Returns:
+            str: The path of the report file.
+        """
+        if not self._report_file.closed:
+            self._report_file.close()
+        return self.report_path
+
+    def slowest_nodes(self, n: int = 10) -> list:
+        """
+        Returns the `n` nodes with the longest execution time as `(unique_id, seconds)` pairs.
+        """
+        return heapq.nlargest(
+            n,
+            ((node, result["execution_time"]) for node, result in self.node_results.items()),
+            key=lambda item: item[1],
+        )
 
 
 # =============================
@@ -145,10 +148,14 @@ class Summarizer:
 
     """
 
+    def __init__(self):
+        self.run_result_summarizer = RunResultSummarizer()
+        self.freshness_result_summarizer = FreshnessResultSummarizer()
+
     def __call__(self, result):
         if isinstance(result, RunResult):
-            return RunResultSummarizer().summarize(result)
+            return self.run_result_summarizer.summarize(result)
         elif isinstance(result, SourceFreshnessResult):
-            return FreshnessResultSummarizer().summarize(result)
+            return self.freshness_result_summarizer.summarize(result)
         else:
             raise ValueError(f"Unknown result type: {type(result)}")
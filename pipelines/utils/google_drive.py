@@ -4,16 +4,20 @@
 """
 Tasks to download data from Google Drive.
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from typing import Iterator
 
-from anytree import Node
 from prefeitura_rio.pipelines_utils.logging import log
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+from pipelines.utils.concurrency import with_prefect_context
 from pipelines.utils.credential_injector import authenticated_task as task
 
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
 
 @task
 def get_files_from_folder(
@@ -56,6 +60,72 @@ def get_folder_name(folder_id: str) -> str:
     return folder["title"]
 
 
+def iter_files_from_folder(
+    drive: GoogleDrive,
+    folder_id: str,
+    last_modified_date: datetime = None,
+    max_workers: int = 8,
+    parents_per_query: int = 20,
+) -> Iterator[dict]:
+    """
+    Walks the folder tree of `folder_id` level by level and yields its files as soon as
+    they are listed.
+
+    Each query lists the children of up to `parents_per_query` folders at once, and the
+    queries of a level run concurrently on up to `max_workers` threads. Files modified
+    before `last_modified_date` are filtered by the Drive API.
+
+    Yields:
+        dict: The `path` (relative to the root folder, starting with ".") and the `id`
+            of each file.
+    """
+    query_filters = ["trashed = false"]
+    if last_modified_date:
+        query_filters.append(
+            f"(mimeType = '{FOLDER_MIME_TYPE}' or "
+            f"modifiedDate >= '{last_modified_date.strftime('%Y-%m-%dT%H:%M:%S')}')"
+        )
+
+    @retry(stop=stop_after_attempt(7), wait=wait_fixed(2))
+    def list_children(parent_ids: list) -> list:
+        parents = " or ".join(f"'{parent_id}' in parents" for parent_id in parent_ids)
+        query = " and ".join([f"({parents})"] + query_filters)
+        return drive.ListFile({"q": query, "maxResults": 1000}).GetList()
+
+    folder_paths = {folder_id: "."}
+    level = [folder_id]
+    depth = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            log(f"Listing {len(level)} folders at depth {depth}")
+            batches = [
+                level[i : i + parents_per_query] for i in range(0, len(level), parents_per_query)
+            ]
+            futures = {
+                executor.submit(with_prefect_context(list_children), batch): set(batch)
+                for batch in batches
+            }
+
+            next_level = []
+            for future in as_completed(futures):
+                batch = futures[future]
+                for item in future.result():
+                    parent_id = next(
+                        parent["id"] for parent in item["parents"] if parent["id"] in batch
+                    )
+                    path = f"{folder_paths[parent_id]}/{item['title']}"
+
+                    if item["mimeType"] == FOLDER_MIME_TYPE:
+                        if item["id"] not in folder_paths:
+                            folder_paths[item["id"]] = path
+                            next_level.append(item["id"])
+                    else:
+                        yield {"path": path, "id": item["id"]}
+
+            level = next_level
+            depth += 1
+
+
 @task(max_retries=3, retry_delay=timedelta(minutes=5))
 def retrieve_files_from_gdrive_by_root_folder(
     folder_id: str,
@@ -73,40 +143,9 @@ def retrieve_files_from_gdrive_by_root_folder(
     gauth.ServiceAuth()
     drive = GoogleDrive(gauth)
 
-    files_list = []
-
-    @retry(stop=stop_after_attempt(7), wait=wait_fixed(2))
-    def get_files_recursive(folder_id, last_modified_date, accumulated_path="."):
-        log(f"FOLDER: {accumulated_path}")
-
-        files = drive.ListFile({"q": f"'{folder_id}' in parents and trashed=false"}).GetList()
-
-        for file in files:
-            log(f"Looking at {accumulated_path}/{file['title']}")
-
-            # File
-            if file["mimeType"] != "application/vnd.google-apps.folder":
-                modified_date = datetime.strptime(file["modifiedDate"], "%Y-%m-%dT%H:%M:%S.%fZ")
-                if last_modified_date and modified_date < last_modified_date:
-                    log(
-                        f"File {file['title']} was last modified before {last_modified_date}, skipping",
-                        level="info",
-                    )
-                    continue
-                else:
-                    files_list.append(
-                        {
-                            "path": f"{accumulated_path}/{file['title']}",
-                            "id": file["id"],
-                        }
-                    )
-            # Folder
-            else:
-                get_files_recursive(
-                    file["id"], last_modified_date, f"{accumulated_path}/{file['title']}"
-                )
-
-    get_files_recursive(folder_id, last_modified_date)
+    files_list = list(
+        iter_files_from_folder(drive, folder_id, last_modified_date=last_modified_date)
+    )
 
     log(f"{len(files_list)} files found in Google Drive folder.", level="info")
 
@@ -147,61 +186,65 @@ def retrieve_files_from_gdrive_by_owner(
         folder_filters.append(f"'{owner_email}' in owners")
 
     # ===============================
-    # Searching
-    # ===============================
-    folders = drive.ListFile({"q": " and ".join(folder_filters)}).GetList()
-    files = drive.ListFile({"q": " and ".join(file_filters)}).GetList()
-
+    # Indexing folders
     # ===============================
-    # Indexing
-    # ===============================
-    folders_by_id = {folder["id"]: folder for folder in folders}
-    folders_by_parent_id = {}
-    for folder in folders:
-        parent_id = folder["parents"][0]["id"] if folder["parents"] else None
-        folders_by_parent_id[parent_id] = folders_by_parent_id.get(parent_id, []) + [folder]
+    # Only the title and the first parent of each folder are kept, page by page
+    folder_index = {}
+    for page in drive.ListFile({"q": " and ".join(folder_filters), "maxResults": 1000}):
+        for folder in page:
+            parent_id = folder["parents"][0]["id"] if folder["parents"] else None
+            folder_index[folder["id"]] = (folder["title"], parent_id)
+    log(f"{len(folder_index)} folders indexed")
+
+    if folder_id not in folder_index:
+        log(f"Folder {folder_id} not found", level="error")
+        return []
 
-    nodes_by_id = {folder["id"]: Node(folder["title"], id=folder["id"]) for folder in folders}
+    folder_paths = {}
+    in_subtree = {folder_id: False}
+
+    def resolve(target_id: str):
+        """Computes, and memoizes, the path of a folder and if it is below `folder_id`."""
+        chain = []
+        current_id = target_id
+        while current_id in folder_index and current_id not in folder_paths:
+            chain.append(current_id)
+            current_id = folder_index[current_id][1]
+            if current_id in chain:
+                break
+
+        for chain_id in reversed(chain):
+            title, parent_id = folder_index[chain_id]
+            if parent_id in folder_paths:
+                folder_paths[chain_id] = f"{folder_paths[parent_id]}/{title}"
+                in_subtree[chain_id] = parent_id == folder_id or in_subtree[parent_id]
+            else:
+                folder_paths[chain_id] = title
+                in_subtree[chain_id] = False
+        # The root folder itself is not part of its subtree
+        in_subtree[folder_id] = False
 
     # ===============================
-    # Creating folder tree
+    # Searching files
     # ===============================
-    log(f"Creating folder tree")
-    for id, folder_node in nodes_by_id.items():
-        folder_parent = (
-            folders_by_id[id]["parents"][0] if len(folders_by_id[id]["parents"]) > 0 else None
-        )
-        if folder_parent:
-            parent_node = nodes_by_id.get(folder_parent["id"])
-            if parent_node:
-                folder_node.parent = parent_node
-
-    # take the subtree from folder_id
-
-    log(f"Folder tree created")
-
-    folder_node = nodes_by_id.get(folder_id)
-    if folder_node:
-        subtree = folder_node.descendants
-        log(f"Subtree created for folder {folder_id}")
-    else:
-        log(f"Folder {folder_id} not found", level="error")
-        return []
-
     _files = []
-    for file in files:
-        file_id = file["id"]
-        file_folder_node = nodes_by_id.get(file["parents"][0]["id"])
-
-        if file_folder_node and file_folder_node in subtree:
-            folder_path = "/".join([node.name for node in file_folder_node.path])
-            file_path = folder_path + "/" + file["title"]
-            _files.append(
-                {
-                    "path": file_path,
-                    "id": file_id,
-                }
-            )
+    for page in drive.ListFile({"q": " and ".join(file_filters), "maxResults": 1000}):
+        for file in page:
+            if not file["parents"]:
+                continue
+            file_folder_id = file["parents"][0]["id"]
+            if file_folder_id not in folder_index:
+                continue
+            if file_folder_id not in folder_paths:
+                resolve(file_folder_id)
+
+            if in_subtree[file_folder_id]:
+                _files.append(
+                    {
+                        "path": f"{folder_paths[file_folder_id]}/{file['title']}",
+                        "id": file["id"],
+                    }
+                )
 
     log(f"{len(_files)} files found in Google Drive folder.", level="info")
 
@@ -4,11 +4,21 @@
 
 """
 Functions to interact with Google Cloud Storage and BigQuery.
+
+The storage helpers honour the `STORAGE_EMULATOR_HOST` environment variable, so they
+can be exercised against a local GCS emulator (e.g. fake-gcs-server).
 """
+import base64
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import google_crc32c
 import pandas as pd
 from google.cloud import bigquery, storage
+from google.cloud.storage import transfer_manager
+
+# Number of calls grouped in one batch request (Cloud Storage recommends at most 100)
+GCS_BATCH_SIZE = 100
 
 
 def generate_bigquery_schema(df: pd.DataFrame) -> list[bigquery.SchemaField]:
@@ -53,41 +63,102 @@ def generate_bigquery_schema(df: pd.DataFrame) -> list[bigquery.SchemaField]:
     return schema
 
 
-def download_from_cloud_storage(path: str, bucket_name: str, blob_prefix: str = None):
+def compute_crc32c(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Computes the CRC32C checksum of a local file in the same format used by Cloud Storage.
+
+    Args:
+        file_path (str): The path to the local file.
+        chunk_size (int, optional): Number of bytes read at a time. Defaults to 1 MiB.
+
+    Returns:
+        str: The base64-encoded big-endian CRC32C checksum.
+    """
+    checksum = google_crc32c.Checksum()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            checksum.update(chunk)
+    return base64.b64encode(checksum.digest()).decode("utf-8")
+
+
+def is_same_content(file_path: str, blob: storage.Blob) -> bool:
+    """
+    Checks whether a local file and a listed blob have the same size and CRC32C checksum.
+
+    Args:
+        file_path (str): The path to the local file.
+        blob (storage.Blob): A blob whose metadata was already fetched (e.g. from a listing).
+
+    Returns:
+        bool: True if both have the same content, False otherwise.
+    """
+    if not os.path.isfile(file_path) or blob.size != os.path.getsize(file_path):
+        return False
+    return blob.crc32c == compute_crc32c(file_path)
+
+
+def abort_blob_writer(writer: storage.fileio.BlobWriter):
+    """
+    Discards a resumable upload without finalizing it, so that no partial object is
+    created. `BlobWriter.close` (also called when the writer is garbage collected)
+    would commit the data written so far.
+
+    Args:
+        writer (storage.fileio.BlobWriter): The writer returned by `blob.open("wb")`.
+    """
+    writer._buffer.close()  # pylint: disable=protected-access
+
+
+def download_from_cloud_storage(
+    path: str, bucket_name: str, blob_prefix: str = None, max_workers: int = 8
+):
     """
     Downloads files from Google Cloud Storage to the specified local path.
 
+    Blobs are listed once and downloaded concurrently. Local files that already match the
+    remote size and CRC32C checksum are not downloaded again.
+
     Args:
         path (str): The local path where the files will be downloaded to.
         bucket_name (str): The name of the Google Cloud Storage bucket.
         blob_prefix (str, optional): The prefix of the blobs to download. Defaults to None.
+        max_workers (int, optional): Maximum number of concurrent transfers. Defaults to 8.
+
+    Returns:
+        list: The local paths of the synced files.
     """
 
     client = storage.Client()
     bucket = client.get_bucket(bucket_name)
 
-    downloaded_files = []
-
     if not os.path.exists(path):
         os.makedirs(path)
 
-    blobs = bucket.list_blobs(prefix=blob_prefix)
-
-    for blob in blobs:
-
-        destination_file_name = os.path.join(path, blob.name)
-
-        os.makedirs(os.path.dirname(destination_file_name), exist_ok=True)
-
-        try:
-            blob.download_to_filename(destination_file_name)
+    # Folder placeholders (names ending in "/") have no content to download
+    blobs = [blob for blob in bucket.list_blobs(prefix=blob_prefix) if not blob.name.endswith("/")]
+    local_paths = {blob.name: os.path.join(path, blob.name) for blob in blobs}
 
-            downloaded_files.append(destination_file_name)
-
-        except IsADirectoryError:
-            pass
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        up_to_date = list(
+            executor.map(lambda blob: is_same_content(local_paths[blob.name], blob), blobs)
+        )
+    pending = [blob.name for blob, same in zip(blobs, up_to_date) if not same]
+
+    if pending:
+        results = transfer_manager.download_many_to_path(
+            bucket,
+            pending,
+            destination_directory=path,
+            max_workers=max_workers,
+            worker_type=transfer_manager.THREAD,
+        )
+        for blob_name, result in zip(pending, results):
+            if isinstance(result, IsADirectoryError):
+                del local_paths[blob_name]
+            elif isinstance(result, Exception):
+                raise result
 
-    return downloaded_files
+    return list(local_paths.values())
 
 
 def upload_to_cloud_storage(
@@ -95,15 +166,21 @@ def upload_to_cloud_storage(
     bucket_name: str,
     blob_prefix: str = None,
     if_exist: str = "replace",
+    max_workers: int = 8,
 ):
     """
     Uploads a file or a folder to Google Cloud Storage.
 
+    Existing blobs are read from a single listing instead of one request per file, and
+    blobs whose size and CRC32C checksum already match the local file are never re-sent.
+    The remaining files are uploaded concurrently.
+
     Args:
         path (str): The path to the file or folder that needs to be uploaded.
         bucket_name (str): The name of the bucket in Google Cloud Storage.
         blob_prefix (str, optional): The prefix of the blob to upload. Defaults to None.
         if_exist (str, optional): The action to take if the blob already exists. Defaults to "replace".
+        max_workers (int, optional): Maximum number of concurrent transfers. Defaults to 8.
     """
     client = storage.Client()
     bucket = client.get_bucket(bucket_name)
@@ -111,45 +188,69 @@ def upload_to_cloud_storage(
     if if_exist not in ["replace", "skip"]:
         raise ValueError("Invalid if_exist value. Please use 'replace' or 'skip'.")
 
+    def to_blob_name(relative_path: str) -> str:
+        relative_path = relative_path.replace(os.sep, "/")
+        return f"{blob_prefix}/{relative_path}" if blob_prefix else relative_path
+
     if os.path.isfile(path):
         # Upload a single file
-        blob_name = os.path.basename(path)
-        if blob_prefix:
-            blob_name = f"{blob_prefix}/{blob_name}"
-        blob = bucket.blob(blob_name)
-
-        if if_exist == "skip" and blob.exists():
-            return
-
-        blob.upload_from_filename(path)
+        files = {to_blob_name(os.path.basename(path)): path}
+        remote_blob = bucket.get_blob(next(iter(files)))
+        remote_blobs = {remote_blob.name: remote_blob} if remote_blob else {}
     elif os.path.isdir(path):
         # Upload a folder
-        for root, _, files in os.walk(path):
-            for file in files:
+        files = {}
+        for root, _, file_names in os.walk(path):
+            for file in file_names:
                 file_path = os.path.join(root, file)
-                blob_name = os.path.relpath(file_path, path)
-                if blob_prefix:
-                    blob_name = f"{blob_prefix}/{blob_name}"
-                blob = bucket.blob(blob_name)
-
-                if if_exist == "skip" and blob.exists():
-                    continue
-
-                blob.upload_from_filename(file_path)
+                files[to_blob_name(os.path.relpath(file_path, path))] = file_path
+        list_prefix = f"{blob_prefix}/" if blob_prefix else None
+        remote_blobs = {blob.name: blob for blob in bucket.list_blobs(prefix=list_prefix)}
     else:
         raise ValueError("Invalid path provided.")
 
+    def needs_upload(blob_name: str) -> bool:
+        remote_blob = remote_blobs.get(blob_name)
+        if remote_blob is None:
+            return True
+        if if_exist == "skip":
+            return False
+        return not is_same_content(files[blob_name], remote_blob)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = [
+            blob_name
+            for blob_name, upload in zip(files, executor.map(needs_upload, files))
+            if upload
+        ]
+
+    if not pending:
+        return
+
+    results = transfer_manager.upload_many(
+        [(files[blob_name], bucket.blob(blob_name)) for blob_name in pending],
+        max_workers=max_workers,
+        worker_type=transfer_manager.THREAD,
+    )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        raise errors[0]
+
 
 def clear_bucket(bucket_name: str):
     """
     Clears a Google Cloud Storage bucket by deleting all the blobs.
 
+    Deletions are grouped in batch requests of up to `GCS_BATCH_SIZE` calls each.
+
     Args:
         bucket_name (str): The name of the bucket in Google Cloud Storage.
     """
     client = storage.Client()
     bucket = client.get_bucket(bucket_name)
-    blobs = bucket.list_blobs()
+    blobs = list(bucket.list_blobs())
 
-    for blob in blobs:
-        blob.delete()
+    for start in range(0, len(blobs), GCS_BATCH_SIZE):
+        with client.batch():
+            for blob in blobs[start : start + GCS_BATCH_SIZE]:
+                blob.delete()
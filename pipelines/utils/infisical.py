@@ -29,6 +29,22 @@ def inject_all_secrets(environment: str = "dev") -> dict:
     return secrets
 
 
+def get_secrets_from_path(path: str, environment: str = "dev") -> dict:
+    """
+    Reads every secret of an Infisical folder with a single request.
+
+    Args:
+        path (str): The folder of the secrets, e.g. '/prontuario-vitai'.
+        environment (str, optional): The infiscal environment for which to retrieve credentials. Defaults to 'dev'. Accepts 'dev' or 'prod'.
+
+    Returns:
+        dict: A dictionary mapping secret names to their values.
+    """
+    client = get_infisical_client()
+    secrets = client.get_all_secrets(environment=environment, path=path)
+    return {secret.secret_name: secret.secret_value for secret in secrets}
+
+
 def inject_bd_credentials(environment: str = "dev", force_injection=False) -> None:
     """
     Loads Base dos Dados credentials from Infisical into environment variables.
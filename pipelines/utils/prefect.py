@@ -1,44 +1,263 @@
 # -*- coding: utf-8 -*-
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple
+
 import prefect
 import requests
 from prefect.backend import FlowRunView
 from prefeitura_rio.pipelines_utils.env import getenv_or_action
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from pipelines.constants import constants
 from pipelines.utils.credential_injector import authenticated_task as task
 from pipelines.utils.logger import log
 
 
+def paginate_query(
+    run: Callable[..., dict],
+    query: str,
+    key: str,
+    variables: dict = None,
+    page_size: int = 200,
+) -> Iterator[dict]:
+    """
+    Iterates over every item of a paginated GraphQL query.
+
+    Pages are read by keyset on `id`, so items are neither skipped nor repeated when the
+    result set changes between pages (e.g. runs leaving a state filter). The query must
+    accept `$limit: Int` and `$last_id: uuid` variables, filter on `id: {_gt: $last_id}`,
+    order by `id` and return a list of items with their `id` under `data.<key>`. Pages are
+    requested until one comes back with less than `page_size` items.
+
+    Args:
+        run (Callable): Function that receives `query` and `variables` and returns the response.
+        query (str): The GraphQL query.
+        key (str): The root field holding the list of items.
+        variables (dict, optional): Extra query variables. Defaults to None.
+        page_size (int, optional): Number of items requested per page. Defaults to 200.
+
+    Yields:
+        dict: Each item of the result set.
+    """
+    last_id = "00000000-0000-0000-0000-000000000000"
+    while True:
+        page_variables = {**(variables or {}), "limit": page_size, "last_id": last_id}
+        items = run(query=query, variables=page_variables)["data"][key]
+        yield from items
+        if len(items) < page_size:
+            return
+        last_id = items[-1]["id"]
+
+
+def build_batched_mutation(
+    field: str, argument: str, argument_type: str, selection: str, values: List[str]
+) -> Tuple[str, dict]:
+    """
+    Builds a single GraphQL document applying the same mutation to several values.
+
+    Each call is aliased as `m<index>`, so the response maps `m<index>` to the result
+    for `values[index]`.
+
+    Args:
+        field (str): The mutation field (e.g. "cancel_flow_run").
+        argument (str): The input argument name (e.g. "flow_run_id").
+        argument_type (str): The GraphQL type of the argument (e.g. "UUID!").
+        selection (str): The fields selected from each result (e.g. "state").
+        values (List[str]): The argument values.
+
+    Returns:
+        Tuple[str, dict]: The mutation document and its variables.
+    """
+    declarations = ", ".join(f"$v{i}: {argument_type}" for i in range(len(values)))
+    calls = "\n".join(
+        f"m{i}: {field}(input: {{{argument}: $v{i}}}) {{ {selection} }}" for i in range(len(values))
+    )
+    mutation = f"mutation({declarations}) {{\n{calls}\n}}"
+    variables = {f"v{i}": value for i, value in enumerate(values)}
+    return mutation, variables
+
+
+def mutate_many(
+    run: Callable[..., dict],
+    field: str,
+    argument: str,
+    argument_type: str,
+    selection: str,
+    values: List[str],
+    chunk_size: int = 50,
+) -> Dict[str, dict]:
+    """
+    Applies the same mutation to many values with one request per chunk. See
+    `build_batched_mutation`.
+
+    Args:
+        run (Callable): Function that receives `query` and `variables` and returns the response.
+
+    Returns:
+        Dict[str, dict]: The mutation result for each value. Values whose call failed
+            are mapped to None.
+    """
+    results = {}
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start : start + chunk_size]
+        mutation, variables = build_batched_mutation(
+            field, argument, argument_type, selection, chunk
+        )
+        data = run(query=mutation, variables=variables).get("data") or {}
+        for i, value in enumerate(chunk):
+            results[value] = data.get(f"m{i}")
+    return results
+
+
+class PrefectGraphQLClient:
+    """
+    Client for the Prefect GraphQL API used by the reporting flows.
+
+    It keeps one pooled `requests.Session`, caches the authentication token for
+    `token_ttl` and transparently logs in again when the token expires or is rejected.
+    Configuration defaults to the `PREFECT_API_*` environment variables.
+    """
+
+    def __init__(
+        self,
+        api_url: str = None,
+        username: str = None,
+        password: str = None,
+        tenant_id: str = None,
+        token_ttl: timedelta = timedelta(minutes=30),
+        timeout: int = 180,
+    ):
+        self._api_url = api_url
+        self._username = username
+        self._password = password
+        self._tenant_id = tenant_id
+        self.token_ttl = token_ttl
+        self.timeout = timeout
+
+        self._token = None
+        self._token_expires_at = None
+        self._lock = threading.Lock()
+
+        retries = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(max_retries=retries, pool_maxsize=10))
+        self.session.mount("https://", HTTPAdapter(max_retries=retries, pool_maxsize=10))
+
+    @property
+    def api_url(self) -> str:
+        return self._api_url or getenv_or_action("PREFECT_API_URL")
+
+    def get_token(self, force_refresh: bool = False) -> str:
+        """
+        Returns the cached authentication token, logging in again if it is missing or expired.
+        """
+        with self._lock:
+            now = datetime.now()
+            if force_refresh or self._token is None or now >= self._token_expires_at:
+                response = self.session.post(
+                    url=f"{self.api_url}auth/login/",
+                    json={
+                        "username": self._username or getenv_or_action("PREFECT_API_USERNAME"),
+                        "password": self._password or getenv_or_action("PREFECT_API_PASSWORD"),
+                    },
+                    timeout=self.timeout,
+                )
+                if response.status_code != 200:
+                    raise requests.exceptions.RequestException(
+                        "Failed to authenticate with Prefect API. "
+                        f"Status code: {response.status_code}"
+                    )
+                self._token = response.json()["token"]
+                self._token_expires_at = now + self.token_ttl
+                log("Successfully authenticated with Prefect API.")
+            return self._token
+
+    def query(self, query: str, variables: dict = None, token: str = None) -> dict:
+        """
+        Performs a GraphQL query and returns the decoded response.
+
+        Raises:
+            requests.exceptions.HTTPError: If the API answers with an error status.
+        """
+
+        def post(current_token: str) -> requests.Response:
+            return self.session.post(
+                url=f"{self.api_url}proxy/",
+                json={"query": query, "variables": variables or {}},
+                headers={
+                    "Authorization": f"Bearer {current_token}",
+                    "Content-Type": "application/json",
+                    "Accept": "application/json",
+                    "X-Prefect-Tenant-Id": self._tenant_id
+                    or getenv_or_action("PREFECT_API_TENANT_ID"),
+                },
+                timeout=self.timeout,
+            )
+
+        response = post(token or self.get_token())
+        if response.status_code == 401 and token is None:
+            response = post(self.get_token(force_refresh=True))
+        response.raise_for_status()
+        return response.json()
+
+    def paginate(
+        self, query: str, key: str, variables: dict = None, page_size: int = 200
+    ) -> Iterator[dict]:
+        """
+        Iterates over every item of a paginated query. See `paginate_query`.
+        """
+        return paginate_query(
+            self.query, query=query, key=key, variables=variables, page_size=page_size
+        )
+
+    def mutate_many(
+        self,
+        field: str,
+        argument: str,
+        argument_type: str,
+        selection: str,
+        values: List[str],
+        chunk_size: int = 50,
+    ) -> Dict[str, dict]:
+        """
+        Applies the same mutation to many values. See `mutate_many`.
+        """
+        return mutate_many(
+            self.query, field, argument, argument_type, selection, values, chunk_size
+        )
+
+
+_client = None
+
+
+def get_prefect_client() -> PrefectGraphQLClient:
+    """
+    Returns the process-wide Prefect GraphQL client, creating it on first use.
+    """
+    global _client  # pylint: disable=W0603
+    if _client is None:
+        _client = PrefectGraphQLClient()
+    return _client
+
+
 def get_prefect_token() -> str:
     """
     Authenticates with the Prefect API and retrieves an authentication token.
-    This function sends a POST request to the Prefect API's login endpoint using
-    the username and password obtained from environment variables.
-    If the authentication is successful, it returns the authentication token.
+    The token is cached by the shared client and only renewed when it expires.
     Returns:
         str: The authentication token if the request is successful.
     Raises:
         requests.exceptions.RequestException: If the request fails or the response
         status code is not 200.
     """
-    response = requests.post(
-        url=f"{getenv_or_action('PREFECT_API_URL')}auth/login/",
-        json={
-            "username": getenv_or_action("PREFECT_API_USERNAME"),
-            "password": getenv_or_action("PREFECT_API_PASSWORD"),
-        },
-        timeout=180,
-    )
-
-    if response.status_code == 200:
-        body = response.json()
-        token = body["token"]
-        log("Successfully authenticated with Prefect API.")
-        return token
-    else:
-        raise requests.exceptions.RequestException(
-            f"Failed to authenticate with Prefect API. Status code: {response.status_code}"
-        )
+    return get_prefect_client().get_token()
 
 
 @task
@@ -50,27 +269,13 @@ def run_query(
     """
     Perform a GraphQL query and return results.
     """
-    variables = variables or {}
-    token = token or get_prefect_token()
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-        "X-Prefect-Tenant-Id": getenv_or_action("PREFECT_API_TENANT_ID"),
-    }
-    r = requests.post(
-        url=f"{getenv_or_action('PREFECT_API_URL')}proxy/",
-        json={"query": query, "variables": variables},
-        headers=headers,
-        timeout=180,
-    )
-    if r.status_code == 200:
-        log("Successfully ran query.")
-        return r.json()
-    else:
-        log(f"Failed to run query: [{r.status_code}] {r.text}")
+    try:
+        result = get_prefect_client().query(query=query, variables=variables, token=token)
+    except requests.exceptions.HTTPError as e:
+        log(f"Failed to run query: [{e.response.status_code}] {e.response.text}")
         return None
+    log("Successfully ran query.")
+    return result
 
 
 @task
@@ -95,6 +300,30 @@ def cancel_flow_run(flow_run_id: str, token: str = None) -> bool:
     return data["data"]["cancel_flow_run"]["state"] in ["Cancelled", "Cancelling"]
 
 
+@task
+def cancel_flow_runs(flow_run_ids: List[str], chunk_size: int = 50) -> Dict[str, bool]:
+    """
+    Cancels many Prefect flow runs, sending one request per chunk of `chunk_size` runs.
+    Args:
+        flow_run_ids (List[str]): The unique identifiers of the flow runs to be cancelled.
+        chunk_size (int, optional): Number of cancellations per request. Defaults to 50.
+    Returns:
+        Dict[str, bool]: Whether each flow run was successfully cancelled.
+    """
+    results = get_prefect_client().mutate_many(
+        field="cancel_flow_run",
+        argument="flow_run_id",
+        argument_type="UUID!",
+        selection="state",
+        values=list(flow_run_ids),
+        chunk_size=chunk_size,
+    )
+    return {
+        flow_run_id: bool(result) and result["state"] in ["Cancelled", "Cancelling"]
+        for flow_run_id, result in results.items()
+    }
+
+
 @task
 def archive_flow_run(flow_id: str, token: str = None) -> bool:
     """
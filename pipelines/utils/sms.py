@@ -1,40 +1,114 @@
 # -*- coding: utf-8 -*-
+import os
+import threading
+import time
 from datetime import timedelta
 
+import pandas as pd
+
 from pipelines.utils.credential_injector import authenticated_task as task
+from pipelines.utils.logger import log
 from pipelines.utils.tasks import load_file_from_bigquery
 
+# Cópia local da tabela `saude_dados_mestres.estabelecimento`, compartilhada entre as
+# execuções no mesmo pod e renovada a cada `ESTABELECIMENTO_TTL_SECONDS`
+ESTABELECIMENTO_SNAPSHOT_PATH = "/tmp/saude_dados_mestres/estabelecimento.parquet"
+ESTABELECIMENTO_TTL_SECONDS = 6 * 60 * 60
 
-@task(max_retries=3, retry_delay=timedelta(minutes=1))
-def get_ap_from_cnes(cnes: str) -> str:
+_estabelecimentos = {"df": None, "loaded_at": 0.0}
+_estabelecimentos_lock = threading.Lock()
+
+
+def get_estabelecimentos(
+    ttl_seconds: int = ESTABELECIMENTO_TTL_SECONDS,
+    snapshot_path: str = ESTABELECIMENTO_SNAPSHOT_PATH,
+) -> pd.DataFrame:
+    """
+    Returns the `saude_dados_mestres.estabelecimento` table indexed by `id_cnes`.
+
+    The table is kept in memory and in a local Parquet snapshot, so BigQuery is read at
+    most once every `ttl_seconds`. The returned DataFrame is shared: do not modify it.
+
+    Args:
+        ttl_seconds (int, optional): Maximum age of the cached table, in seconds.
+        snapshot_path (str, optional): Path of the local Parquet snapshot.
+
+    Returns:
+        pd.DataFrame: The table, indexed by `id_cnes` (also kept as a column).
+    """
+    with _estabelecimentos_lock:
+        now = time.time()
+        if (
+            _estabelecimentos["df"] is not None
+            and now - _estabelecimentos["loaded_at"] < ttl_seconds
+        ):
+            return _estabelecimentos["df"]
+
+        if os.path.exists(snapshot_path) and now - os.path.getmtime(snapshot_path) < ttl_seconds:
+            log(f"Loading estabelecimento from snapshot {snapshot_path}")
+            df = pd.read_parquet(snapshot_path)
+            loaded_at = os.path.getmtime(snapshot_path)
+        else:
+            log("Loading estabelecimento from BigQuery")
+            df = load_file_from_bigquery.run(
+                project_name="rj-sms",
+                dataset_name="saude_dados_mestres",
+                table_name="estabelecimento",
+            )
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+            temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+            df.to_parquet(temp_path, index=False)
+            os.replace(temp_path, snapshot_path)
+            loaded_at = now
+
+        df = df[df["id_cnes"].notna()].astype({"id_cnes": str})
+        _estabelecimentos["df"] = df.set_index("id_cnes", drop=False).rename_axis(None)
+        _estabelecimentos["loaded_at"] = loaded_at
+        return _estabelecimentos["df"]
 
-    dados_mestres = load_file_from_bigquery.run(
-        project_name="rj-sms", dataset_name="saude_dados_mestres", table_name="estabelecimento"
-    )
 
-    unidade = dados_mestres[dados_mestres["id_cnes"] == cnes]
+def get_estabelecimento(cnes: str) -> pd.Series:
+    """
+    Returns the `estabelecimento` row of a CNES.
 
-    if unidade.empty:
+    Raises:
+        KeyError: If the CNES is not in the table.
+    """
+    estabelecimentos = get_estabelecimentos()
+    cnes = str(cnes)
+    if cnes not in estabelecimentos.index:
         raise KeyError(f"CNES {cnes} not found in the database")
+    return estabelecimentos.loc[[cnes]].iloc[0]
 
-    ap = unidade.iloc[0]["area_programatica"]
 
-    return f"AP{ap}"
+def filter_estabelecimentos(**filters) -> pd.DataFrame:
+    """
+    Returns the `estabelecimento` rows whose columns are equal to the given values, e.g.
+    `filter_estabelecimentos(prontuario_versao="vitacare")`.
+    """
+    estabelecimentos = get_estabelecimentos()
+    mask = pd.Series(True, index=estabelecimentos.index)
+    for column, value in filters.items():
+        mask &= estabelecimentos[column] == value
+    return estabelecimentos[mask.values].reset_index(drop=True)
 
 
 @task(max_retries=3, retry_delay=timedelta(minutes=1))
-def get_healthcenter_name_from_cnes(cnes: str) -> str:
+def get_ap_from_cnes(cnes: str) -> str:
 
-    dados_mestres = load_file_from_bigquery.run(
-        project_name="rj-sms", dataset_name="saude_dados_mestres", table_name="estabelecimento"
-    )
+    unidade = get_estabelecimento(cnes)
 
-    unidade = dados_mestres[dados_mestres["id_cnes"] == cnes]
+    ap = unidade["area_programatica"]
 
-    if unidade.empty:
-        raise KeyError(f"CNES {cnes} not found in the database")
+    return f"AP{ap}"
+
+
+@task(max_retries=3, retry_delay=timedelta(minutes=1))
+def get_healthcenter_name_from_cnes(cnes: str) -> str:
+
+    unidade = get_estabelecimento(cnes)
 
-    nome_limpo = unidade.iloc[0]["nome_limpo"]
-    ap = unidade.iloc[0]["area_programatica"]
+    nome_limpo = unidade["nome_limpo"]
+    ap = unidade["area_programatica"]
 
     return f"(AP{ap}) {nome_limpo}"
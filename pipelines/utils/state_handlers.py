@@ -7,24 +7,176 @@ State handlers for prefect tasks
 """
 
 import asyncio
+import atexit
 import json
+import queue
+import threading
+import time
 from datetime import datetime
+from typing import Callable
 
 import prefect
 import pytz
 from discord import Embed
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
+from prefect.utilities.logging import get_logger
 
+from pipelines.utils.concurrency import with_prefect_context
 from pipelines.utils.infisical import inject_bd_credentials
-from pipelines.utils.logger import log
 from pipelines.utils.monitor import get_environment, send_discord_embed
 
+FLOW_STATE_DATASET_ID = "brutos_prefect_staging"
+FLOW_STATE_TABLE_ID = "flow_state_change"
+FLOW_STATE_SCHEMA = [
+    bigquery.SchemaField("flow_name", "STRING"),
+    bigquery.SchemaField("flow_id", "STRING"),
+    bigquery.SchemaField("flow_run_id", "STRING"),
+    bigquery.SchemaField("flow_parameters", "STRING"),
+    bigquery.SchemaField("state", "STRING"),
+    bigquery.SchemaField("message", "STRING"),
+    bigquery.SchemaField("occurrence", "TIMESTAMP"),
+]
+
+
+class FlowStateSink:
+    """
+    Writes flow state changes to BigQuery from a background thread, so that the state
+    handler only enqueues the event.
+
+    The writer groups the events received within `flush_interval` seconds (up to
+    `batch_size`) into a single insert per project, checks the dataset and the table
+    only once per project, and also runs the notifications enqueued with `put_task`.
+    Pending events are flushed when the process exits, for at most `close_timeout`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[str], bigquery.Client] = None,
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        close_timeout: float = 15.0,
+    ):
+        self.client_factory = client_factory or (lambda project: bigquery.Client(project=project))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.close_timeout = close_timeout
+        self.logger = get_logger("FlowStateSink")
+
+        self._queue = queue.Queue()
+        self._stop = object()
+        self._tables = {}
+        self._thread = threading.Thread(target=self._run, name="flow-state-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put_row(self, project_id: str, row: dict):
+        self._queue.put(("row", project_id, row))
+
+    def put_task(self, function: Callable):
+        self._queue.put(("task", None, function))
+
+    def close(self):
+        """
+        Flushes the pending events, waiting at most `close_timeout` seconds.
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(self._stop)
+        self._thread.join(timeout=self.close_timeout)
+        if self._thread.is_alive():
+            self.logger.warning(
+                f"Flow state sink did not flush in {self.close_timeout}s; "
+                f"{self._queue.qsize()} events were dropped"
+            )
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not self._stop and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if batch[-1] is self._stop:
+                stopping = True
+                batch.pop()
+            self._write(batch)
+
+    def _write(self, batch: list):
+        rows_by_project = {}
+        for kind, project_id, payload in batch:
+            if kind == "task":
+                try:
+                    payload()
+                except Exception as e:  # pylint: disable=broad-except
+                    self.logger.error(f"Flow state notification failed: {e}")
+            else:
+                rows_by_project.setdefault(project_id, []).append(payload)
+
+        for project_id, rows in rows_by_project.items():
+            try:
+                client, table_ref = self._get_table(project_id)
+                errors = client.insert_rows_json(table_ref, rows)
+            except Exception as e:  # pylint: disable=broad-except
+                errors = [str(e)]
+            if errors:
+                self.logger.error(f"Encountered errors while inserting rows: {errors}")
+            else:
+                self.logger.debug(f"{len(rows)} flow state rows inserted successfully")
+
+    def _get_table(self, project_id: str):
+        if project_id in self._tables:
+            return self._tables[project_id]
+
+        client = self.client_factory(project_id)
+
+        # Create Dataset if it does not exist
+        dataset_ref = bigquery.DatasetReference(project_id, FLOW_STATE_DATASET_ID)
+        try:
+            client.get_dataset(dataset_ref)
+        except NotFound:
+            client.create_dataset(bigquery.Dataset(dataset_ref))
+            self.logger.info(f"Created dataset {FLOW_STATE_DATASET_ID}")
+
+        # Create Table if it does not exist
+        table_ref = dataset_ref.table(FLOW_STATE_TABLE_ID)
+        try:
+            client.get_table(table_ref)
+        except NotFound:
+            client.create_table(bigquery.Table(table_ref, schema=FLOW_STATE_SCHEMA))
+            self.logger.info(f"Created table {FLOW_STATE_TABLE_ID}")
+
+        self._tables[project_id] = (client, table_ref)
+        return self._tables[project_id]
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_flow_state_sink(environment: str) -> FlowStateSink:
+    """
+    Returns the flow state sink of the process, creating it on the first call.
+    """
+    global _sink  # pylint: disable=global-statement
+    with _sink_lock:
+        if _sink is None:
+            inject_bd_credentials(environment=environment)
+            _sink = FlowStateSink()
+    return _sink
+
 
 def handle_flow_state_change(flow, old_state, new_state):
     environment = get_environment()
-
-    inject_bd_credentials(environment=environment)
+    sink = get_flow_state_sink(environment)
 
     info = {
         "flow_name": flow.name,
@@ -45,62 +197,22 @@ def handle_flow_state_change(flow, old_state, new_state):
         for key, value in prefect.context.get("parameters", {}).items():
             message.append(f"- {key}: `{value}`")
 
-        asyncio.run(
-            send_discord_embed(
-                contents=[
-                    Embed(
-                        title=info["flow_name"],
-                        description="\n".join(message),
-                        color=15158332,
-                    )
-                ],
-                monitor_slug="error",
+        embed = Embed(
+            title=info["flow_name"],
+            description="\n".join(message),
+            color=15158332,
+        )
+        # Sent by the sink's thread, with the context of this flow run
+        sink.put_task(
+            with_prefect_context(
+                lambda: asyncio.run(send_discord_embed(contents=[embed], monitor_slug="error"))
             )
         )
 
-    rows = [info]
     # ------------------------------------------------------------
     # Sending data to BigQuery
     # ------------------------------------------------------------
     project_id = "rj-sms-dev" if environment == "dev" else "rj-sms"
-    dataset_id = "brutos_prefect_staging"
-    table_id = "flow_state_change"
-
-    client = bigquery.Client(project=project_id)
-
-    # Create Dataset if it does not exist
-    dataset_ref = client.dataset(dataset_id)
-    try:
-        client.get_dataset(dataset_ref)
-    except NotFound:
-        dataset = bigquery.Dataset(dataset_ref)
-        client.create_dataset(dataset)
-        log(f"Created dataset {dataset_id}")
-
-    # Create Table if it does not exist
-    table_ref = dataset_ref.table(table_id)
-    try:
-        client.get_table(table_ref)
-    except NotFound:
-        schema = [
-            bigquery.SchemaField("flow_name", "STRING"),
-            bigquery.SchemaField("flow_id", "STRING"),
-            bigquery.SchemaField("flow_run_id", "STRING"),
-            bigquery.SchemaField("flow_parameters", "STRING"),
-            bigquery.SchemaField("state", "STRING"),
-            bigquery.SchemaField("message", "STRING"),
-            bigquery.SchemaField("occurrence", "TIMESTAMP"),
-        ]
-        table = bigquery.Table(table_ref, schema=schema)
-        client.create_table(table)
-        log(f"Created table {table_id}")
-
-    # Insert rows
-    errors = client.insert_rows_json(table_ref, rows)
-
-    if errors:
-        log(f"Encountered errors while inserting rows: {errors}")
-    else:
-        log(f"Rows inserted successfully")
+    sink.put_row(project_id, info)
 
     return new_state
@@ -2,14 +2,25 @@
 """
 Field validation functions for prontuario system.
 """
+from typing import Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from validate_docbr import CPF
 
+# Placeholder CPF used by some prontuarios, rejected even though its check digits are valid
+PLACEHOLDER_CPF = "01234567890"
+
+# Weights of the first and second check digits, over the 9 and 10 leading digits
+CPF_FIRST_DIGIT_WEIGHTS = np.arange(10, 1, -1)
+CPF_SECOND_DIGIT_WEIGHTS = np.arange(11, 1, -1)
+
 
 def is_valid_cpf(cpf):
     """
-    Check if a CPF number is valid.
+    Validates a CPF number.
 
     Args:
         cpf (str): The CPF number to be validated.
@@ -17,7 +28,109 @@ def is_valid_cpf(cpf):
     Returns:
         bool: True if the CPF is valid, False otherwise.
     """
-    if cpf is None or pd.isna(cpf) or cpf == "01234567890":
+    if cpf is None or pd.isna(cpf) or cpf == PLACEHOLDER_CPF:
         return False
 
     return CPF().validate(cpf)
+
+
+def _to_string_array(values: Union[pd.Series, pa.Array, pa.ChunkedArray]) -> pa.Array:
+    """
+    Converts the values to an Arrow string array. Non-string values are converted
+    with `str`; nulls are kept.
+    """
+    if isinstance(values, pd.Series):
+        values = pa.array(values.astype("string"), type=pa.string())
+    elif isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    if not pa.types.is_string(values.type):
+        values = values.cast(pa.string())
+    return values
+
+
+def _validate_cpf_array(values: pa.Array) -> tuple:
+    """
+    Validates the CPFs of an Arrow string array.
+
+    Returns:
+        tuple: The boolean mask of valid CPFs (np.ndarray) and the CPFs without the
+            mask characters (pa.Array).
+    """
+    # Same rules as `is_valid_cpf`: once the mask ('.' and '-') is removed, only 11
+    # digits may be left
+    digits = pc.replace_substring(pc.replace_substring(values, ".", ""), "-", "")
+    candidates = pc.and_(
+        pc.equal(pc.binary_length(digits), 11),
+        pc.ascii_is_decimal(digits),
+    )
+    candidates = pc.and_(candidates, pc.not_equal(values, PLACEHOLDER_CPF))
+    candidates = pc.fill_null(candidates, False).to_numpy(zero_copy_only=False)
+
+    valid = np.zeros(len(values), dtype=bool)
+    positions = np.flatnonzero(candidates)
+    if len(positions):
+        # All candidates have exactly 11 ASCII digits, so their bytes form an n x 11 matrix
+        selected = digits.take(pa.array(positions))
+        _, offsets, data = selected.buffers()
+        start = np.frombuffer(offsets, dtype=np.int32)[selected.offset]
+        data = np.frombuffer(data, dtype=np.uint8)[start : start + len(selected) * 11]
+        matrix = data.reshape(-1, 11).astype(np.int16) - ord("0")
+
+        first = (matrix[:, :9] @ CPF_FIRST_DIGIT_WEIGHTS) * 10 % 11 % 10
+        second = (matrix[:, :10] @ CPF_SECOND_DIGIT_WEIGHTS) * 10 % 11 % 10
+        repeated = (matrix == matrix[:, :1]).all(axis=1)
+        valid[positions] = (first == matrix[:, 9]) & (second == matrix[:, 10]) & ~repeated
+
+    # `str.isdigit` also accepts non-ASCII digits, which are rare enough to be checked
+    # one by one
+    non_ascii = pc.fill_null(pc.invert(pc.string_is_ascii(values)), False)
+    for position in np.flatnonzero(non_ascii.to_numpy(zero_copy_only=False)):
+        valid[position] = is_valid_cpf(values[position].as_py())
+
+    return valid, digits
+
+
+def validate_cpf_series(values: pd.Series) -> pd.Series:
+    """
+    Validates a column of CPF numbers at once, with the same result as applying
+    `is_valid_cpf` to each value.
+
+    Args:
+        values (pd.Series): CPF numbers, with or without mask. Nulls are invalid.
+
+    Returns:
+        pd.Series: Boolean mask of the valid CPFs, with the same index as `values`.
+    """
+    valid, _ = _validate_cpf_array(_to_string_array(values))
+    return pd.Series(valid, index=values.index, name=values.name)
+
+
+def validate_cpf_array(values: Union[pa.Array, pa.ChunkedArray]) -> pa.BooleanArray:
+    """
+    Validates an Arrow array of CPF numbers, as `validate_cpf_series`.
+
+    Args:
+        values (pa.Array): CPF numbers, with or without mask. Nulls are invalid.
+
+    Returns:
+        pa.BooleanArray: Mask of the valid CPFs.
+    """
+    valid, _ = _validate_cpf_array(_to_string_array(values))
+    return pa.array(valid, type=pa.bool_())
+
+
+def normalize_cpf_series(values: pd.Series) -> pd.Series:
+    """
+    Normalizes a column of CPF numbers to 11 digits, without mask.
+
+    Args:
+        values (pd.Series): CPF numbers, with or without mask.
+
+    Returns:
+        pd.Series: The CPFs with only digits, or null where the CPF is invalid.
+    """
+    valid, digits = _validate_cpf_array(_to_string_array(values))
+    normalized = pc.if_else(pa.array(valid), digits, pa.nulls(len(digits), pa.string()))
+    return pd.Series(
+        normalized.to_numpy(zero_copy_only=False), index=values.index, name=values.name
+    )